@@ -0,0 +1,85 @@
+"""
+Stored baselines of the benchmarks.
+
+Timings depend on the host and drift with its load, hence they are stored
+and compared as ratios to the time of a fixed calibration workload run in
+the same process, and not as absolute times. A ratio higher than the
+baseline by more than the tolerance is a regression. Noisy suites are
+compared against a baseline saved by a previous run on the same host
+rather than against the baselines of `BASELINES_DIR`.
+"""
+
+import json
+import os
+import statistics
+import timeit
+from functools import lru_cache
+from typing import Callable, Dict, List, Tuple
+
+BASELINES_DIR = os.path.join(os.path.dirname(__file__), "baselines")
+
+
+def path(suite: str) -> str:
+    """Path of the stored baseline of the `suite`"""
+    return os.path.join(BASELINES_DIR, f"{suite}.json")
+
+
+def _workload() -> List[str]:
+    """Interpreter bound work: string, dict and list operations"""
+    counts: Dict[str, int] = {}
+    for i in range(20000):
+        key = f"{i % 150}:{i % 7}-{i % 11}"
+        counts[key] = counts.get(key, 0) + len(key.split(":"))
+    return sorted(counts)
+
+
+def _per_call(timer: timeit.Timer) -> Callable[[], float]:
+    runs, _ = timer.autorange()
+    return lambda: timer.timeit(runs) / runs
+
+
+@lru_cache(maxsize=None)
+def _calibration() -> Callable[[], float]:
+    return _per_call(timeit.Timer(_workload))
+
+
+def calibrate() -> float:
+    """Time in seconds of a call of the calibration workload"""
+    return _calibration()()
+
+
+def relative_time(
+    case: Callable[[], object], repeat: int = 7
+) -> Tuple[float, float]:
+    """
+    Best time in seconds of a call of `case`, and the median of its ratios
+    to the calibration workload timed right before every repeat.
+    """
+    measure = _per_call(timeit.Timer(case))
+    times, ratios = [], []
+    for _ in range(repeat):
+        unit = calibrate()
+        times.append(measure())
+        ratios.append(times[-1] / unit)
+    return min(times), statistics.median(ratios)
+
+
+def save(baseline: str, ratios: Dict[str, float]):
+    """Store the calibration `ratios` as the `baseline` file"""
+    with open(baseline, "w", encoding="utf-8") as file:
+        json.dump(ratios, file, indent=2, sort_keys=True)
+        file.write("\n")
+
+
+def regressions(
+    baseline: str, ratios: Dict[str, float], tolerance: float
+) -> List[str]:
+    """Describe the calibration `ratios` above the `baseline` file"""
+    with open(baseline, encoding="utf-8") as file:
+        stored = json.load(file)
+    return [
+        f"{name}: {ratio:.4g} vs baseline {stored[name]:.4g} "
+        "calibration units"
+        for name, ratio in ratios.items()
+        if name in stored and ratio > stored[name] * (1 + tolerance)
+    ]
@@ -0,0 +1,62 @@
+"""
+Benchmark of the notification fan-out.
+
+Sends a notification to synthetic device tokens through `FakeTransport`,
+which simulates the latency of an FCM multicast and a share of
+unregistered tokens.
+
+```sh
+python -m benchmarks.bench_fanout --devices 1000000 --latency 0.05
+```
+"""
+
+import argparse
+import asyncio
+
+from biblebee_api.service.fanout import FakeTransport, Notification, fan_out
+
+
+async def _pages(devices: int, page_size: int = 1000):
+    for start in range(0, devices, page_size):
+        stop = min(start + page_size, devices)
+        yield [f"token-{i:09d}" for i in range(start, stop)]
+
+
+async def _prune(tokens) -> int:
+    return len(tokens)
+
+
+def main():
+    """Run the benchmark"""
+    parser = argparse.ArgumentParser(prog="python -m benchmarks.bench_fanout")
+    parser.add_argument("--devices", type=int, default=1_000_000)
+    parser.add_argument("--latency", type=float, default=0.05)
+    parser.add_argument("--concurrency", type=int, default=32)
+    parser.add_argument("--transient-rate", type=float, default=0.01)
+    args = parser.parse_args()
+
+    transport = FakeTransport(
+        latency=args.latency,
+        transient_rate=args.transient_rate,
+        is_unregistered=lambda token: token.endswith("00"),
+        seed=1,
+    )
+    report = asyncio.run(
+        fan_out(
+            Notification(message="Mungu ni pendo", title="Daily verse"),
+            _pages(args.devices),
+            transport,
+            _prune,
+            concurrency=args.concurrency,
+            backoff=args.latency,
+        )
+    )
+    print(
+        f"{args.devices} devices in {report.seconds:.2f}s "
+        f"({args.devices / report.seconds:,.0f} tokens/s): "
+        f"{report.as_dict()}"
+    )
+
+
+if __name__ == "__main__":
+    main()
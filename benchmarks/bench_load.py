@@ -0,0 +1,179 @@
+"""
+Load test of the API hot paths.
+
+Generates a synthetic multi-revision corpus in a temporary SQLite file and
+drives the ASGI app in-process with concurrent clients, reporting the
+throughput and the p50/p95/p99 latencies of every endpoint.
+
+Latencies under concurrency are too noisy to be compared across hosts,
+hence a change is checked against a baseline saved by a run of the former
+code on the same host, relative to the calibration workload of
+`benchmarks.baseline`.
+
+```sh
+python -m benchmarks.bench_load --clients 16 --requests 500
+python -m benchmarks.bench_load --save before.json   # on the former code
+python -m benchmarks.bench_load --check before.json  # fail on regressions
+```
+"""
+
+import argparse
+import asyncio
+import logging
+import os
+import random
+import statistics
+import sys
+import tempfile
+import time
+from typing import Callable, Dict, List
+
+import httpx
+
+from benchmarks import baseline
+
+REVISIONS = ("SUV", "KJV", "NEN")
+
+BOOKS, CHAPTERS, VERSES = 66, 20, 30
+
+
+def _endpoints(
+    rng: random.Random, terms: List[str]
+) -> Dict[str, Callable[[], str]]:
+    """URL factories of the benchmarked endpoints"""
+
+    def book():
+        return 10 * rng.randint(1, BOOKS)
+
+    def chapter():
+        return rng.randint(1, CHAPTERS)
+
+    return {
+        "books": lambda: "/api/v1/books/?revesions=SUV",
+        "skim": lambda: (
+            f"/api/v1/books/{book()}/skim?query_expression="
+            f"{chapter()}:1-10&revirsions={rng.choice(REVISIONS)}"
+        ),
+        "chapter": lambda: (
+            f"/api/v1/books/{rng.choice(REVISIONS)}/{book()}/{chapter()}"
+        ),
+        "stats/books": lambda: "/api/v1/stats/books?revisions=SUV",
+        "stats/verses": lambda: "/api/v1/stats/verses?revisions=SUV",
+        "messages": lambda: "/api/v1/messages",
+        "search": lambda: f"/api/v1/search?q={rng.choice(terms)}",
+    }
+
+
+async def _run(
+    app, clients: int, requests: int, terms: List[str]
+) -> Dict[str, List[float]]:
+    rng = random.Random(0)
+    endpoints = _endpoints(rng, terms)
+    latencies: Dict[str, List[float]] = {name: [] for name in endpoints}
+    errors: Dict[str, int] = {name: 0 for name in endpoints}
+
+    transport = httpx.ASGITransport(app=app)
+    async with app.router.lifespan_context(app), httpx.AsyncClient(
+        transport=transport, base_url="http://bench", follow_redirects=True
+    ) as client:
+        # Warm up the caches and the daily verse
+        for url in endpoints.values():
+            await client.get(url())
+        await asyncio.sleep(0.5)
+
+        for name, url in endpoints.items():
+            remaining = requests
+
+            async def worker():
+                nonlocal remaining
+                while remaining > 0:
+                    remaining -= 1
+                    started = time.perf_counter()
+                    response = await client.get(url())
+                    latencies[name].append(time.perf_counter() - started)
+                    errors[name] += response.status_code >= 400
+
+            started = time.perf_counter()
+            await asyncio.gather(*(worker() for _ in range(clients)))
+            elapsed = time.perf_counter() - started
+            latencies[name].append(elapsed)  # last item is the wall time
+
+    for name, count in errors.items():
+        if count:
+            print(f"{name}: {count} error response(s)", file=sys.stderr)
+    return latencies
+
+
+def _report(latencies: Dict[str, List[float]]) -> Dict[str, float]:
+    results = {}
+    print(
+        f"{'endpoint':<14}{'requests':>9}{'req/s':>10}"
+        f"{'p50 ms':>9}{'p95 ms':>9}{'p99 ms':>9}"
+    )
+    for name, values in latencies.items():
+        *values, wall = values
+        cuts = statistics.quantiles(values, n=100)
+        p50, p95, p99 = (1000 * cuts[i] for i in (49, 94, 98))
+        print(
+            f"{name:<14}{len(values):>9}{len(values) / wall:>10.0f}"
+            f"{p50:>9.2f}{p95:>9.2f}{p99:>9.2f}"
+        )
+        results.update({f"{name} p50": p50, f"{name} p95": p95})
+        results[f"{name} p99"] = p99
+    return results
+
+
+def main() -> int:
+    """Run the load test"""
+    parser = argparse.ArgumentParser(prog="python -m benchmarks.bench_load")
+    parser.add_argument("--clients", type=int, default=16)
+    parser.add_argument("--requests", type=int, default=500)
+    parser.add_argument("--save", metavar="BASELINE")
+    parser.add_argument("--check", metavar="BASELINE")
+    parser.add_argument("--tolerance", type=float, default=0.5)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as directory:
+        # The database is configured before the application is imported
+        database = os.path.join(directory, "bench.SQLite3")
+        os.environ["DATABASE_URL"] = f"sqlite+aiosqlite:///{database}"
+        os.environ["DAILY_VERSE_FILE"] = os.path.join(directory, "dv.json")
+
+        # pylint: disable=import-outside-toplevel
+        from benchmarks.corpus import SEARCH_TERMS, build_corpus
+        from biblebee_api.app import create_app
+
+        build_corpus(
+            database,
+            revisions=REVISIONS,
+            books=BOOKS,
+            chapters=CHAPTERS,
+            verses=VERSES,
+        )
+        logging.disable(logging.WARNING)
+        before = baseline.calibrate()
+        latencies = asyncio.run(
+            _run(create_app(), args.clients, args.requests, SEARCH_TERMS)
+        )
+
+    results = _report(latencies)
+    # Calibrated around the run to follow the drift of the host
+    unit = statistics.mean((before, baseline.calibrate())) * 1e3
+    # The p99 of a few hundred requests is too noisy to be checked
+    ratios = {
+        name: value / unit
+        for name, value in results.items()
+        if not name.endswith(" p99")
+    }
+    if args.save:
+        baseline.save(args.save, ratios)
+    if args.check:
+        slower = baseline.regressions(args.check, ratios, args.tolerance)
+        for regression in slower:
+            print(f"REGRESSION {regression}", file=sys.stderr)
+        return 1 if slower else 0
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,95 @@
+"""
+Micro-benchmarks of the request parsing and the response encoding.
+
+Every case is timed with `timeit`, keeping the best of several repeats,
+and reported in microseconds per call along with its ratio to the
+calibration workload of `benchmarks.baseline`, which the baselines store.
+
+```sh
+python -m benchmarks.bench_micro
+python -m benchmarks.bench_micro --save     # store the baseline
+python -m benchmarks.bench_micro --check    # fail on regressions
+```
+"""
+
+import argparse
+import sys
+from collections import namedtuple
+from typing import Callable, Dict
+
+from benchmarks import baseline
+from biblebee_api.schema.bible_schema import VerseOut
+from biblebee_api.schema.encoders import encode_verses
+from biblebee_api.service.verse_parser import (
+    GrammaticLexicalParser,
+    parse_bible_verse,
+    parse_verse_ranges,
+)
+
+SUITE = "micro"
+
+QUERY = "150:10-12,14-16,18,20,2:10-12,13-14,3:15"
+
+Row = namedtuple(
+    "Row", ("book_version_code", "book_number", "chapter", "verse", "text")
+)
+
+ROWS = [
+    Row("SUV", 10, 1 + i // 50, 1 + i % 50, f"Verse {i} " + "neno " * 20)
+    for i in range(500)
+]
+
+
+def _pydantic_verses() -> bytes:
+    """The 500 rows validated and dumped through `VerseOut`"""
+    return b",".join(
+        VerseOut.model_validate(row._asdict()).model_dump_json().encode()
+        for row in ROWS
+    )
+
+
+def _parse() -> Dict[int, list]:
+    parser = GrammaticLexicalParser()
+    parser.parse(QUERY)
+    return parser.get_result()
+
+
+CASES: Dict[str, Callable[[], object]] = {
+    "parse_bible_verse": lambda: parse_bible_verse("1-3,5,8-20"),
+    "parse_verse_ranges uncached": lambda: parse_verse_ranges.__wrapped__(
+        QUERY
+    ),
+    "parse_verse_ranges cached": lambda: parse_verse_ranges(QUERY),
+    "GrammaticLexicalParser": _parse,
+    "encode_verses 500": lambda: encode_verses(ROWS),
+    "VerseOut 500": _pydantic_verses,
+}
+
+
+def main() -> int:
+    """Run the micro-benchmarks"""
+    parser = argparse.ArgumentParser(prog="python -m benchmarks.bench_micro")
+    parser.add_argument("--save", action="store_true")
+    parser.add_argument("--check", action="store_true")
+    parser.add_argument("--tolerance", type=float, default=0.5)
+    args = parser.parse_args()
+
+    ratios = {}
+    for name, case in CASES.items():
+        best, ratios[name] = baseline.relative_time(case)
+        print(f"{name:<30}{best * 1e6:>12.2f} us{ratios[name]:>12.4g}")
+
+    if args.save:
+        baseline.save(baseline.path(SUITE), ratios)
+    if args.check:
+        slower = baseline.regressions(
+            baseline.path(SUITE), ratios, args.tolerance
+        )
+        for regression in slower:
+            print(f"REGRESSION {regression}", file=sys.stderr)
+        return 1 if slower else 0
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
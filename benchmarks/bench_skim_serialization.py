@@ -0,0 +1,89 @@
+"""
+Benchmark of the skim response path.
+
+Compares the former path (ORM entities, `jsonable_encoder`, `VerseOut`
+validation and `JSONResponse`) against plain column rows encoded once,
+on a skim of 500 verses.
+
+```sh
+python -m benchmarks.bench_skim_serialization
+```
+"""
+
+import timeit
+
+from fastapi.encoders import jsonable_encoder
+from fastapi.responses import JSONResponse
+from sqlalchemy import create_engine, insert, select
+from sqlalchemy.orm import Session
+
+from biblebee_api.model.bible_model import Verse, mapper_registry
+from biblebee_api.schema.bible_schema import VerseOut
+from biblebee_api.schema.encoders import encode_verses
+
+VERSES = 500
+
+
+def _session() -> Session:
+    engine = create_engine("sqlite://")
+    mapper_registry.metadata.create_all(engine)
+    session = Session(engine)
+    session.execute(
+        insert(Verse),
+        [
+            {
+                "book_version_code": "SUV",
+                "book_number": 10,
+                "chapter": 1 + i // 50,
+                "verse": 1 + i % 50,
+                "text": f"Verse {i} " + "neno " * 20,
+            }
+            for i in range(VERSES)
+        ],
+    )
+    session.commit()
+    return session
+
+
+def orm_path(session: Session) -> bytes:
+    """Skim as ORM entities serialized through pydantic"""
+    contents = session.execute(select(Verse)).scalars().all()
+    response = JSONResponse(
+        {
+            "data": [
+                VerseOut.model_validate(part).model_dump()
+                for part in jsonable_encoder(contents)
+            ]
+        }
+    )
+    session.expunge_all()
+    return response.body
+
+
+def rows_path(session: Session) -> bytes:
+    """Skim as plain column rows encoded once"""
+    contents = session.execute(
+        select(
+            Verse.book_version_code,
+            Verse.book_number,
+            Verse.chapter,
+            Verse.verse,
+            Verse.text,
+        )
+    ).all()
+    return encode_verses(contents)
+
+
+def main():
+    """Run the benchmark and print the timings per skim"""
+    session = _session()
+    for name, path in (("orm", orm_path), ("rows", rows_path)):
+        runs, _ = timeit.Timer(lambda p=path: p(session)).autorange()
+        best = min(
+            timeit.repeat(lambda p=path: p(session), number=runs, repeat=5)
+        )
+        print(f"{name:>5}: {best / runs * 1e3:8.3f} ms per {VERSES} verses")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,75 @@
+"""
+Benchmark of the statements of the verse lookups.
+
+Compares a single verse lookup through a statement built on every call,
+as the repository used to, against the statement prebuilt once by
+`bibles_repo`. Building a statement costs its construction and the
+computation of its cache key, and compiling it when the cache misses.
+
+```sh
+python -m benchmarks.bench_statements
+```
+"""
+
+import timeit
+
+from sqlalchemy import create_engine, insert, select
+from sqlalchemy.orm import Session
+
+from biblebee_api.model.bible_model import Verse, mapper_registry
+from biblebee_api.repo import bibles_repo
+
+PARAMS = {"book_number": 10, "chapter": 3, "verse": 16, "revisions": ["SUV"]}
+
+
+def _session() -> Session:
+    engine = create_engine("sqlite://")
+    mapper_registry.metadata.create_all(engine)
+    session = Session(engine)
+    session.execute(
+        insert(Verse),
+        [
+            {
+                "book_version_code": "SUV",
+                "book_number": 10,
+                "chapter": 1 + i // 50,
+                "verse": 1 + i % 50,
+                "text": f"Verse {i} " + "neno " * 20,
+            }
+            for i in range(500)
+        ],
+    )
+    session.commit()
+    return session
+
+
+def _built():
+    """The lookup statement built on every call"""
+    # pylint: disable-next=protected-access
+    return select(*bibles_repo._VERSE_COLUMNS).filter(
+        Verse.book_number == PARAMS["book_number"],
+        Verse.chapter == PARAMS["chapter"],
+        Verse.verse == PARAMS["verse"],
+        Verse.book_version_code.in_(PARAMS["revisions"]),
+    )
+
+
+def main():
+    """Run the benchmark and print the timings per lookup"""
+    session = _session()
+    dialect = session.get_bind().dialect
+    prebuilt = bibles_repo._VERSE[True]  # pylint: disable=protected-access
+
+    cases = {
+        "compile only": lambda: _built().compile(dialect=dialect),
+        "built, cached": lambda: session.execute(_built()).all(),
+        "prebuilt": lambda: session.execute(prebuilt, PARAMS).all(),
+    }
+    for name, case in cases.items():
+        runs, _ = timeit.Timer(case).autorange()
+        best = min(timeit.repeat(case, number=runs, repeat=5))
+        print(f"{name:>16}: {best / runs * 1e6:8.1f} us per lookup")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,95 @@
+"""
+Synthetic corpus for the benchmarks.
+
+Builds MyBible modules of made up revisions in memory and loads them with
+the bulk importer into an SQLite file, so the benchmarks run without the
+shipped database.
+"""
+
+import random
+import sqlite3
+
+from sqlalchemy import create_engine
+
+from biblebee_api.importer import import_revision
+from biblebee_api.migrations import migrate
+from biblebee_api.model.bible_model import mapper_registry
+
+REVISIONS = ("SUV", "KJV", "NEN")
+
+# Made up vocabulary whose word frequencies follow Zipf's law
+_WORDS = [
+    "".join(random.Random(i).choices("aeioubkmnstwlgdhy", k=2 + i % 7))
+    for i in range(5000)
+]
+_WEIGHTS = [1 / rank for rank in range(1, len(_WORDS) + 1)]
+
+# Words of medium frequency, suitable for searching
+SEARCH_TERMS = _WORDS[50:60]
+
+
+def _module(
+    books: int, chapters: int, verses: int, seed: int
+) -> sqlite3.Connection:
+    """A MyBible module with made up verses"""
+    rng = random.Random(seed)
+    module = sqlite3.connect(":memory:")
+    module.executescript(
+        "CREATE TABLE info (name TEXT, value TEXT);"
+        "CREATE TABLE books (book_number INTEGER, short_name TEXT, "
+        "long_name TEXT, book_color TEXT);"
+        "CREATE TABLE verses (book_number INTEGER, chapter INTEGER, "
+        "verse INTEGER, text TEXT);"
+        "INSERT INTO info VALUES ('language', 'sw'), ('year', '2000');"
+    )
+    module.executemany(
+        "INSERT INTO books VALUES (?, ?, ?, '#ffffff')",
+        [(10 * b, f"B{b}", f"Book {b}") for b in range(1, books + 1)],
+    )
+    module.executemany(
+        "INSERT INTO verses VALUES (?, ?, ?, ?)",
+        (
+            (10 * b, c, v, " ".join(rng.choices(_WORDS, _WEIGHTS, k=24)))
+            for b in range(1, books + 1)
+            for c in range(1, chapters + 1)
+            for v in range(1, verses + 1)
+        ),
+    )
+    return module
+
+
+def build_corpus(
+    path: str,
+    revisions=REVISIONS,
+    books: int = 66,
+    chapters: int = 20,
+    verses: int = 30,
+    daily_verses: int = 200,
+):
+    """Create the database `path` holding the synthetic `revisions`"""
+    engine = create_engine(f"sqlite:///{path}")
+    with engine.begin() as conn:
+        mapper_registry.metadata.create_all(conn)
+        migrate(conn)
+        for seed, revision in enumerate(revisions):
+            import_revision(
+                conn, _module(books, chapters, verses, seed), revision
+            )
+        rng = random.Random(0)
+        conn.exec_driver_sql(
+            "INSERT INTO daily_verses (tags, book_number, chapter, "
+            "verse_start, verse_end) VALUES (?, ?, ?, ?, ?)",
+            [
+                (
+                    ",".join(rng.sample(["faith", "love", "hope"], 2)),
+                    10 * rng.randint(1, books),
+                    rng.randint(1, chapters),
+                    start,
+                    start + rng.randint(0, 3),
+                )
+                for start in (
+                    rng.randint(1, verses - 3) for _ in range(daily_verses)
+                )
+            ],
+        )
+    engine.dispose()
@@ -8,16 +8,27 @@ such as daily verse registrations and whitelist/blacklist
 devices which should receive notifications
 """
 
-from typing import Annotated
-from fastapi import APIRouter, Depends
-from fastapi.responses import JSONResponse
+import asyncio
+from typing import Annotated, List
+from fastapi import APIRouter, Depends, Header, HTTPException
+from fastapi.concurrency import run_in_threadpool
+from fastapi.responses import JSONResponse, PlainTextResponse
 
-from biblebee_api.repo.devices_repo import DevicesRepo
-from biblebee_api.schema.bible_schema import DataResponse, DeviceIn, DeviceOut
-from biblebee_api.worker import generate_daily_verse
+from biblebee_api.database import pool_stats
+from biblebee_api.schema.bible_schema import (
+    DataResponse,
+    DeviceIn,
+    DevicesAcceptedOut,
+)
+from biblebee_api.service import profiler
+from biblebee_api.service.device_writer import DeviceWriter
+from biblebee_api.worker import celery, generate_daily_verse
 
 router = APIRouter()
 
+# Maximum number of devices of a batch registration
+DEVICES_BATCH_SIZE = 10000
+
 
 # An api to trigger daily bible verse generation
 @router.get("/dailyverse")
@@ -27,11 +38,79 @@ async def daily_verse():
     return JSONResponse({"task_id": task.id})
 
 
-@router.post("/devices")
+@router.post("/devices", status_code=202)
 async def add_notification_device(
     dev: DeviceIn,
-    repo: Annotated[DevicesRepo, Depends(DevicesRepo.request_scoped)],
-) -> DataResponse[DeviceOut]:
+    writer: Annotated[DeviceWriter, Depends(DeviceWriter.request_scoped)],
+) -> DataResponse[DevicesAcceptedOut]:
     """Add new notification device to the list of allowed devices."""
-    saved_device = await repo.save(dev)
-    return JSONResponse({"data": saved_device.model_dump()})
+    return await _accept_devices(writer, [dev])
+
+
+@router.post("/devices:batch", status_code=202)
+async def add_notification_devices(
+    devices: List[DeviceIn],
+    writer: Annotated[DeviceWriter, Depends(DeviceWriter.request_scoped)],
+) -> DataResponse[DevicesAcceptedOut]:
+    """Add or update many notification devices at once."""
+    if len(devices) > DEVICES_BATCH_SIZE:
+        return JSONResponse(
+            f"At most {DEVICES_BATCH_SIZE} devices per batch", status_code=413
+        )
+    return await _accept_devices(writer, devices)
+
+
+async def _accept_devices(writer: DeviceWriter, devices: List[DeviceIn]):
+    """Hand the devices over to the write-behind buffer"""
+    try:
+        await writer.submit(devices)
+    except asyncio.TimeoutError:
+        return JSONResponse(
+            "Too many pending registrations",
+            status_code=503,
+            headers={"Retry-After": "1"},
+        )
+    return JSONResponse(
+        {"data": {"received": len(devices), "pending": writer.pending}},
+        status_code=202,
+    )
+
+
+@router.get("/pool")
+async def get_pool_stats():
+    """Checkout statistics of the database connection pools"""
+    return {"data": pool_stats()}
+
+
+@router.get("/tasks")
+async def get_task_latency():
+    """Latency statistics of the tasks of the running workers"""
+    replies = await run_in_threadpool(
+        celery.control.broadcast, "task_latency", reply=True, timeout=1.0
+    )
+    return {"data": {k: v for reply in replies for k, v in reply.items()}}
+
+
+def _profiler_token(x_profile_token: str = Header("")):
+    """The profiles expose the code, hence the profiler token is required"""
+    if not profiler.authorized(x_profile_token):
+        raise HTTPException(status_code=403, detail="Invalid profiler token")
+
+
+@router.get("/profiles", dependencies=[Depends(_profiler_token)])
+async def get_profiles():
+    """Names of the kept request profiles, newest first"""
+    return {"data": await run_in_threadpool(profiler.list_profiles)}
+
+
+@router.get(
+    "/profiles/{name}",
+    response_class=PlainTextResponse,
+    dependencies=[Depends(_profiler_token)],
+)
+async def get_profile(name: str):
+    """A request profile in the collapsed stack format of flamegraphs"""
+    try:
+        return await run_in_threadpool(profiler.read_profile, name)
+    except LookupError:
+        return JSONResponse("Profile not found", status_code=404)
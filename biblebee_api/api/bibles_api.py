@@ -1,41 +1,74 @@
 """A module for managing bible books."""
 
-from typing import Annotated, Dict, List
-from fastapi import APIRouter, Depends, Query
-from fastapi.encoders import jsonable_encoder
-from fastapi.responses import JSONResponse
+from typing import AsyncIterator, Annotated, List
+from fastapi import APIRouter, Depends, Query, Request, Response
+from fastapi.responses import (
+    JSONResponse,
+    RedirectResponse,
+    StreamingResponse,
+)
 
 from biblebee_api.repo.bibles_repo import BiblesRepo
-from biblebee_api.schema.bible_schema import BookOut, DataResponse, VerseOut
+from biblebee_api.schema.bible_schema import (
+    BookOut,
+    DataResponse,
+    ParallelVersesOut,
+    VerseOut,
+)
+from biblebee_api.schema.encoders import (
+    encode_parallel_verses,
+    encode_verse_lines,
+    encode_verses,
+)
 from biblebee_api.service import verse_parser
+from biblebee_api.service.parallel_view import align_revisions
+from biblebee_api.service.response_cache import (
+    cache,
+    chapter_cache,
+    revisions_key,
+)
 
 router = APIRouter()
-parser = verse_parser.GrammaticLexicalParser()
+
+# Cache-Control of the responses which never change under their URL
+IMMUTABLE = "public, max-age=31536000, immutable"
 
 
 async def parse_verse_notation(
     query_expression: str | None = None,
-) -> Dict[int, List[int]]:
-    """Parse query string params and produce a dictionary of verses"""
-    parser.parse(query_expression)
-    return parser.get_result()
+) -> verse_parser.VerseRanges:
+    """Parse query string params and produce verse intervals per chapter"""
+    return verse_parser.parse_verse_ranges(query_expression or "")
+
+
+async def _ndjson_lines(batches) -> AsyncIterator[bytes]:
+    """Encode batches of verse rows into NDJSON chunks"""
+    async for batch in batches:
+        yield encode_verse_lines(batch)
 
 
 @router.get("/")
 async def get_books(
+    request: Request,
     revesions: List[str] = Query(["SUV"]),
     repo: BiblesRepo = Depends(BiblesRepo.request_scoped),
 ) -> DataResponse[List[BookOut]]:
     """List down a list of all the bible books. You must specify revisions `revisions`"""
-    books = await repo.find_all(versions=revesions)
-    return {"data": [BookOut.model_validate(book) for book in books]}
+
+    async def build():
+        books = await repo.find_all(versions=revesions)
+        return {"data": [BookOut.model_validate(book) for book in books]}
+
+    return await cache.respond(
+        request, ("books", revisions_key(revesions)), build, repo.async_session
+    )
 
 
 @router.get("/{book_number}/skim")
 async def skim_book_content(
     book_number: int,
     parts: Annotated[
-        Dict[int, List[int]],
+        verse_parser.VerseRanges,
         Depends(parse_verse_notation),
     ],
     revirsions: List[str] = Query(["SUV"]),
@@ -46,17 +79,118 @@ async def skim_book_content(
 
     Parameters:
     - `book_number` (int): The number of the Bible book to retrieve content from.
-    - `select` (Dict[int, List[int]]): A dictionary specifying the chapters and verses to skim.
+    - `query_expression` (str): The chapters and verses to skim e.g., `1:1-5,7 2:3`.
     - `revirsions` (List[str]): Optional parameter to specify Bible revisions (default is "SUV").
     """
     contents = await repo.skim_book_content(
         book_number=book_number, parts=parts, revirsions=revirsions
     )
-    return JSONResponse(
-        {
-            "data": [
-                VerseOut.model_validate(part).model_dump()
-                for part in jsonable_encoder(contents)
-            ]
-        }
+    return Response(encode_verses(contents), media_type="application/json")
+
+
+@router.get("/{book_number}/parallel")
+async def get_parallel_verses(
+    book_number: int,
+    parts: Annotated[
+        verse_parser.VerseRanges,
+        Depends(parse_verse_notation),
+    ],
+    revisions: List[str] = Query(["SUV", "KJV"]),
+    repo: BiblesRepo = Depends(BiblesRepo.request_scoped),
+) -> DataResponse[ParallelVersesOut]:
+    """
+    Retrieve verses of several revisions side by side.
+
+    Parameters:
+    - `book_number` (int): The number of the Bible book to retrieve content from.
+    - `query_expression` (str): The chapters and verses to skim e.g., `1:1-5,7 2:3`.
+    - `revisions` (List[str]): The revisions of the columns, in order.
+    """
+    revisions = list(dict.fromkeys(revisions))
+    contents = await repo.skim_book_content(
+        book_number=book_number, parts=parts, revirsions=revisions
+    )
+    verses = align_revisions(contents, revisions)
+    return Response(
+        encode_parallel_verses(revisions, verses),
+        media_type="application/json",
     )
+
+
+@router.get("/export")
+async def export_revisions(
+    revisions: List[str] = Query(["SUV"]),
+    repo: BiblesRepo = Depends(BiblesRepo.request_scoped),
+):
+    """
+    Stream every verse of the `revisions` as newline delimited JSON,
+    ordered by revision, book, chapter and verse.
+    """
+    return StreamingResponse(
+        _ndjson_lines(repo.stream_verses(revisions=revisions)),
+        media_type="application/x-ndjson",
+    )
+
+
+@router.get("/{book_number}/export")
+async def export_book(
+    book_number: int,
+    revisions: List[str] = Query(["SUV"]),
+    repo: BiblesRepo = Depends(BiblesRepo.request_scoped),
+):
+    """
+    Stream every verse of the book as newline delimited JSON,
+    ordered by revision, chapter and verse.
+    """
+    return StreamingResponse(
+        _ndjson_lines(
+            repo.stream_verses(revisions=revisions, book_number=book_number)
+        ),
+        media_type="application/x-ndjson",
+    )
+
+
+@router.get("/{revision}/{book_number}/{chapter}")
+async def get_chapter(
+    request: Request,
+    revision: str,
+    book_number: int,
+    chapter: int,
+    v: int | None = None,
+    repo: BiblesRepo = Depends(BiblesRepo.request_scoped),
+) -> DataResponse[List[VerseOut]]:
+    """
+    Retrieve a whole chapter of a revision.
+
+    The URL is versioned by the corpus version stamp `v`: requests of any
+    other version are redirected to the current one, whose response never
+    changes and may be cached by the clients and any proxy in front of
+    the API.
+    """
+    stamp = await chapter_cache.stamp(repo.async_session)
+    if v != stamp:
+        return RedirectResponse(
+            str(request.url.include_query_params(v=stamp)),
+            headers={"Cache-Control": "no-cache"},
+        )
+
+    async def build():
+        contents = await repo.skim_book_content(
+            book_number=book_number,
+            parts={chapter: ()},
+            revirsions=[revision],
+        )
+        if not contents:
+            raise LookupError(f"{revision} {book_number}:{chapter}")
+        return encode_verses(contents)
+
+    try:
+        return await chapter_cache.respond(
+            request,
+            (revision, book_number, chapter),
+            build,
+            repo.async_session,
+            cache_control=IMMUTABLE,
+        )
+    except LookupError:
+        return JSONResponse("Chapter not found", status_code=404)
@@ -1,8 +1,9 @@
 """Statistics APIs for the bibles"""
 
 from typing import List
-from fastapi import APIRouter, Depends, Query
+from fastapi import APIRouter, Depends, Query, Request
 from biblebee_api.repo.bibles_repo import BiblesRepo
+from biblebee_api.service.response_cache import cache, revisions_key
 
 
 router = APIRouter()
@@ -11,19 +12,85 @@ router = APIRouter()
 ## Books level stats
 @router.get("/books")
 async def get_books_count_by_revisions(
+    request: Request,
     revisions: List[str] = Query(["SUV"]),
     bibles_repo: BiblesRepo = Depends(BiblesRepo.request_scoped),
 ):
     """Get books count by `revisions` in the querystring params"""
-    cnts = await bibles_repo.get_books_count_by_revisions(revisions=revisions)
-    return {"data": cnts}
+
+    async def build():
+        cnts = await bibles_repo.get_books_count_by_revisions(
+            revisions=revisions
+        )
+        return {"data": cnts}
+
+    return await cache.respond(
+        request,
+        ("stats/books", revisions_key(revisions)),
+        build,
+        bibles_repo.async_session,
+    )
 
 
 @router.get("/verses")
 async def get_verses_count_by_revisions(
+    request: Request,
     revisions: List[str] = Query(["SUV"]),
     bibles_repo: BiblesRepo = Depends(BiblesRepo.request_scoped),
 ):
     """Get verses count by `revisions` in the querystring params"""
-    cnts = await bibles_repo.get_verse_counts_by_revisions(revisions=revisions)
-    return {"data": cnts}
+
+    async def build():
+        cnts = await bibles_repo.get_verse_counts_by_revisions(
+            revisions=revisions
+        )
+        return {"data": cnts}
+
+    return await cache.respond(
+        request,
+        ("stats/verses", revisions_key(revisions)),
+        build,
+        bibles_repo.async_session,
+    )
+
+
+@router.get("/books/{book_number}")
+async def get_book_stats(
+    request: Request,
+    book_number: int,
+    revisions: List[str] = Query(["SUV"]),
+    bibles_repo: BiblesRepo = Depends(BiblesRepo.request_scoped),
+):
+    """Get chapters, verses, words and characters counts of a book"""
+
+    async def build():
+        stats = await bibles_repo.get_book_stats(book_number, revisions)
+        return {"data": stats}
+
+    return await cache.respond(
+        request,
+        ("stats/book", book_number, revisions_key(revisions)),
+        build,
+        bibles_repo.async_session,
+    )
+
+
+@router.get("/books/{book_number}/chapters")
+async def get_chapter_stats(
+    request: Request,
+    book_number: int,
+    revisions: List[str] = Query(["SUV"]),
+    bibles_repo: BiblesRepo = Depends(BiblesRepo.request_scoped),
+):
+    """Get verses, words and characters counts of every chapter of a book"""
+
+    async def build():
+        stats = await bibles_repo.get_chapter_stats(book_number, revisions)
+        return {"data": stats}
+
+    return await cache.respond(
+        request,
+        ("stats/chapters", book_number, revisions_key(revisions)),
+        build,
+        bibles_repo.async_session,
+    )
@@ -0,0 +1,19 @@
+"""Monitoring APIs"""
+
+from fastapi import APIRouter
+from fastapi.concurrency import run_in_threadpool
+from fastapi.responses import PlainTextResponse
+
+from biblebee_api.service import metrics
+
+router = APIRouter()
+
+# Content type of the Prometheus text exposition format
+CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+
+
+@router.get("", response_class=PlainTextResponse)
+async def get_metrics():
+    """Request metrics of all the workers in the Prometheus text format"""
+    content = await run_in_threadpool(lambda: metrics.collect().render())
+    return PlainTextResponse(content, media_type=CONTENT_TYPE)
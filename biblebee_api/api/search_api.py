@@ -0,0 +1,36 @@
+"""Full-text search APIs for the bibles"""
+
+from typing import List
+from fastapi import APIRouter, Depends, Query
+from fastapi.responses import JSONResponse
+
+from biblebee_api.repo.search_repo import SearchRepo
+from biblebee_api.schema.bible_schema import PageResponse, SearchHitOut
+
+router = APIRouter()
+
+
+@router.get("")
+async def search_verses(
+    q: str = Query(..., min_length=1, max_length=256),
+    revisions: List[str] = Query(["SUV"]),
+    limit: int = Query(20, ge=1, le=100),
+    cursor: str | None = None,
+    repo: SearchRepo = Depends(SearchRepo.request_scoped),
+) -> PageResponse[List[SearchHitOut]]:
+    """
+    Search verses by their text, best matches first.
+
+    Parameters:
+    - `q` (str): The words to search for. The last word is matched as a prefix.
+    - `revisions` (List[str]): Bible revisions to search in (default is "SUV").
+    - `limit` (int): The maximum number of hits in a page.
+    - `cursor` (str): The `next_cursor` of the previous page.
+    """
+    try:
+        hits, next_cursor = await repo.search(
+            query=q, revisions=revisions, limit=limit, cursor=cursor
+        )
+    except ValueError:
+        return JSONResponse("Invalid cursor", status_code=400)
+    return {"data": hits, "next_cursor": next_cursor}
@@ -1,43 +1,72 @@
 """Application module"""
 
-from contextlib import asynccontextmanager
-from fastapi import FastAPI, Request, Response
+import asyncio
+import logging
+import os
+from contextlib import asynccontextmanager, suppress
+from fastapi import FastAPI
 
 from biblebee_api.api import adm_api
 from biblebee_api.api import bibles_api
 from biblebee_api.api import bibles_stats_api
 from biblebee_api.api import daily_verses_api
-from biblebee_api.database import async_session_manager, init_tables
-from biblebee_api.service import cloud_messaging
+from biblebee_api.api import metrics_api
+from biblebee_api.api import search_api
+from biblebee_api.database import async_session, init_tables, read_session
+from biblebee_api.repo import corpus_snapshot, corpus_store
+from biblebee_api.repo.bibles_repo import warm_statements
+from biblebee_api.repo.devices_repo import DevicesRepo
+from biblebee_api.service import cloud_messaging, metrics, profiler
+from biblebee_api.service.device_writer import DeviceWriter
+
+# Level of the logs of the api, debug logs are off unless asked for
+LOG_LEVEL = os.environ.get("LOG_LEVEL", "INFO").upper()
 
 
 # Lifespan is used to handle heavy resource initialization
 @asynccontextmanager
-async def lifespan(_: FastAPI):
+async def lifespan(app: FastAPI):
     """Initialize resources to be utilized by the api"""
+    publisher = None
     try:
         await init_tables()
+        await warm_statements(read_session)
+        corpus = None
+        if corpus_snapshot.CORPUS_SNAPSHOT:
+            corpus = await corpus_snapshot.open_snapshot(
+                corpus_snapshot.CORPUS_SNAPSHOT, read_session
+            )
+        if corpus is None and corpus_store.CORPUS_IN_MEMORY:
+            corpus = await corpus_store.load(read_session)
+        app.state.corpus = corpus
+        app.state.device_writer = DeviceWriter(
+            DevicesRepo(async_session=async_session).save_all
+        )
+        app.state.device_writer.start()
         cloud_messaging.init()
+        if metrics.METRICS_DIR:
+            publisher = asyncio.create_task(
+                metrics.publish_periodically(metrics.METRICS_DIR)
+            )
         yield
     finally:
         # teardown resources.
-        pass
+        if hasattr(app.state, "device_writer"):
+            await app.state.device_writer.close()
+        if publisher is not None:
+            publisher.cancel()
+            with suppress(asyncio.CancelledError):
+                await publisher
+            metrics.unpublish(metrics.METRICS_DIR)
 
 
 def create_app():
     """Create and return an application to be deployed"""
+    logging.basicConfig(level=LOG_LEVEL)
     app = FastAPI(title="BiblebeeApi", lifespan=lifespan)
-
-    @app.middleware("http")
-    async def _db_session_middleware(request: Request, call_next):
-        response = Response("Internal Server Error", status_code=500)
-        async with async_session_manager() as manager:
-            request.state.async_session = manager
-            try:
-                response = await call_next(request)
-            finally:
-                pass
-            return response
+    app.add_middleware(metrics.MetricsMiddleware)
+    if profiler.enabled():
+        app.add_middleware(profiler.ProfilerMiddleware)
 
     # Register APIs
 
@@ -63,4 +92,16 @@ def create_app():
         tags=["Daily Bible Verse"],
     )
 
+    app.include_router(
+        router=search_api.router,
+        prefix="/api/v1/search",
+        tags=["Search"],
+    )
+
+    app.include_router(
+        router=metrics_api.router,
+        prefix="/metrics",
+        tags=["Monitoring"],
+    )
+
     return app
@@ -0,0 +1,66 @@
+"""Precomputed statistics of the bible revisions.
+
+description:
+-----------
+Counts of the chapters, verses, words and characters of every chapter,
+book and revision are computed once when a revision is loaded, so that
+the statistics APIs are primary key lookups into `corpus_stats`.
+"""
+
+import logging
+
+from sqlalchemy import Connection, text
+
+logger = logging.getLogger(__name__)
+
+# Words are approximated by the spaces separating them
+_WORDS = (
+    "CASE WHEN trim(text) = '' THEN 0 ELSE "
+    "length(trim(text)) - length(replace(trim(text), ' ', '')) + 1 END"
+)
+
+_REFRESH_STATEMENTS = (
+    "DELETE FROM corpus_stats WHERE version_code = :revision",
+    # Chapters
+    "INSERT INTO corpus_stats (version_code, book_number, chapter, books, "
+    "chapters, verses, words, characters) "
+    "SELECT book_version_code, book_number, chapter, 1, 1, count(*), "
+    f"sum({_WORDS}), sum(length(text)) FROM verses "
+    "WHERE book_version_code = :revision GROUP BY book_number, chapter",
+    # Books
+    "INSERT INTO corpus_stats (version_code, book_number, chapter, books, "
+    "chapters, verses, words, characters) "
+    "SELECT version_code, book_number, 0, 1, count(*), sum(verses), "
+    "sum(words), sum(characters) FROM corpus_stats "
+    "WHERE version_code = :revision AND chapter > 0 GROUP BY book_number",
+    # Revision, summed from its books so that revisions imported without
+    # a row in bible_versions get one too
+    "INSERT INTO corpus_stats (version_code, book_number, chapter, books, "
+    "chapters, verses, words, characters) "
+    "SELECT * FROM ("
+    "SELECT :revision, 0, 0, "
+    "(SELECT count(*) FROM books WHERE version_code = :revision) AS books, "
+    "coalesce(sum(chapters), 0), coalesce(sum(verses), 0) AS verses, "
+    "coalesce(sum(words), 0), coalesce(sum(characters), 0) "
+    "FROM corpus_stats "
+    "WHERE version_code = :revision AND book_number > 0 AND chapter = 0"
+    ") WHERE books > 0 OR verses > 0 OR EXISTS ("
+    "SELECT 1 FROM bible_versions WHERE version_code = :revision)",
+)
+
+
+def refresh_corpus_stats(conn: Connection, revision: str):
+    """Recompute the statistics of the `revision`"""
+    for statement in _REFRESH_STATEMENTS:
+        conn.execute(text(statement), {"revision": revision})
+    logger.info("Refreshed the statistics of %s", revision)
+
+
+def refresh_all_corpus_stats(conn: Connection):
+    """Recompute the statistics of every revision"""
+    revisions = conn.exec_driver_sql(
+        "SELECT version_code FROM bible_versions "
+        "UNION SELECT DISTINCT book_version_code FROM verses"
+    ).scalars()
+    for revision in revisions.all():
+        refresh_corpus_stats(conn, revision)
@@ -1,34 +1,159 @@
 """A module to handle database connectivity / SQLite"""
 
 import logging
+import os
+import time
 from typing import AsyncContextManager
 from contextlib import asynccontextmanager
+
+from sqlalchemy import event
 from sqlalchemy.ext.asyncio import (
     create_async_engine,
     async_sessionmaker,
     AsyncSession,
 )
+from sqlalchemy.pool import AsyncAdaptedQueuePool
 
-from biblebee_api.model.bible_model import mapper_registry
+from biblebee_api.migrations import check_query_plans, create_schema
+from biblebee_api.service import metrics
 
-# Configure logger
-logging.basicConfig(level=logging.DEBUG)
 logger = logging.getLogger(__name__)
 
 # Define the database URL
-SQLALCHEMY_DATABASE_URL = "sqlite+aiosqlite:///./resource/SUV.SQLite3"
+SQLALCHEMY_DATABASE_URL = os.environ.get(
+    "DATABASE_URL", "sqlite+aiosqlite:///./resource/SUV.SQLite3"
+)
+
+# Number of pooled read-only connections
+DB_READ_POOL_SIZE = int(os.environ.get("DB_READ_POOL_SIZE", "4"))
+
+# Pragmas of every connection
+_PRAGMAS = (
+    "PRAGMA journal_mode = WAL",
+    "PRAGMA synchronous = NORMAL",
+    "PRAGMA busy_timeout = 5000",
+)
+
+# Pragmas of the read-only connections
+_READ_PRAGMAS = (
+    "PRAGMA query_only = ON",
+    "PRAGMA mmap_size = 268435456",
+    "PRAGMA cache_size = -16384",
+)
+
+
+class PoolStats:  # pylint: disable=too-few-public-methods
+    """Checkout statistics of a connection pool"""
+
+    def __init__(self) -> None:
+        self.checkouts = 0
+        self.connects = 0
+        self.wait_seconds = 0.0
+        self.max_wait_seconds = 0.0
+
+    def as_dict(self) -> dict:
+        """Statistics as a dictionary"""
+        return {
+            "checkouts": self.checkouts,
+            "hits": self.checkouts - self.connects,
+            "misses": self.connects,
+            "wait_seconds": self.wait_seconds,
+            "max_wait_seconds": self.max_wait_seconds,
+        }
+
+
+class MeteredQueuePool(AsyncAdaptedQueuePool):
+    """Queue pool recording how long checkouts wait for a connection"""
+
+    def __init__(self, *args, **kwargs) -> None:
+        super().__init__(*args, **kwargs)
+        self.stats = PoolStats()
+
+    def _do_get(self):
+        started = time.perf_counter()
+        try:
+            return super()._do_get()
+        finally:
+            waited = time.perf_counter() - started
+            metrics.observe_pool_wait(waited)
+            self.stats.checkouts += 1
+            self.stats.wait_seconds += waited
+            self.stats.max_wait_seconds = max(
+                self.stats.max_wait_seconds, waited
+            )
 
-# Create the database engine
+    def recreate(self):
+        pool = super().recreate()
+        pool.stats = self.stats
+        return pool
+
+
+def _on_connect(pragmas, stats: PoolStats):
+    """Produce a connect listener executing the `pragmas`"""
+
+    def listener(dbapi_connection, _):
+        cursor = dbapi_connection.cursor()
+        for pragma in pragmas:
+            cursor.execute(pragma)
+        cursor.close()
+        stats.connects += 1
+
+    return listener
+
+
+# Create the database engine. SQLite has a single writer so writes go
+# through a single pooled connection.
 engine = create_async_engine(
-    SQLALCHEMY_DATABASE_URL, connect_args={"check_same_thread": False}
+    SQLALCHEMY_DATABASE_URL,
+    connect_args={"check_same_thread": False},
+    poolclass=MeteredQueuePool,
+    pool_size=1,
+    max_overflow=0,
+)
+
+# Read-only engine for the queries of the API
+read_engine = create_async_engine(
+    SQLALCHEMY_DATABASE_URL,
+    connect_args={"check_same_thread": False},
+    poolclass=MeteredQueuePool,
+    pool_size=DB_READ_POOL_SIZE,
+    max_overflow=0,
+)
+
+event.listen(
+    engine.sync_engine,
+    "connect",
+    _on_connect(_PRAGMAS, engine.pool.stats),
+)
+event.listen(
+    read_engine.sync_engine,
+    "connect",
+    _on_connect(_PRAGMAS + _READ_PRAGMAS, read_engine.pool.stats),
 )
+metrics.instrument_engine(engine.sync_engine)
+metrics.instrument_engine(read_engine.sync_engine)
+metrics.instrument_sessions()
+
+# Process wide session factories. Connections are only checked out of the
+# pools once a session executes a statement.
+async_session = async_sessionmaker(engine, expire_on_commit=True)
+read_session = async_sessionmaker(read_engine, expire_on_commit=False)
 
 
 async def init_tables():
     """Initialize tables."""
 
     async with engine.begin() as conn:
-        await conn.run_sync(mapper_registry.metadata.create_all)
+        await conn.run_sync(create_schema)
+        await conn.run_sync(check_query_plans)
+
+
+def pool_stats() -> dict:
+    """Checkout statistics of the connection pools"""
+    return {
+        "write": engine.pool.stats.as_dict(),
+        "read": read_engine.pool.stats.as_dict(),
+    }
 
 
 @asynccontextmanager
@@ -36,8 +161,7 @@ async def async_session_manager() -> AsyncContextManager[
     async_sessionmaker[AsyncSession]
 ]:
     """Async context manager for the database connection"""
-    session = async_sessionmaker(engine, expire_on_commit=True)
     try:
-        yield session
+        yield async_session
     finally:
         logger.debug("Closing connection")
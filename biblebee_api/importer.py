@@ -0,0 +1,262 @@
+"""Bulk importer of bible revisions.
+
+description:
+-----------
+Loads a revision from a MyBible module (an SQLite file with `info`,
+`books` and `verses` tables) into the database of the API. Verses are
+streamed in `executemany` batches inside a single transaction, with the
+verses index dropped during the load and rebuilt afterwards.
+
+```sh
+python -m biblebee_api.importer SUV.SQLite3 --version-code SUV
+```
+"""
+
+import argparse
+import logging
+import sqlite3
+import sys
+import time
+from typing import Dict, List
+
+from sqlalchemy import Connection, create_engine
+
+from biblebee_api.corpus_stats import refresh_corpus_stats
+from biblebee_api.migrations import (
+    VERSES_FTS_TRIGGERS,
+    create_schema,
+    stamp_trigger,
+)
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_DATABASE = "./resource/SUV.SQLite3"
+
+_INSERT_VERSES = (
+    "INSERT INTO verses "
+    "(book_version_code, book_number, chapter, verse, text) "
+    "VALUES (?, ?, ?, ?, ?)"
+)
+
+
+def _read_info(source: sqlite3.Connection) -> Dict[str, str]:
+    """Module description from the MyBible `info` table"""
+    return dict(source.execute("SELECT name, value FROM info"))
+
+
+def _flag(value: str | None) -> bool:
+    return str(value).lower() in ("1", "true", "yes")
+
+
+def _insert_revision(
+    conn: Connection, version_code: str, info: Dict[str, str]
+):
+    conn.exec_driver_sql(
+        "INSERT INTO bible_versions (version_code, language, "
+        "russian_numbering, strong_numbers, right_to_left, "
+        "chapter_string_ps, year, source) VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+        (
+            version_code,
+            info.get("language", ""),
+            _flag(info.get("russian_numbering")),
+            _flag(info.get("strong_numbers")),
+            _flag(info.get("right_to_left")),
+            info.get("chapter_string_ps", ""),
+            int(info.get("year") or 0),
+            info.get("origin") or info.get("description", ""),
+        ),
+    )
+
+
+def _insert_books(
+    conn: Connection,
+    source: sqlite3.Connection,
+    version_code: str,
+    language: str,
+) -> int:
+    books = [
+        (book_number, version_code, language, short_name, long_name, color)
+        for book_number, short_name, long_name, color in source.execute(
+            "SELECT book_number, short_name, long_name, book_color "
+            "FROM books ORDER BY book_number"
+        )
+    ]
+    conn.exec_driver_sql(
+        "INSERT INTO books (book_number, version_code, version_language, "
+        "short_name, long_name, book_color) VALUES (?, ?, ?, ?, ?, ?)",
+        books,
+    )
+    return len(books)
+
+
+# Per row triggers on verses replaced by set based statements during a load
+_SUSPENDED_TRIGGERS = {
+    "verses_fts_ai": VERSES_FTS_TRIGGERS["verses_fts_ai"],
+    "verses_fts_ad": VERSES_FTS_TRIGGERS["verses_fts_ad"],
+    **dict(stamp_trigger("verses", event) for event in ("INSERT", "DELETE")),
+}
+
+
+def _delete_revision(conn: Connection, version_code: str):
+    conn.exec_driver_sql(
+        "INSERT INTO verses_fts (verses_fts, rowid, text) "
+        "SELECT 'delete', rowid, text FROM verses "
+        "WHERE book_version_code = ?",
+        (version_code,),
+    )
+    for table, column in (
+        ("verses", "book_version_code"),
+        ("books", "version_code"),
+        ("bible_versions", "version_code"),
+    ):
+        conn.exec_driver_sql(
+            f"DELETE FROM {table} WHERE {column} = ?", (version_code,)
+        )
+
+
+def import_revision(
+    conn: Connection,
+    source: sqlite3.Connection,
+    version_code: str,
+    batch_size: int = 5000,
+    replace: bool = False,
+) -> int:
+    """
+    Import the MyBible module `source` as revision `version_code`.
+
+    The per row triggers on verses are suspended during the load and the
+    full-text index and corpus version are maintained in bulk instead.
+    The statistics of the revision are recomputed afterwards.
+    Returns the number of imported verses.
+    """
+    info = _read_info(source)
+    if (
+        not replace
+        and conn.exec_driver_sql(
+            "SELECT 1 FROM bible_versions WHERE version_code = ?",
+            (version_code,),
+        ).first()
+    ):
+        raise ValueError(f"Revision {version_code} was already imported")
+    total = source.execute("SELECT count(*) FROM verses").fetchone()[0]
+
+    # pysqlite only begins a transaction before DML statements. Begin it
+    # before dropping the triggers so they come back on a rollback.
+    if not conn.connection.dbapi_connection.in_transaction:
+        conn.exec_driver_sql("BEGIN")
+
+    for trigger in _SUSPENDED_TRIGGERS:
+        conn.exec_driver_sql(f"DROP TRIGGER IF EXISTS {trigger}")
+
+    if replace:
+        _delete_revision(conn, version_code)
+
+    _insert_revision(conn, version_code, info)
+    books = _insert_books(conn, source, version_code, info.get("language"))
+    logger.info("Imported %d book(s) of %s", books, version_code)
+
+    conn.exec_driver_sql(
+        "DROP INDEX IF EXISTS ix_verses_revision_book_chapter_verse"
+    )
+
+    cursor = source.execute(
+        "SELECT ?, book_number, chapter, verse, text FROM verses "
+        "ORDER BY book_number, chapter, verse",
+        (version_code,),
+    )
+    imported = 0
+    while True:
+        batch: List[tuple] = cursor.fetchmany(batch_size)
+        if not batch:
+            break
+        conn.exec_driver_sql(_INSERT_VERSES, batch)
+        imported += len(batch)
+        logger.info(
+            "Imported %d/%d verse(s) (%.0f%%)",
+            imported,
+            total,
+            100 * imported / max(total, 1),
+        )
+
+    logger.info("Rebuilding the verses indexes")
+    conn.exec_driver_sql(
+        "CREATE INDEX ix_verses_revision_book_chapter_verse "
+        "ON verses (book_version_code, book_number, chapter, verse, text)"
+    )
+    conn.exec_driver_sql(
+        "INSERT INTO verses_fts (rowid, text) "
+        "SELECT rowid, text FROM verses WHERE book_version_code = ?",
+        (version_code,),
+    )
+    refresh_corpus_stats(conn, version_code)
+    conn.exec_driver_sql(
+        "UPDATE corpus_version SET version = version + 1 WHERE id = 1"
+    )
+    for trigger in _SUSPENDED_TRIGGERS.values():
+        conn.exec_driver_sql(trigger)
+
+    conn.exec_driver_sql("ANALYZE")
+    return imported
+
+
+def main(argv: List[str] | None = None) -> int:
+    """Command line entry point"""
+    parser = argparse.ArgumentParser(
+        prog="python -m biblebee_api.importer",
+        description="Import a bible revision from a MyBible module.",
+    )
+    parser.add_argument("source", help="path to the MyBible .SQLite3 module")
+    parser.add_argument(
+        "--version-code", required=True, help="code of the revision e.g., SUV"
+    )
+    parser.add_argument(
+        "--database",
+        default=DEFAULT_DATABASE,
+        help=f"path to the API database (default {DEFAULT_DATABASE})",
+    )
+    parser.add_argument("--batch-size", type=int, default=5000)
+    parser.add_argument(
+        "--replace",
+        action="store_true",
+        help="replace the revision if it was already imported",
+    )
+    args = parser.parse_args(argv)
+
+    logging.basicConfig(level=logging.INFO, format="%(message)s", force=True)
+
+    engine = create_engine(f"sqlite:///{args.database}")
+    with engine.begin() as conn:
+        create_schema(conn)
+
+    started = time.perf_counter()
+    source = sqlite3.connect(f"file:{args.source}?mode=ro", uri=True)
+    try:
+        with engine.connect() as conn:
+            # Durability is traded for speed during the load only
+            conn.exec_driver_sql("PRAGMA synchronous = OFF")
+            imported = import_revision(
+                conn,
+                source,
+                args.version_code,
+                batch_size=args.batch_size,
+                replace=args.replace,
+            )
+            conn.commit()
+    except ValueError as error:
+        logger.error("%s, use --replace to import it again", error)
+        return 1
+    finally:
+        source.close()
+        engine.dispose()
+
+    logger.info(
+        "Imported %d verse(s) of %s in %.2fs",
+        imported,
+        args.version_code,
+        time.perf_counter() - started,
+    )
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,340 @@
+"""Versioned schema migrations for the SQLite database.
+
+description:
+-----------
+Migrations are applied in order on startup. The version of the schema
+is tracked in SQLite's `user_version` pragma and every migration is
+applied exactly once. Hot queries are checked against the query planner
+afterwards so that full table scans do not go unnoticed.
+"""
+
+import logging
+from typing import Callable, List, Tuple
+
+from sqlalchemy import Connection, select
+
+from biblebee_api.corpus_stats import refresh_all_corpus_stats
+from biblebee_api.model.bible_model import (
+    Book,
+    Device,
+    mapper_registry,
+)
+
+logger = logging.getLogger(__name__)
+
+Migration = Callable[[Connection], None]
+
+
+def _index_verses(conn: Connection):
+    """Covering index on (book_version_code, book_number, chapter, verse)"""
+    conn.exec_driver_sql(
+        "CREATE INDEX IF NOT EXISTS ix_verses_revision_book_chapter_verse "
+        "ON verses (book_version_code, book_number, chapter, verse, text)"
+    )
+
+
+def _index_books(conn: Connection):
+    """Index the books by revision"""
+    conn.exec_driver_sql(
+        "CREATE INDEX IF NOT EXISTS ix_books_version_code "
+        "ON books (version_code)"
+    )
+
+
+# Triggers keeping the full-text index in sync with the verses
+VERSES_FTS_TRIGGERS = {
+    "verses_fts_ai": (
+        "CREATE TRIGGER IF NOT EXISTS verses_fts_ai AFTER INSERT ON verses "
+        "BEGIN "
+        "INSERT INTO verses_fts (rowid, text) VALUES (new.rowid, new.text); "
+        "END"
+    ),
+    "verses_fts_ad": (
+        "CREATE TRIGGER IF NOT EXISTS verses_fts_ad AFTER DELETE ON verses "
+        "BEGIN "
+        "INSERT INTO verses_fts (verses_fts, rowid, text) "
+        "VALUES ('delete', old.rowid, old.text); "
+        "END"
+    ),
+    "verses_fts_au": (
+        "CREATE TRIGGER IF NOT EXISTS verses_fts_au AFTER UPDATE ON verses "
+        "BEGIN "
+        "INSERT INTO verses_fts (verses_fts, rowid, text) "
+        "VALUES ('delete', old.rowid, old.text); "
+        "INSERT INTO verses_fts (rowid, text) VALUES (new.rowid, new.text); "
+        "END"
+    ),
+}
+
+
+def stamp_trigger(
+    table: str, event: str, stamp: str = "corpus_version"
+) -> Tuple[str, str]:
+    """Name and DDL of the trigger bumping the version stamp `stamp`"""
+    name = f"{table}_{event.lower()}_stamp"
+    return name, (
+        f"CREATE TRIGGER IF NOT EXISTS {name} AFTER {event} ON {table} "
+        "BEGIN "
+        f"UPDATE {stamp} SET version = version + 1 WHERE id = 1; "
+        "END"
+    )
+
+
+def _create_verses_fts(conn: Connection, batch_size: int = 5000):
+    """
+    Full-text index over the verses text.
+
+    The index is an external-content FTS5 table kept in sync by triggers,
+    populated from the existing verses in batches of `batch_size` rows.
+    """
+    conn.exec_driver_sql(
+        "CREATE VIRTUAL TABLE IF NOT EXISTS verses_fts USING fts5("
+        "text, content='verses', content_rowid='rowid', "
+        "tokenize='unicode61 remove_diacritics 2', prefix='2 3')"
+    )
+    for trigger in VERSES_FTS_TRIGGERS.values():
+        conn.exec_driver_sql(trigger)
+
+    last_rowid = 0
+    while True:
+        last = conn.exec_driver_sql(
+            "SELECT max(rowid) FROM ("
+            "SELECT rowid FROM verses WHERE rowid > ? ORDER BY rowid LIMIT ?"
+            ")",
+            (last_rowid, batch_size),
+        ).scalar()
+        if last is None:
+            break
+        conn.exec_driver_sql(
+            "INSERT INTO verses_fts (rowid, text) "
+            "SELECT rowid, text FROM verses WHERE rowid > ? AND rowid <= ?",
+            (last_rowid, last),
+        )
+        logger.debug("Indexed verses up to rowid %d", last)
+        last_rowid = last
+
+    conn.exec_driver_sql(
+        "INSERT INTO verses_fts (verses_fts) VALUES ('optimize')"
+    )
+
+
+def _create_corpus_version(conn: Connection):
+    """
+    Single row stamp bumped whenever the bible revisions, books or verses
+    change, so that derived caches know when to invalidate.
+    """
+    conn.exec_driver_sql(
+        "CREATE TABLE IF NOT EXISTS corpus_version ("
+        "id INTEGER PRIMARY KEY CHECK (id = 1), "
+        "version INTEGER NOT NULL)"
+    )
+    conn.exec_driver_sql(
+        "INSERT OR IGNORE INTO corpus_version (id, version) VALUES (1, 1)"
+    )
+    for table in ("bible_versions", "books", "verses"):
+        for event in ("INSERT", "UPDATE", "DELETE"):
+            _, trigger = stamp_trigger(table, event)
+            conn.exec_driver_sql(trigger)
+
+
+def _stamp_daily_verses(conn: Connection):
+    """
+    Bump the corpus version stamp when the daily verses change. Superseded
+    by `_create_daily_verses_version`.
+    """
+    for event in ("INSERT", "UPDATE", "DELETE"):
+        _, trigger = stamp_trigger("daily_verses", event)
+        conn.exec_driver_sql(trigger)
+
+
+def _index_devices(conn: Connection):
+    """Covering indexes for the keyset pagination of the device tokens"""
+    conn.exec_driver_sql(
+        "CREATE INDEX IF NOT EXISTS ix_devices_id_token ON devices (id, token)"
+    )
+    conn.exec_driver_sql(
+        "CREATE INDEX IF NOT EXISTS ix_devices_updated_at_id_token "
+        "ON devices (updated_at, id, token)"
+    )
+
+
+def _create_corpus_stats(conn: Connection):
+    """Precomputed statistics of the revisions, books and chapters"""
+    conn.exec_driver_sql(
+        "CREATE TABLE IF NOT EXISTS corpus_stats ("
+        "version_code VARCHAR NOT NULL, "
+        "book_number INTEGER NOT NULL, "
+        "chapter INTEGER NOT NULL, "
+        "books INTEGER NOT NULL, "
+        "chapters INTEGER NOT NULL, "
+        "verses INTEGER NOT NULL, "
+        "words INTEGER NOT NULL, "
+        "characters INTEGER NOT NULL, "
+        "PRIMARY KEY (version_code, book_number, chapter)"
+        ") WITHOUT ROWID"
+    )
+    refresh_all_corpus_stats(conn)
+
+
+def _rebuild_books(conn: Connection):
+    """
+    Rebuild the books with the primary key on (book_number, version_code)
+    so that several revisions can hold the same book numbers.
+    """
+    keys = [
+        row[1]
+        for row in conn.exec_driver_sql("PRAGMA table_info(books)")
+        if row[5]
+    ]
+    if len(keys) > 1:
+        return
+    conn.exec_driver_sql(
+        "CREATE TABLE books_new ("
+        "book_number INTEGER NOT NULL, "
+        "version_code VARCHAR NOT NULL, "
+        "version_language VARCHAR NOT NULL, "
+        "short_name VARCHAR NOT NULL, "
+        "long_name VARCHAR NOT NULL, "
+        "book_color VARCHAR NOT NULL, "
+        "PRIMARY KEY (book_number, version_code), "
+        "FOREIGN KEY (version_code) REFERENCES bible_versions (version_code)"
+        ")"
+    )
+    conn.exec_driver_sql(
+        "INSERT INTO books_new (book_number, version_code, version_language, "
+        "short_name, long_name, book_color) "
+        "SELECT book_number, version_code, version_language, short_name, "
+        "long_name, book_color FROM books"
+    )
+    conn.exec_driver_sql("DROP TABLE books")
+    conn.exec_driver_sql("ALTER TABLE books_new RENAME TO books")
+    # The index and the triggers went away with the former table
+    _index_books(conn)
+    for event in ("INSERT", "UPDATE", "DELETE"):
+        _, trigger = stamp_trigger("books", event)
+        conn.exec_driver_sql(trigger)
+
+
+def _create_daily_verses_version(conn: Connection):
+    """
+    Single row stamp bumped whenever the daily verses change, in place of
+    the corpus version stamp, so that adding a daily verse does not
+    invalidate the caches of the verses.
+    """
+    conn.exec_driver_sql(
+        "CREATE TABLE IF NOT EXISTS daily_verses_version ("
+        "id INTEGER PRIMARY KEY CHECK (id = 1), "
+        "version INTEGER NOT NULL)"
+    )
+    conn.exec_driver_sql(
+        "INSERT OR IGNORE INTO daily_verses_version (id, version) "
+        "VALUES (1, 1)"
+    )
+    for event in ("INSERT", "UPDATE", "DELETE"):
+        name, trigger = stamp_trigger(
+            "daily_verses", event, "daily_verses_version"
+        )
+        conn.exec_driver_sql(f"DROP TRIGGER IF EXISTS {name}")
+        conn.exec_driver_sql(trigger)
+
+
+def _index_verses_by_book(conn: Connection):
+    """
+    Index on (book_number, chapter, verse) for the reads of every revision,
+    which the index led by the revision does not serve
+    """
+    conn.exec_driver_sql(
+        "CREATE INDEX IF NOT EXISTS ix_verses_book_chapter_verse "
+        "ON verses (book_number, chapter, verse)"
+    )
+
+
+# Ordered migrations. Never reorder or remove, only append.
+MIGRATIONS: List[Migration] = [
+    _index_verses,
+    _index_books,
+    _create_verses_fts,
+    _create_corpus_version,
+    _stamp_daily_verses,
+    _index_devices,
+    _create_corpus_stats,
+    _rebuild_books,
+    _create_daily_verses_version,
+    _index_verses_by_book,
+]
+
+# Queries on the hot paths which must never scan a whole table. The
+# prebuilt statements of the repositories and of the worker are added by
+# `hot_queries`.
+HOT_QUERIES: List[Tuple[str, object]] = [
+    (
+        "books",
+        select(Book).filter(Book.version_code == "SUV"),
+    ),
+    (
+        "device_tokens",
+        select(Device.token).filter(Device.id > 0).order_by(Device.id),
+    ),
+]
+
+
+def create_schema(conn: Connection):
+    """
+    Create the tables and apply the pending migrations under the write
+    lock, so that workers starting together on a fresh database wait for
+    each other and read the schema version once it is up to date.
+    """
+    conn.exec_driver_sql("BEGIN IMMEDIATE")
+    mapper_registry.metadata.create_all(conn)
+    migrate(conn)
+
+
+def migrate(conn: Connection):
+    """Apply the pending migrations and refresh the planner statistics"""
+    version = conn.exec_driver_sql("PRAGMA user_version").scalar()
+
+    for number, migration in enumerate(MIGRATIONS, start=1):
+        if number <= version:
+            continue
+        logger.info("Applying migration %d: %s", number, migration.__name__)
+        migration(conn)
+        conn.exec_driver_sql(f"PRAGMA user_version = {number}")
+
+    if version < len(MIGRATIONS):
+        conn.exec_driver_sql("ANALYZE")
+
+
+def hot_queries() -> List[Tuple[str, object]]:
+    """Hot queries of the schema, of the repositories and of the worker"""
+    # Imported here as the repositories and the worker need the database,
+    # which needs the migrations
+    # pylint: disable=import-outside-toplevel,cyclic-import
+    from biblebee_api import worker
+    from biblebee_api.repo import bibles_repo
+
+    return [*HOT_QUERIES, *bibles_repo.HOT_QUERIES, *worker.HOT_QUERIES]
+
+
+def check_query_plans(conn: Connection) -> List[str]:
+    """Report the hot queries which are planned as full table scans"""
+    scans = []
+    for name, query in hot_queries():
+        compiled = query.compile(
+            dialect=conn.dialect, compile_kwargs={"literal_binds": True}
+        )
+        plan = conn.exec_driver_sql(f"EXPLAIN QUERY PLAN {compiled}")
+        # Subqueries and virtual tables are scanned as they are produced,
+        # whereas a scan of a table reads all of it, with an index or not
+        subqueries = set()
+        for row in plan:
+            detail = row[-1]
+            if detail.startswith(("CO-ROUTINE", "MATERIALIZE")):
+                subqueries.add(detail.split()[1])
+            elif (
+                detail.startswith("SCAN")
+                and "VIRTUAL TABLE" not in detail
+                and detail.split()[1] not in subqueries
+            ):
+                logger.warning("Query %s does a full scan: %s", name, detail)
+                scans.append(name)
+    return scans
@@ -3,7 +3,14 @@
 from datetime import datetime
 from typing import List
 
-from sqlalchemy import DateTime, Integer, ForeignKey, String
+from sqlalchemy import (
+    DateTime,
+    ForeignKey,
+    ForeignKeyConstraint,
+    Index,
+    Integer,
+    String,
+)
 from sqlalchemy.orm import Mapped
 from sqlalchemy.orm import mapped_column
 from sqlalchemy.orm import registry
@@ -46,9 +53,13 @@ class Book:  # pylint: disable=too-few-public-methods
 
     __tablename__ = "books"
 
+    # Composite primary key on revision and book
     book_number = mapped_column(Integer, primary_key=True)
     version_code = mapped_column(
-        String, ForeignKey("bible_versions.version_code")
+        String,
+        ForeignKey("bible_versions.version_code"),
+        primary_key=True,
+        index=True,
     )
     version_language: Mapped[str]
     short_name: Mapped[str]
@@ -82,14 +93,27 @@ class Verse:  # pylint: disable=too-few-public-methods
     """
 
     __tablename__ = "verses"
-
-    # Composite primary key on book and verse
-    verse = mapped_column(Integer, primary_key=True)
-    book_version_code = mapped_column(
-        String, ForeignKey("books.version_code"), primary_key=True
+    __table_args__ = (
+        # Covering index for the lookups by revision, book, chapter and verse
+        Index(
+            "ix_verses_revision_book_chapter_verse",
+            "book_version_code",
+            "book_number",
+            "chapter",
+            "verse",
+            "text",
+        ),
+        ForeignKeyConstraint(
+            ["book_version_code", "book_number"],
+            ["books.version_code", "books.book_number"],
+        ),
     )
+
+    # Composite primary key on revision, book, chapter and verse
+    book_version_code = mapped_column(String, primary_key=True)
     book_number = mapped_column(Integer, primary_key=True)
-    chapter: Mapped[int]
+    chapter = mapped_column(Integer, primary_key=True)
+    verse = mapped_column(Integer, primary_key=True)
     text: Mapped[str]
 
     # Relationships (This one is important in case of Search operation)
@@ -108,6 +132,28 @@ class Verse:  # pylint: disable=too-few-public-methods
         )
 
 
+@mapper_registry.mapped
+class CorpusStat:  # pylint: disable=too-few-public-methods
+    """
+    Precomputed statistics of the revisions, books and chapters.
+
+    A row with `chapter` 0 holds the statistics of a whole book and a row
+    with both `book_number` and `chapter` 0 those of a whole revision.
+    """
+
+    __tablename__ = "corpus_stats"
+    __table_args__ = {"sqlite_with_rowid": False}
+
+    version_code = mapped_column(String, primary_key=True)
+    book_number = mapped_column(Integer, primary_key=True)
+    chapter = mapped_column(Integer, primary_key=True)
+    books: Mapped[int]
+    chapters: Mapped[int]
+    verses: Mapped[int]
+    words: Mapped[int]
+    characters: Mapped[int]
+
+
 @mapper_registry.mapped
 class DailyVerse:  # pylint: disable=too-few-public-methods
     """Store daily verses from the bible"""
@@ -116,11 +162,13 @@ class DailyVerse:  # pylint: disable=too-few-public-methods
 
     id = mapped_column(Integer, primary_key=True)
     tags: Mapped[str]
-    book_number = mapped_column(String, ForeignKey("books.book_number"))
-    verses_ptr: Mapped[str]
+    book_number = mapped_column(Integer, ForeignKey("books.book_number"))
+    chapter: Mapped[int]
+    verse_start: Mapped[int]
+    verse_end: Mapped[int]
 
     def __repr__(self) -> str:
-        return rf"DailyVerse(id={self.id},tags={self.tags},book_number={self.book_number},verses_ptr={self.verses_ptr}"
+        return rf"DailyVerse(id={self.id},tags={self.tags},book_number={self.book_number},chapter={self.chapter},verses={self.verse_start}-{self.verse_end}"
 
 
 @mapper_registry.mapped
@@ -128,6 +176,11 @@ class Device:
     """Device entities model"""
 
     __tablename__ = "devices"
+    __table_args__ = (
+        # Covering indexes for the keyset pagination of the tokens
+        Index("ix_devices_id_token", "id", "token"),
+        Index("ix_devices_updated_at_id_token", "updated_at", "id", "token"),
+    )
 
     id = mapped_column(Integer, primary_key=True)
     user_id: Mapped[int]
@@ -1,21 +1,213 @@
 """Repository for the bible books (resources)"""
 
+import json
 import logging
-from typing import Dict, List
+from typing import AsyncIterator, List, Sequence, Tuple
 
 
 from fastapi import Request
 from sqlalchemy.ext.asyncio import async_sessionmaker, AsyncSession
-from sqlalchemy import and_, or_, select
+from sqlalchemy import Row, Select, String, and_, bindparam, select
 from sqlalchemy.sql.expression import func
 
-from biblebee_api.model.bible_model import Book, Verse
+from biblebee_api.database import read_session
+from biblebee_api.model.bible_model import Book, CorpusStat, Verse
+from biblebee_api.repo.corpus_store import CorpusStore, VerseRow
+from biblebee_api.service import metrics
+from biblebee_api.service.verse_parser import VerseRanges
 
 
-# Configure logger
-logging.basicConfig(level=logging.DEBUG)
 logger = logging.getLogger(__name__)
 
+# Verse intervals of a skim as rows of `[chapter, start, end]`
+_SKIM_RANGES = (
+    func.json_each(bindparam("ranges", type_=String))
+    .table_valued("value")
+    .alias("ranges")
+)
+_RANGE_CHAPTER = func.json_extract(_SKIM_RANGES.c.value, "$[0]")
+_RANGE_START = func.json_extract(_SKIM_RANGES.c.value, "$[1]")
+_RANGE_END = func.json_extract(_SKIM_RANGES.c.value, "$[2]")
+
+# Columns of the verses served to the clients
+_VERSE_COLUMNS = (
+    Verse.book_version_code,
+    Verse.book_number,
+    Verse.chapter,
+    Verse.verse,
+    Verse.text,
+)
+
+# Columns of the statistics served to the clients
+_STATS_COLUMNS = (
+    CorpusStat.version_code.label("revision"),
+    CorpusStat.book_number,
+    CorpusStat.chapters,
+    CorpusStat.verses,
+    CorpusStat.words,
+    CorpusStat.characters,
+)
+
+# Interval covering every verse of a chapter
+_WHOLE_CHAPTER = ((0, 0xFFFF),)
+
+
+def _encode_ranges(parts: VerseRanges) -> str:
+    """Encode the verse intervals of the chapters as a JSON array"""
+    return json.dumps(
+        [
+            [chapter, start, end]
+            for chapter, ranges in parts.items()
+            for start, end in ranges or _WHOLE_CHAPTER
+        ],
+        separators=(",", ":"),
+    )
+
+
+def _revisions_filter(column):
+    return column.in_(bindparam("revisions", expanding=True))
+
+
+# Statements of the repository are built once, with a stable shape per
+# combination of the optional filters, so that they are compiled once per
+# engine and their cache keys are computed once.
+
+_BOOKS = {
+    False: select(Book),
+    True: select(Book).filter(_revisions_filter(Book.version_code)),
+}
+
+
+def _skim_statement(ranged: bool, filtered: bool) -> Select:
+    query = select(*_VERSE_COLUMNS).filter(
+        Verse.book_number == bindparam("book_number")
+    )
+    if filtered:
+        query = query.filter(_revisions_filter(Verse.book_version_code))
+    if ranged:
+        # Join against the intervals passed as a single JSON parameter
+        query = query.join(
+            _SKIM_RANGES,
+            and_(
+                Verse.chapter == _RANGE_CHAPTER,
+                Verse.verse.between(_RANGE_START, _RANGE_END),
+            ),
+        )
+    return query.order_by(Verse.book_version_code, Verse.chapter, Verse.verse)
+
+
+def _chapter_verses_statement(listed: bool, filtered: bool) -> Select:
+    query = select(*_VERSE_COLUMNS).filter(
+        Verse.book_number == bindparam("book_number"),
+        Verse.chapter == bindparam("chapter"),
+    )
+    if listed:
+        query = query.filter(
+            Verse.verse.in_(bindparam("verses", expanding=True))
+        )
+    if filtered:
+        query = query.filter(_revisions_filter(Verse.book_version_code))
+    return query.order_by(Verse.book_version_code, Verse.verse)
+
+
+def _verse_statement(filtered: bool) -> Select:
+    query = select(*_VERSE_COLUMNS).filter(
+        Verse.book_number == bindparam("book_number"),
+        Verse.chapter == bindparam("chapter"),
+        Verse.verse == bindparam("verse"),
+    )
+    if filtered:
+        query = query.filter(_revisions_filter(Verse.book_version_code))
+    return query.order_by(Verse.book_version_code)
+
+
+_SKIM = {
+    (ranged, filtered): _skim_statement(ranged, filtered)
+    for ranged in (False, True)
+    for filtered in (False, True)
+}
+_CHAPTER_VERSES = {
+    (listed, filtered): _chapter_verses_statement(listed, filtered)
+    for listed in (False, True)
+    for filtered in (False, True)
+}
+_VERSE = {filtered: _verse_statement(filtered) for filtered in (False, True)}
+
+# Totals of the revisions
+_REVISION_STATS = select(
+    CorpusStat.version_code, CorpusStat.books, CorpusStat.verses
+).filter(
+    _revisions_filter(CorpusStat.version_code),
+    CorpusStat.book_number == 0,
+    CorpusStat.chapter == 0,
+)
+_BOOK_STATS = select(*_STATS_COLUMNS).filter(
+    _revisions_filter(CorpusStat.version_code),
+    CorpusStat.book_number == bindparam("book_number"),
+    CorpusStat.chapter == 0,
+)
+_CHAPTER_STATS = (
+    select(
+        CorpusStat.version_code.label("revision"),
+        CorpusStat.chapter,
+        CorpusStat.verses,
+        CorpusStat.words,
+        CorpusStat.characters,
+    )
+    .filter(
+        _revisions_filter(CorpusStat.version_code),
+        CorpusStat.book_number == bindparam("book_number"),
+        CorpusStat.chapter > 0,
+    )
+    .order_by(CorpusStat.version_code, CorpusStat.chapter)
+)
+
+# Statements with the parameters they are executed with. The names of the
+# parameters are part of the compilation cache key, hence every execution
+# of a statement passes the same names.
+_BOOK_PARAMS = {"revisions": [""]}
+_VERSE_PARAMS = {"book_number": 0, "chapter": 0, "revisions": [""]}
+STATEMENTS: List[Tuple[Select, dict]] = [
+    *((query, _BOOK_PARAMS) for query in _BOOKS.values()),
+    *(
+        (query, {"book_number": 0, "revisions": [""], "ranges": "[]"})
+        for query in _SKIM.values()
+    ),
+    *(
+        (query, {**_VERSE_PARAMS, "verses": [0]})
+        for query in _CHAPTER_VERSES.values()
+    ),
+    *((query, {**_VERSE_PARAMS, "verse": 0}) for query in _VERSE.values()),
+    (_REVISION_STATS, _BOOK_PARAMS),
+    (_BOOK_STATS, {"book_number": 0, "revisions": [""]}),
+    (_CHAPTER_STATS, {"book_number": 0, "revisions": [""]}),
+]
+
+# Statements of the hot paths bound to sample parameters, which are checked
+# against the query planner on startup
+_SAMPLE_PARAMS = {
+    "book_number": 10,
+    "chapter": 1,
+    "verse": 1,
+    "revisions": ["SUV"],
+    "ranges": "[[1,1,5]]",
+}
+HOT_QUERIES: List[Tuple[str, Select]] = [
+    *(("skim", query.params(_SAMPLE_PARAMS)) for query in _SKIM.values()),
+    *(
+        ("find_verse", query.params(_SAMPLE_PARAMS))
+        for query in _VERSE.values()
+    ),
+]
+
+
+async def warm_statements(async_session: async_sessionmaker[AsyncSession]):
+    """Compile the statements of the repository into the engine cache"""
+    async with async_session() as session:
+        for statement, params in STATEMENTS:
+            await session.execute(statement, params)
+    logger.info("Compiled %d statement(s)", len(STATEMENTS))
+
 
 class BiblesRepo:  # pylint: disable=too-few-public-methods
     """
@@ -27,51 +219,52 @@ class BiblesRepo:  # pylint: disable=too-few-public-methods
     """
 
     def __init__(
-        self, async_session: async_sessionmaker[AsyncSession]
+        self,
+        async_session: async_sessionmaker[AsyncSession],
+        corpus: CorpusStore | None = None,
     ) -> None:
-        """Initialize books repository"""
+        """
+        Initialize books repository.
+
+        Verses are resolved from the in-memory `corpus` when it is loaded.
+        """
         self.async_session = async_session
+        self.corpus = corpus
 
     async def find_all(self, versions: List[str]) -> List[Book]:
         """
         Finds all the books from the database.
         """
         async with self.async_session() as session:
-            query = select(Book)
-
-            if len(versions):
-                query = query.filter(Book.version_code.in_(versions))
-
-            result = await session.execute(query)
-
+            result = await session.execute(
+                _BOOKS[bool(versions)], {"revisions": versions}
+            )
             return result.scalars().all()
 
     async def skim_book_content(
         self,
         book_number: int,
-        parts: Dict[int, List[int]],
+        parts: VerseRanges,
         revirsions: List[str],
-    ) -> List[Verse]:
-        """Find a list of chapters in the book"""
-        async with self.async_session() as session:
-            query = select(Verse).filter(Verse.book_number == book_number)
-
-            if len(revirsions):
-                query = query.filter(Verse.book_version_code.in_(revirsions))
-
-            or_conditions = []
-
-            for chapter, verses in parts.items():
-                logger.debug("chapter: %d, verses: %s", chapter, verses)
-                or_conditions.append(
-                    and_(Verse.chapter == chapter, Verse.verse.in_(verses))
-                )
+    ) -> Sequence[Row | VerseRow]:
+        """
+        Find a list of chapters in the book.
 
-            if len(or_conditions) != 0:
-                query = query.filter(or_(*or_conditions))
+        Verses are plain rows of columns rather than ORM entities.
+        """
+        if self.corpus is not None:
+            return self.corpus.skim(book_number, parts, revirsions)
 
-            result = await session.execute(query)
-            return result.scalars().all()
+        async with self.async_session() as session:
+            result = await session.execute(
+                _SKIM[bool(parts), bool(revirsions)],
+                {
+                    "book_number": book_number,
+                    "revisions": revirsions,
+                    "ranges": _encode_ranges(parts),
+                },
+            )
+            return result.all()
 
     async def find_chapter_verses(
         self,
@@ -79,92 +272,126 @@ class BiblesRepo:  # pylint: disable=too-few-public-methods
         chapter: int,
         verses: List[int],
         revisions: List[str],
-    ) -> List[Book]:
+    ) -> Sequence[Row | VerseRow]:
         """
         Find verses in the book and chapter corresponding to
         `book_number` and `chapter` respectively.
         """
-        async with self.async_session() as session:
-            query = select(Verse).filter(
-                Verse.book_number == book_number, Verse.chapter == chapter
+        if self.corpus is not None:
+            return self.corpus.chapter_verses(
+                book_number, chapter, verses, revisions
             )
 
-            if len(verses):
-                query = query.filter(Verse.verse.in_(verses))
-
-            if len(revisions):
-                query = query.filter(Verse.book_version_code.in_(revisions))
-
-            query = query.order_by(Verse.book_version_code.asc())
-
-            result = await session.execute(query)
-            return result.scalars().all()
+        async with self.async_session() as session:
+            result = await session.execute(
+                _CHAPTER_VERSES[bool(verses), bool(revisions)],
+                {
+                    "book_number": book_number,
+                    "chapter": chapter,
+                    "verses": verses,
+                    "revisions": revisions,
+                },
+            )
+            return result.all()
 
     async def find_verse(
         self, book_number: int, chapter: int, verse: int, revisions: List[str]
-    ) -> List[Verse]:
+    ) -> Sequence[Row | VerseRow]:
         """
         Retrieves a verse in the book and chapter corresponding to
         `boo_number`, `chapter` and `verse` respectively.
         """
+        if self.corpus is not None:
+            return self.corpus.verse(book_number, chapter, verse, revisions)
+
         async with self.async_session() as session:
-            query = select(Verse).filter(
-                Verse.book_number == book_number,
-                Verse.chapter == chapter,
-                Verse.verse == verse,
+            result = await session.execute(
+                _VERSE[bool(revisions)],
+                {
+                    "book_number": book_number,
+                    "chapter": chapter,
+                    "verse": verse,
+                    "revisions": revisions,
+                },
             )
+            return result.all()
 
-            if len(revisions):
-                query = query.filter(Verse.book_version_code.in_(revisions))
+    async def stream_verses(
+        self,
+        revisions: List[str],
+        book_number: int | None = None,
+        batch_size: int = 500,
+    ) -> AsyncIterator[Sequence[Row]]:
+        """
+        Stream the verses of the `revisions` in batches of `batch_size`
+        rows, optionally limited to a single book.
+        """
+        query = select(*_VERSE_COLUMNS).filter(
+            Verse.book_version_code.in_(revisions)
+        )
 
-            result = await session.execute(query)
-            return result.scalars().all()
+        if book_number is not None:
+            query = query.filter(Verse.book_number == book_number)
 
-    async def get_books_count_by_revisions(self, revisions: List[str]):
-        """Returns the number of books in revirsions"""
+        query = query.order_by(
+            Verse.book_version_code,
+            Verse.book_number,
+            Verse.chapter,
+            Verse.verse,
+        ).execution_options(yield_per=batch_size)
 
-        query = (
-            select(
-                Book.version_code,
-                func.count().label(  # pylint: disable=not-callable
-                    "books_count"
-                ),
-            )
-            .filter(Book.version_code.in_(revisions))
-            .group_by(Book.version_code)
-        )
+        async with self.async_session() as session:
+            result = await session.stream(query)
+            async for batch in result.partitions():
+                metrics.observe_rows(len(batch))
+                yield batch
 
+    async def get_books_count_by_revisions(self, revisions: List[str]):
+        """Returns the number of books in revirsions"""
         async with self.async_session() as session:
-            result = await session.execute(query)
+            result = await session.execute(
+                _REVISION_STATS, {"revisions": revisions}
+            )
             return [
-                {"revision": row.version_code, "books_count": row.books_count}
+                {"revision": row.version_code, "books_count": row.books}
                 for row in result
             ]
 
     async def get_verse_counts_by_revisions(self, revisions: List[str]):
         """Get a count of verses in the revisions"""
-        query = (
-            select(
-                Book.version_code,
-                func.count().label(  # pylint: disable=not-callable
-                    "verses_count"
-                ),
-            )
-            .select_from(Verse)
-            .join(Book)
-            .filter(Book.version_code.in_(revisions))
-            .group_by(Book.version_code)
-        )
-
         async with self.async_session() as session:
-            result = await session.execute(query)
+            result = await session.execute(
+                _REVISION_STATS, {"revisions": revisions}
+            )
             return [
-                {"revision": key, "verses_count": val} for key, val in result
+                {"revision": row.version_code, "verses_count": row.verses}
+                for row in result
             ]
 
+    async def get_book_stats(self, book_number: int, revisions: List[str]):
+        """Get the statistics of a book in the revisions"""
+        async with self.async_session() as session:
+            result = await session.execute(
+                _BOOK_STATS,
+                {"book_number": book_number, "revisions": revisions},
+            )
+            return [dict(row) for row in result.mappings()]
+
+    async def get_chapter_stats(self, book_number: int, revisions: List[str]):
+        """Get the statistics of every chapter of a book in the revisions"""
+        async with self.async_session() as session:
+            result = await session.execute(
+                _CHAPTER_STATS,
+                {"book_number": book_number, "revisions": revisions},
+            )
+            return [dict(row) for row in result.mappings()]
+
     @staticmethod
     def request_scoped(
         request: Request,
     ) -> "BiblesRepo":
         """Creates and return a data repository for managing bible books."""
-        return BiblesRepo(async_session=request.state.async_session)
+        return BiblesRepo(
+            async_session=read_session,
+            corpus=getattr(request.app.state, "corpus", None),
+        )
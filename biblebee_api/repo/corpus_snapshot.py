@@ -0,0 +1,322 @@
+"""Read-only, memory-mapped snapshot of the bible verses.
+
+description:
+-----------
+The verses of every revision are compiled offline into a binary file
+which the API maps into memory, so that the workers of a server share a
+single copy in the page cache and startup parses nothing. A snapshot
+holds, after a header and a directory of the revisions, for every
+revision:
+
+- the sorted `book << 16 | chapter` keys of its chapters,
+- the offsets of the first verse of every chapter,
+- the numbers of the verses and the offsets of their texts,
+- the UTF-8 texts of the verses, back to back.
+
+Arrays are little-endian and read in place through memoryviews, and the
+text of a verse is decoded only when it is served. The snapshot records
+the corpus version it was built from and is ignored once the revisions,
+books or verses of the database change. Daily verses have their own stamp
+and leave the snapshot current.
+
+```sh
+python -m biblebee_api.repo.corpus_snapshot ./resource/corpus.snapshot
+```
+"""
+
+import argparse
+import logging
+import mmap
+import os
+import struct
+import sys
+import tempfile
+from array import array
+from bisect import bisect_left
+from typing import BinaryIO, Iterable, List, Tuple
+
+from sqlalchemy import Connection, create_engine, select, text
+from sqlalchemy.ext.asyncio import async_sessionmaker, AsyncSession
+
+from biblebee_api.model.bible_model import Verse
+from biblebee_api.repo.corpus_store import CorpusStore
+
+logger = logging.getLogger(__name__)
+
+# Path to the snapshot served instead of the database, if any
+CORPUS_SNAPSHOT = os.environ.get("CORPUS_SNAPSHOT")
+
+_MAGIC = b"BBSNAP02"
+
+# Magic, corpus version, size of the file and number of revisions
+_HEADER = struct.Struct("<8sQQI4x")
+
+# Code, number of chapters and verses, and the offset of every array
+_REVISION = struct.Struct("<16sII6Q")
+
+_STAMP_QUERY = text("SELECT version FROM corpus_version WHERE id = 1")
+
+
+class _Chapters:  # pylint: disable=too-few-public-methods
+    """(book_number, chapter) -> (start, end) offsets of the verses"""
+
+    def __init__(self, keys: memoryview, firsts: memoryview) -> None:
+        self.keys = keys
+        self.firsts = firsts
+
+    def get(self, key: Tuple[int, int], default=None):
+        """Offsets of the verses of the chapter `key`"""
+        book_number, chapter = key
+        wanted = book_number << 16 | chapter
+        i = bisect_left(self.keys, wanted)
+        if i == len(self.keys) or self.keys[i] != wanted:
+            return default
+        return self.firsts[i], self.firsts[i + 1]
+
+
+class _Books:  # pylint: disable=too-few-public-methods
+    """book_number -> ordered chapters"""
+
+    def __init__(self, keys: memoryview) -> None:
+        self.keys = keys
+
+    def get(self, book_number: int, default=None):
+        """Chapters of the book"""
+        lo = bisect_left(self.keys, book_number << 16)
+        hi = bisect_left(self.keys, (book_number + 1) << 16, lo)
+        if lo == hi:
+            return default
+        return [key & 0xFFFF for key in self.keys[lo:hi]]
+
+
+class _Texts:  # pylint: disable=too-few-public-methods
+    """Texts of the verses, decoded on access"""
+
+    def __init__(self, offsets: memoryview, blob: memoryview) -> None:
+        self.offsets = offsets
+        self.blob = blob
+
+    def __len__(self) -> int:
+        return len(self.offsets) - 1
+
+    def __getitem__(self, i: int) -> str:
+        return str(self.blob[self.offsets[i] : self.offsets[i + 1]], "utf-8")
+
+
+def _array(view: memoryview, offset: int, length: int, typecode: str):
+    """The array of `length` items at `offset`. Raises `ValueError`"""
+    end = offset + length * struct.calcsize(typecode)
+    if end > len(view):
+        raise ValueError(f"Array at {offset} ends past the snapshot")
+    return view[offset:end].cast(typecode)
+
+
+class _SnapshotRevision:  # pylint: disable=too-few-public-methods
+    """Tables of a revision read in place from the snapshot"""
+
+    __slots__ = ("code", "books", "chapters", "verses", "texts")
+
+    def __init__(self, view: memoryview, entry: tuple) -> None:
+        code, chapters, verses, *offsets = entry
+        keys, firsts, numbers, text_offsets, blob, blob_size = offsets
+        self.code = code.rstrip(b"\0").decode("ascii")
+        keys = _array(view, keys, chapters, "I")
+        self.books = _Books(keys)
+        self.chapters = _Chapters(
+            keys, _array(view, firsts, chapters + 1, "I")
+        )
+        self.verses = _array(view, numbers, verses, "H")
+        self.texts = _Texts(
+            _array(view, text_offsets, verses + 1, "I"),
+            _array(view, blob, blob_size, "B"),
+        )
+
+
+class CorpusSnapshot(CorpusStore):
+    """Corpus store reading the verses from a memory-mapped snapshot"""
+
+    def __init__(self, path: str) -> None:
+        """
+        Map the snapshot at `path`. Raises `ValueError` if the file is not
+        a snapshot, or is truncated or corrupt.
+        """
+        if sys.byteorder != "little":
+            raise ValueError("Snapshots are only read on little-endian hosts")
+        with open(path, "rb") as file:
+            self._mmap = mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_READ)
+        view = memoryview(self._mmap)
+
+        try:
+            magic, self.stamp, size, count = _HEADER.unpack_from(view)
+            if magic != _MAGIC:
+                raise ValueError(f"{path} is not a corpus snapshot")
+            if size != len(view):
+                raise ValueError(
+                    f"{path} holds {len(view)} bytes instead of {size}"
+                )
+            revisions = {}
+            for i in range(count):
+                entry = _REVISION.unpack_from(
+                    view, _HEADER.size + i * _REVISION.size
+                )
+                rev = _SnapshotRevision(view, entry)
+                revisions[rev.code] = rev
+        except (struct.error, UnicodeDecodeError) as error:
+            raise ValueError(f"{path} is corrupt: {error}") from error
+        super().__init__(revisions)
+
+
+def _align(file: BinaryIO):
+    file.write(b"\0" * (-file.tell() % 8))
+
+
+def _write(file: BinaryIO, data: array | bytearray) -> int:
+    """Write `data` at the next aligned offset. Returns the offset"""
+    _align(file)
+    offset = file.tell()
+    if isinstance(data, array) and sys.byteorder != "little":
+        data = array(data.typecode, data)
+        data.byteswap()
+    file.write(data)
+    return offset
+
+
+def write_snapshot(
+    rows: Iterable[Tuple[str, int, int, int, str]], stamp: int, path: str
+) -> int:
+    """
+    Write a snapshot of `(revision, book_number, chapter, verse, text)`
+    rows ordered by revision, book, chapter and verse. The file at `path`
+    is replaced atomically. Returns the number of verses.
+    """
+    revisions: List[tuple] = []
+    for code, book_number, chapter, verse, content in rows:
+        if not revisions or revisions[-1][0] != code:
+            revisions.append(
+                (
+                    code,
+                    array("I"),
+                    array("I"),
+                    array("H"),
+                    array("I", [0]),
+                    bytearray(),
+                )
+            )
+        _, keys, firsts, numbers, offsets, blob = revisions[-1]
+        key = book_number << 16 | chapter
+        if not keys or keys[-1] != key:
+            keys.append(key)
+            firsts.append(len(numbers))
+        numbers.append(verse)
+        blob += content.encode("utf-8")
+        offsets.append(len(blob))
+
+    directory = os.path.dirname(os.path.abspath(path))
+    with tempfile.NamedTemporaryFile(
+        dir=directory, prefix=".corpus.", delete=False
+    ) as file:
+        file.write(b"\0" * (_HEADER.size + len(revisions) * _REVISION.size))
+        entries = []
+        for code, keys, firsts, numbers, offsets, blob in revisions:
+            firsts.append(len(numbers))
+            entries.append(
+                _REVISION.pack(
+                    code.encode("ascii"),
+                    len(keys),
+                    len(numbers),
+                    _write(file, keys),
+                    _write(file, firsts),
+                    _write(file, numbers),
+                    _write(file, offsets),
+                    _write(file, blob),
+                    len(blob),
+                )
+            )
+        size = file.tell()
+        file.seek(0)
+        file.write(_HEADER.pack(_MAGIC, stamp, size, len(revisions)))
+        file.write(b"".join(entries))
+    try:
+        os.chmod(file.name, 0o644)
+        os.replace(file.name, path)
+    except OSError:
+        os.unlink(file.name)
+        raise
+    return sum(len(numbers) for _, _, _, numbers, _, _ in revisions)
+
+
+def dump(conn: Connection, path: str) -> int:
+    """Write a snapshot of the verses of the database at `path`"""
+    stamp = conn.execute(_STAMP_QUERY).scalar() or 0
+    result = conn.execute(
+        select(
+            Verse.book_version_code,
+            Verse.book_number,
+            Verse.chapter,
+            Verse.verse,
+            Verse.text,
+        ).order_by(
+            Verse.book_version_code,
+            Verse.book_number,
+            Verse.chapter,
+            Verse.verse,
+        )
+    )
+    return write_snapshot(result.tuples(), stamp, path)
+
+
+async def open_snapshot(
+    path: str, async_session: async_sessionmaker[AsyncSession]
+) -> CorpusSnapshot | None:
+    """
+    Map the snapshot at `path` unless it is missing or older than the
+    corpus of the database, in which case the database is used.
+    """
+    try:
+        snapshot = CorpusSnapshot(path)
+    except (OSError, ValueError) as error:
+        logger.warning("Failed to open the corpus snapshot: %s", error)
+        return None
+
+    async with async_session() as session:
+        stamp = (await session.execute(_STAMP_QUERY)).scalar() or 0
+    if snapshot.stamp != stamp:
+        logger.warning(
+            "The corpus snapshot of version %d is stale, the corpus is at %d",
+            snapshot.stamp,
+            stamp,
+        )
+        return None
+
+    logger.info("Mapped %d verse(s) from %s", len(snapshot), path)
+    return snapshot
+
+
+def main(argv: List[str] | None = None) -> int:
+    """Command line entry point"""
+    parser = argparse.ArgumentParser(
+        prog="python -m biblebee_api.repo.corpus_snapshot",
+        description="Build a snapshot of the verses of the API database.",
+    )
+    parser.add_argument("path", help="path of the snapshot to write")
+    parser.add_argument(
+        "--database",
+        default="./resource/SUV.SQLite3",
+        help="path to the API database (default ./resource/SUV.SQLite3)",
+    )
+    args = parser.parse_args(argv)
+
+    logging.basicConfig(level=logging.INFO, format="%(message)s", force=True)
+
+    engine = create_engine(f"sqlite:///{args.database}")
+    try:
+        with engine.connect() as conn:
+            verses = dump(conn, args.path)
+    finally:
+        engine.dispose()
+    logger.info("Wrote %d verse(s) to %s", verses, args.path)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
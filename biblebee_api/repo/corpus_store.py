@@ -0,0 +1,221 @@
+"""Read-only, in-memory copy of the bible verses.
+
+description:
+-----------
+Bible text never changes at runtime, so the verses of every revision
+can be loaded once at startup and served without a database round-trip.
+Verses are kept per revision in flat, ordered tables and located through
+per (revision, book, chapter) offset tables.
+"""
+
+import logging
+import os
+from array import array
+from bisect import bisect_left, bisect_right
+from dataclasses import dataclass
+from typing import Dict, Iterable, List, Tuple
+
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import async_sessionmaker, AsyncSession
+
+from biblebee_api.model.bible_model import Verse
+from biblebee_api.service.verse_parser import VerseRanges
+
+logger = logging.getLogger(__name__)
+
+# Toggle for the in-memory corpus (disabled by default)
+CORPUS_IN_MEMORY = os.environ.get("CORPUS_IN_MEMORY", "0").lower() in (
+    "1",
+    "true",
+    "yes",
+)
+
+
+@dataclass(frozen=True, slots=True)
+class VerseRow:
+    """A verse as served by the corpus store"""
+
+    book_version_code: str
+    book_number: int
+    chapter: int
+    verse: int
+    text: str
+
+
+class _Revision:  # pylint: disable=too-few-public-methods
+    """Flat verse tables of a single revision"""
+
+    __slots__ = ("code", "books", "chapters", "verses", "texts")
+
+    def __init__(self, code: str) -> None:
+        self.code = code
+        # book_number -> ordered chapters
+        self.books: Dict[int, List[int]] = {}
+        # (book_number, chapter) -> (start, end) offsets
+        self.chapters: Dict[Tuple[int, int], Tuple[int, int]] = {}
+        self.verses = array("H")
+        self.texts: List[str] = []
+
+
+class CorpusStore:
+    """
+    Immutable store of the verses of all the revisions.
+
+    Rows of a revision are ordered by book, chapter and verse so that
+    a book or a chapter is a contiguous slice of the revision tables.
+    """
+
+    def __init__(self, revisions: Dict[str, _Revision]) -> None:
+        self._revisions = revisions
+
+    @classmethod
+    def from_rows(
+        cls, rows: Iterable[Tuple[str, int, int, int, str]]
+    ) -> "CorpusStore":
+        """
+        Build the store from `(revision, book_number, chapter, verse, text)`
+        rows ordered by revision, book, chapter and verse.
+        """
+        revisions: Dict[str, _Revision] = {}
+        rev = None
+        book_key = chapter_key = None
+
+        for code, book_number, chapter, verse, text in rows:
+            if rev is None or rev.code != code:
+                rev = revisions[code] = _Revision(code)
+                book_key = chapter_key = None
+
+            offset = len(rev.texts)
+
+            if book_number != book_key:
+                book_key = book_number
+                rev.books[book_number] = []
+
+            if (book_number, chapter) != chapter_key:
+                chapter_key = (book_number, chapter)
+                rev.books[book_number].append(chapter)
+                rev.chapters[chapter_key] = (offset, offset)
+
+            rev.verses.append(verse)
+            rev.texts.append(text)
+            rev.chapters[chapter_key] = (
+                rev.chapters[chapter_key][0],
+                offset + 1,
+            )
+
+        return cls(revisions)
+
+    def __len__(self) -> int:
+        return sum(len(rev.texts) for rev in self._revisions.values())
+
+    def _select(self, revisions: List[str]) -> List[_Revision]:
+        """
+        Revisions matching `revisions` or all of them if empty, ordered by
+        code as the verses of the database are
+        """
+        codes = self._revisions.keys()
+        if revisions:
+            codes = codes & set(revisions)
+        return [self._revisions[code] for code in sorted(codes)]
+
+    @staticmethod
+    def _rows(
+        rev: _Revision, book_number: int, chapter: int, start: int, end: int
+    ) -> List[VerseRow]:
+        return [
+            VerseRow(
+                rev.code,
+                book_number,
+                chapter,
+                rev.verses[i],
+                rev.texts[i],
+            )
+            for i in range(start, end)
+        ]
+
+    def _chapter(
+        self,
+        rev: _Revision,
+        book_number: int,
+        chapter: int,
+        ranges: Tuple[Tuple[int, int], ...] | None,
+    ) -> List[VerseRow]:
+        span = rev.chapters.get((book_number, chapter))
+        if span is None:
+            return []
+
+        start, end = span
+        if not ranges:
+            return self._rows(rev, book_number, chapter, start, end)
+
+        rows = []
+        for first, last in ranges:
+            # Verses are sorted within the chapter slice
+            lo = bisect_left(rev.verses, first, start, end)
+            hi = bisect_right(rev.verses, last, lo, end)
+            rows.extend(self._rows(rev, book_number, chapter, lo, hi))
+        return rows
+
+    def skim(
+        self,
+        book_number: int,
+        parts: VerseRanges,
+        revisions: List[str],
+    ) -> List[VerseRow]:
+        """Verses of the book selected by the `parts` of chapters"""
+        rows = []
+        for rev in self._select(revisions):
+            chapters = parts or dict.fromkeys(rev.books.get(book_number, []))
+            for chapter in sorted(chapters):
+                rows.extend(
+                    self._chapter(rev, book_number, chapter, chapters[chapter])
+                )
+        return rows
+
+    def chapter_verses(
+        self,
+        book_number: int,
+        chapter: int,
+        verses: List[int],
+        revisions: List[str],
+    ) -> List[VerseRow]:
+        """Verses in the chapter ordered by revision"""
+        ranges = tuple((verse, verse) for verse in sorted(set(verses)))
+        rows = []
+        for rev in self._select(revisions):
+            rows.extend(self._chapter(rev, book_number, chapter, ranges))
+        return rows
+
+    def verse(
+        self, book_number: int, chapter: int, verse: int, revisions: List[str]
+    ) -> List[VerseRow]:
+        """A single verse in each of the revisions"""
+        rows = []
+        for rev in self._select(revisions):
+            rows.extend(
+                self._chapter(rev, book_number, chapter, ((verse, verse),))
+            )
+        return rows
+
+
+async def load(async_session: async_sessionmaker[AsyncSession]) -> CorpusStore:
+    """Load the verses of all the revisions from the database"""
+    query = select(
+        Verse.book_version_code,
+        Verse.book_number,
+        Verse.chapter,
+        Verse.verse,
+        Verse.text,
+    ).order_by(
+        Verse.book_version_code,
+        Verse.book_number,
+        Verse.chapter,
+        Verse.verse,
+    )
+
+    async with async_session() as session:
+        result = await session.execute(query)
+        store = CorpusStore.from_rows(result.tuples())
+
+    logger.info("Loaded %d verse(s) into the corpus store", len(store))
+    return store
@@ -1,18 +1,93 @@
 """module to present `devices data repository`"""
 
-from typing import List
-from fastapi import Request
+import sqlite3
+from datetime import datetime, timezone
+from typing import AsyncIterator, List, Sequence
 from fastapi.encoders import jsonable_encoder
 
-from sqlalchemy import select
+from sqlalchemy import (
+    String,
+    bindparam,
+    delete,
+    func,
+    select,
+    tuple_,
+    type_coerce,
+)
+from sqlalchemy.dialects.sqlite import insert as sqlite_insert
 from sqlalchemy.ext.asyncio import (
     async_sessionmaker,
     AsyncSession,
 )
 
+from biblebee_api.database import async_session
 from biblebee_api.model.bible_model import Device
 from biblebee_api.schema.bible_schema import DeviceIn, DeviceOut
 
+# Number of tokens bound to a single delete statement
+_DELETE_CHUNK_SIZE = 500
+
+# Maximum number of bound parameters of an SQLite statement
+_MAX_VARIABLES = 32766 if sqlite3.sqlite_version_info >= (3, 32) else 999
+
+# Columns of the devices bound to the upsert
+_UPSERT_COLUMNS = ("user_id", "token", "device_infos")
+
+# Number of devices bound to a single multi-row upsert statement
+_UPSERT_CHUNK_SIZE = _MAX_VARIABLES // len(_UPSERT_COLUMNS)
+
+# Raw stored value of `updated_at`, compared as stored in the keysets
+_UPDATED_AT = type_coerce(Device.updated_at, String)
+
+# Keyset pages of tokens ordered by id
+_TOKENS_PAGE = (
+    select(Device.id.label("after_id"), Device.token)
+    .filter(Device.id > bindparam("after_id"))
+    .order_by(Device.id)
+    .limit(bindparam("limit"))
+)
+
+# Keyset pages of tokens updated since a timestamp, by (updated_at, id)
+_TOKENS_UPDATED_PAGE = (
+    select(
+        _UPDATED_AT.label("after_updated_at"),
+        Device.id.label("after_id"),
+        Device.token,
+    )
+    .filter(
+        tuple_(_UPDATED_AT, Device.id)
+        > tuple_(
+            bindparam("after_updated_at", type_=String), bindparam("after_id")
+        )
+    )
+    .order_by(Device.updated_at, Device.id)
+    .limit(bindparam("limit"))
+)
+
+
+def _upsert(rows: List[dict]):
+    """Insert the devices of `rows`, updating those whose token exists"""
+    statement = sqlite_insert(Device).values(rows)
+    return statement.on_conflict_do_update(
+        index_elements=[Device.token],
+        set_={
+            "user_id": statement.excluded.user_id,
+            "device_infos": statement.excluded.device_infos,
+            "updated_at": func.now(),  # pylint: disable=not-callable
+        },
+    )
+
+
+def _upsert_row(device: DeviceIn) -> dict:
+    return {column: getattr(device, column) for column in _UPSERT_COLUMNS}
+
+
+def _timestamp(value: datetime) -> str:
+    """Format `value` the way SQLite stores `CURRENT_TIMESTAMP` (UTC)"""
+    if value.tzinfo is not None:
+        value = value.astimezone(timezone.utc)
+    return value.strftime("%Y-%m-%d %H:%M:%S")
+
 
 class DevicesRepo:
     """data repository for the user devices."""
@@ -23,34 +98,24 @@ class DevicesRepo:
         """initialize devices repository"""
         self.async_session = async_session
 
-    def __query_by_token(self, token: str):
-        """Produces a select statement"""
-        return select(Device).filter(Device.token == token)
-
     def __query_by_user_id(self, user_id: int):
         """Produces a select statement"""
         return select(Device).filter(Device.user_id == user_id)
 
-    async def __upsert(self, device: Device, session: AsyncSession):
-        """Performs an upsert operation"""
-
-        query = self.__query_by_token(device.token)
-        old = (await session.execute(query)).scalars().one()
-
-        if not old is None:
-            await session.add(device)
-            await session.refresh(device)
-        else:
-            device.device_infos = device.device_infos
-            await session.flush()
-
-        return device
-
-    async def save(self, device: DeviceIn):
-        """Save device info"""
-        async with self.async_session() as session, session.begin() as trx:
-            await self.__upsert(Device(**device.model_dump()), trx)
-            return DeviceOut.model_validate(jsonable_encoder(device))
+    async def save_all(self, devices: Sequence[DeviceIn]) -> int:
+        """
+        Save many devices with one multi-row upsert statement per chunk of
+        `_UPSERT_CHUNK_SIZE` devices. Returns the number of devices saved.
+        """
+        # The last registration of a token wins
+        rows = list({dev.token: _upsert_row(dev) for dev in devices}.values())
+        async with self.async_session() as session, session.begin():
+            conn = await session.connection()
+            for start in range(0, len(rows), _UPSERT_CHUNK_SIZE):
+                await conn.execute(
+                    _upsert(rows[start : start + _UPSERT_CHUNK_SIZE])
+                )
+        return len(rows)
 
     async def all_tokens(self):
         """Get device tokens"""
@@ -58,6 +123,52 @@ class DevicesRepo:
             result = await session.execute(select(Device.token))
             return result.scalars().all()
 
+    async def token_pages(
+        self,
+        page_size: int = 1000,
+        updated_since: datetime | None = None,
+    ) -> AsyncIterator[Sequence[str]]:
+        """
+        Iterate the device tokens in pages of `page_size` tokens, optionally
+        only of the devices updated since `updated_since`.
+
+        Pages are read with a keyset so every page is a short indexed query
+        and no read transaction is held between the pages.
+        """
+        if updated_since is None:
+            query, params = _TOKENS_PAGE, {"after_id": 0}
+        else:
+            query = _TOKENS_UPDATED_PAGE
+            params = {
+                "after_updated_at": _timestamp(updated_since),
+                "after_id": 0,
+            }
+
+        while True:
+            async with self.async_session() as session:
+                result = await session.execute(
+                    query, {**params, "limit": page_size}
+                )
+                rows = result.all()
+            if not rows:
+                return
+            yield [row.token for row in rows]
+            if len(rows) < page_size:
+                return
+            params = {key: getattr(rows[-1], key) for key in params}
+
+    async def delete_tokens(self, tokens: Sequence[str]) -> int:
+        """Delete the devices of the `tokens`. Returns the number deleted"""
+        deleted = 0
+        async with self.async_session() as session, session.begin():
+            for start in range(0, len(tokens), _DELETE_CHUNK_SIZE):
+                chunk = tokens[start : start + _DELETE_CHUNK_SIZE]
+                result = await session.execute(
+                    delete(Device).filter(Device.token.in_(chunk))
+                )
+                deleted += result.rowcount
+        return deleted
+
     async def get_by_user_id(self, user_id: int) -> List[DeviceOut]:
         """Get device by user id"""
         async with self.async_session() as session:
@@ -65,8 +176,9 @@ class DevicesRepo:
             model = result.scalar_one()
             return DeviceOut.model_validate(jsonable_encoder(model))
 
-    def request_scoped(self, req: Request):
+    @staticmethod
+    def request_scoped() -> "DevicesRepo":
         """
         Return an instance of the repository to be used in the context of scope lifecyle
         """
-        return DevicesRepo(req.state.async_session)
+        return DevicesRepo(async_session)
@@ -0,0 +1,109 @@
+"""Repository for the full-text search of the verses"""
+
+import base64
+import re
+from typing import List, Tuple
+
+from sqlalchemy import bindparam, text
+from sqlalchemy.ext.asyncio import async_sessionmaker, AsyncSession
+
+from biblebee_api.database import read_session
+
+# Hits ranked by BM25 and paginated with a (rank, rowid) keyset
+_SEARCH_QUERY = text(
+    "SELECT f.rowid AS rowid, f.rank AS rank, "
+    "v.book_version_code, v.book_number, v.chapter, v.verse, v.text, "
+    "snippet(verses_fts, 0, '<b>', '</b>', '…', :snippet_tokens) "
+    "AS snippet "
+    "FROM verses_fts AS f JOIN verses AS v ON v.rowid = f.rowid "
+    "WHERE verses_fts MATCH :match "
+    "AND v.book_version_code IN :revisions "
+    "AND (f.rank, f.rowid) > (:after_rank, :after_rowid) "
+    "ORDER BY f.rank, f.rowid "
+    "LIMIT :limit"
+).bindparams(bindparam("revisions", expanding=True))
+
+_TERM_PATTERN = re.compile(r"\w+")
+
+
+def to_match_expression(query: str) -> str:
+    """
+    Convert free text into an FTS5 match expression.
+
+    Every word is quoted so that FTS5 operators in the input are taken
+    literally, and the last word is matched as a prefix.
+    """
+    terms = [f'"{term}"' for term in _TERM_PATTERN.findall(query)]
+    if terms:
+        terms[-1] += "*"
+    return " ".join(terms)
+
+
+def encode_cursor(rank: float, rowid: int) -> str:
+    """Encode the keyset of the last hit into an opaque cursor"""
+    return base64.urlsafe_b64encode(f"{rank!r}:{rowid}".encode()).decode()
+
+
+def decode_cursor(cursor: str | None) -> Tuple[float, int]:
+    """Decode a cursor produced by `encode_cursor`"""
+    if not cursor:
+        return float("-inf"), 0
+    rank, rowid = base64.urlsafe_b64decode(cursor.encode()).split(b":")
+    return float(rank), int(rowid)
+
+
+class SearchRepo:  # pylint: disable=too-few-public-methods
+    """Data repository for searching the bible verses"""
+
+    def __init__(
+        self, async_session: async_sessionmaker[AsyncSession]
+    ) -> None:
+        """Initialize search repository"""
+        self.async_session = async_session
+
+    async def search(
+        self,
+        query: str,
+        revisions: List[str],
+        limit: int,
+        cursor: str | None = None,
+        snippet_tokens: int = 16,
+    ) -> Tuple[List[dict], str | None]:
+        """
+        Search verses matching `query` in the `revisions`.
+
+        Returns the hits and the cursor of the next page if there is one.
+        """
+        match = to_match_expression(query)
+        if not match or not revisions:
+            return [], None
+
+        after_rank, after_rowid = decode_cursor(cursor)
+        params = {
+            "match": match,
+            "revisions": revisions,
+            "after_rank": after_rank,
+            "after_rowid": after_rowid,
+            "snippet_tokens": snippet_tokens,
+            "limit": limit + 1,
+        }
+
+        async with self.async_session() as session:
+            result = await session.execute(_SEARCH_QUERY, params)
+            rows = result.mappings().all()
+
+        hits = [dict(row) for row in rows[:limit]]
+        next_cursor = None
+        if len(rows) > limit:
+            last = hits[-1]
+            next_cursor = encode_cursor(last["rank"], last["rowid"])
+
+        for hit in hits:
+            del hit["rowid"]
+
+        return hits, next_cursor
+
+    @staticmethod
+    def request_scoped() -> "SearchRepo":
+        """Creates and return a data repository for searching verses."""
+        return SearchRepo(async_session=read_session)
@@ -18,6 +18,12 @@ class DataResponse(
     data: RT
 
 
+class PageResponse(DataResponse[RT], Generic[RT]):
+    """Wrapper around a page of data with the cursor of the next page"""
+
+    next_cursor: Optional[str] = None
+
+
 class DeviceIn(BaseModel):
     """Data transfer object that allows clients to create devices"""
 
@@ -37,6 +43,13 @@ class DeviceOut(BaseModel):
     updated_at: datetime
 
 
+class DevicesAcceptedOut(BaseModel):
+    """Outcome of a registration of devices accepted for writing"""
+
+    received: int
+    pending: int
+
+
 class DailyVerseOut(BaseModel):  #  pylint: disable=too-few-public-methods
     """
     Model schema for the data exchange of daily bible vers
@@ -101,3 +114,25 @@ class VerseOut(BaseModel):
 
     # model config
     model_config = ConfigDict(from_attributes=True)
+
+
+class ParallelVerseOut(BaseModel):
+    """A verse in several revisions, side by side"""
+
+    chapter: int
+    verse: int
+    texts: List[Optional[str]]
+
+
+class ParallelVersesOut(BaseModel):
+    """Verses aligned across revisions, `texts` following `revisions`"""
+
+    revisions: List[str]
+    verses: List[ParallelVerseOut]
+
+
+class SearchHitOut(VerseOut):
+    """Model schema for a verse matching a search"""
+
+    rank: float
+    snippet: str
@@ -0,0 +1,65 @@
+"""Encoders for the responses of the hot paths.
+
+Verse rows are serialized straight into JSON bytes in a single pass,
+skipping ORM hydration and pydantic validation. The encoded documents
+conform to the schemas defined in `bible_schema`.
+"""
+
+import json
+from typing import Iterable, Protocol, Sequence
+
+from biblebee_api.service.metrics import serialization
+
+_encoder = json.JSONEncoder(ensure_ascii=False, separators=(",", ":"))
+
+
+class VerseLike(Protocol):  # pylint: disable=too-few-public-methods
+    """Any row exposing the columns of a verse as attributes"""
+
+    book_version_code: str
+    book_number: int
+    chapter: int
+    verse: int
+    text: str
+
+
+def _verse_dict(row: VerseLike) -> dict:
+    return {
+        "book_version_code": row.book_version_code,
+        "book_number": row.book_number,
+        "chapter": row.chapter,
+        "verse": row.verse,
+        "text": row.text,
+    }
+
+
+@serialization
+def encode_verses(rows: Iterable[VerseLike]) -> bytes:
+    """Encode verse rows as a `DataResponse[List[VerseOut]]` document"""
+    data = [_verse_dict(row) for row in rows]
+    return _encoder.encode({"data": data}).encode("utf-8")
+
+
+@serialization
+def encode_verse_lines(rows: Iterable[VerseLike]) -> bytes:
+    """Encode verse rows as newline delimited `VerseOut` documents"""
+    lines = [_encoder.encode(_verse_dict(row)) for row in rows]
+    return ("\n".join(lines) + "\n").encode("utf-8")
+
+
+@serialization
+def encode_parallel_verses(
+    revisions: Sequence[str], verses: Iterable[Sequence]
+) -> bytes:
+    """
+    Encode verses aligned across `revisions` as a
+    `DataResponse[ParallelVersesOut]` document
+    """
+    data = {
+        "revisions": list(revisions),
+        "verses": [
+            {"chapter": chapter, "verse": verse, "texts": texts}
+            for chapter, verse, texts in verses
+        ],
+    }
+    return _encoder.encode({"data": data}).encode("utf-8")
@@ -1,17 +1,26 @@
 """Handle delivery of notifications to FCM"""
 
+import asyncio
 import json
 import logging
 import os
-from typing import List
+from typing import Sequence
 
-from firebase_admin import messaging, credentials, initialize_app
+from firebase_admin import (
+    credentials,
+    exceptions,
+    get_app,
+    initialize_app,
+    messaging,
+)
+
+from biblebee_api.service.fanout import BatchResult, Notification
 
 logger = logging.getLogger(__name__)
 
 
-def init():
-    """Initialize firebase admin."""
+def init() -> bool:
+    """Initialize firebase admin. Returns whether firebase is configured"""
 
     # Containerized environment
     firebase_config = os.environ.get("FIREBASE_CONFIG_FILE", None)
@@ -20,26 +29,74 @@ def init():
         if not firebase_config is None:
             firebase_config = json.loads(firebase_config)
 
+    if firebase_config is None:
+        logger.warning("Firebase is not configured, notifications are off")
+        return False
+
     logger.debug(firebase_config)
     creds = credentials.Certificate(cert=firebase_config)
     initialize_app(credential=creds)
+    return True
 
 
-def send(
-    msg: str, title: str, body: str, tokens: List[str]
-) -> messaging.BatchResponse:
-    """Dispatch message through firebase cloud message"""
-    notification = messaging.Notification(title=title, body=body)
+class FirebaseTransport:  # pylint: disable=too-few-public-methods
+    """Fan-out transport through firebase cloud messaging"""
 
-    message = messaging.MulticastMessage(
-        data={"message": msg}, tokens=tokens, notification=notification
+    # Errors of a token which will never be delivered again
+    UNREGISTERED = (
+        messaging.UnregisteredError,
+        messaging.SenderIdMismatchError,
     )
 
-    try:
-        br = messaging.send_multicast(message)
+    # Errors worth retrying
+    TRANSIENT = (
+        exceptions.UnavailableError,
+        exceptions.InternalError,
+        exceptions.ResourceExhaustedError,
+        exceptions.DeadlineExceededError,
+        exceptions.UnknownError,
+    )
 
-        logger.debug("Sent message to %s device(s)", br.success_count)
-    except Exception as exc:  # pylint: disable=broad-exception-caught
-        logger.error(
-            "An error occured while sending message using firebase. %s", exc
+    def __init__(self) -> None:
+        try:
+            get_app()
+            self.configured = True
+        except ValueError:
+            self.configured = init()
+
+    async def send(
+        self, notification: Notification, tokens: Sequence[str]
+    ) -> BatchResult:
+        """Dispatch the notification to a batch of tokens"""
+        if not self.configured:
+            # Nothing can be delivered, hence nothing is worth retrying
+            return BatchResult(failed=len(tokens))
+
+        message = messaging.MulticastMessage(
+            data={"message": notification.message},
+            tokens=list(tokens),
+            notification=messaging.Notification(
+                title=notification.title, body=notification.body
+            ),
         )
+
+        try:
+            br = await asyncio.to_thread(
+                messaging.send_each_for_multicast, message
+            )
+        except self.TRANSIENT as exc:
+            logger.warning("Sending a batch failed, will retry. %s", exc)
+            return BatchResult(retry=list(tokens))
+
+        result = BatchResult(sent=br.success_count)
+        for token, response in zip(tokens, br.responses):
+            if response.success:
+                continue
+            if isinstance(response.exception, self.UNREGISTERED):
+                result.unregistered.append(token)
+            elif isinstance(response.exception, self.TRANSIENT):
+                result.retry.append(token)
+            else:
+                result.failed += 1
+        logger.debug("Sent message to %s device(s)", br.success_count)
+        return result
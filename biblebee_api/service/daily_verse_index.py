@@ -0,0 +1,104 @@
+"""In-memory tag index of the curated daily verses.
+
+description:
+-----------
+Daily verses are tagged with comma separated tags e.g., `salvation,faith`.
+The index maps every single tag to the array of ids of the daily verses
+carrying it, so that a random daily verse is picked by offset in constant
+time instead of sorting the whole table by `random()`. The index is built
+once and rebuilt only when the daily verses version stamp changes.
+"""
+
+import logging
+import random
+import time
+from array import array
+from bisect import bisect_right
+from itertools import accumulate
+from typing import Dict, Iterable, List, Tuple
+
+from sqlalchemy import select, text
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from biblebee_api.model.bible_model import DailyVerse
+from biblebee_api.service.response_cache import CORPUS_STAMP_TTL
+
+logger = logging.getLogger(__name__)
+
+_STAMP_QUERY = text("SELECT version FROM daily_verses_version WHERE id = 1")
+
+
+def split_tags(tags: str | None) -> List[str]:
+    """Normalize the comma separated `tags` of a daily verse"""
+    return [
+        tag.strip().lower() for tag in (tags or "").split(",") if tag.strip()
+    ]
+
+
+class DailyVerseIndex:
+    """Map of tag to the ids of the daily verses carrying the tag"""
+
+    def __init__(self, ids_by_tag: Dict[str, array], stamp: int = 0) -> None:
+        self.stamp = stamp
+        self.ids_by_tag = ids_by_tag
+        self.tags = list(ids_by_tag)
+        # Cumulative sizes of the tags for the weighted choice of a tag
+        self._offsets = list(
+            accumulate(len(ids) for ids in ids_by_tag.values())
+        )
+
+    @classmethod
+    def from_rows(
+        cls, rows: Iterable[Tuple[int, str]], stamp: int = 0
+    ) -> "DailyVerseIndex":
+        """Build the index from (id, tags) rows"""
+        ids_by_tag: Dict[str, array] = {}
+        for verse_id, tags in rows:
+            for tag in split_tags(tags):
+                ids_by_tag.setdefault(tag, array("I")).append(verse_id)
+        return cls(ids_by_tag, stamp)
+
+    def __len__(self) -> int:
+        return self._offsets[-1] if self._offsets else 0
+
+    def random_tag(self, rng: random.Random = random) -> str:
+        """A tag chosen with a probability proportional to its verses"""
+        if not self._offsets:
+            raise LookupError("There are no daily verses")
+        offset = rng.randrange(self._offsets[-1])
+        return self.tags[bisect_right(self._offsets, offset)]
+
+    def choose(
+        self, tag: str | None = None, rng: random.Random = random
+    ) -> int:
+        """Id of a random daily verse tagged with `tag`, or any if None"""
+        if tag is None:
+            tag = self.random_tag(rng)
+        ids = self.ids_by_tag.get(tag.strip().lower())
+        if not ids:
+            raise LookupError(f"There are no daily verses tagged {tag}")
+        return ids[rng.randrange(len(ids))]
+
+
+_index = DailyVerseIndex({}, stamp=-1)
+_index_checked_at = float("-inf")
+
+
+async def get_index(session: AsyncSession) -> DailyVerseIndex:
+    """
+    The process wide index, rebuilt within `session` if the daily verses
+    changed. The version is re-read at most every `CORPUS_STAMP_TTL`.
+    """
+    global _index, _index_checked_at  # pylint: disable=global-statement
+
+    now = time.monotonic()
+    if now - _index_checked_at < CORPUS_STAMP_TTL:
+        return _index
+
+    stamp = (await session.execute(_STAMP_QUERY)).scalar()
+    if stamp != _index.stamp:
+        result = await session.execute(select(DailyVerse.id, DailyVerse.tags))
+        _index = DailyVerseIndex.from_rows(result.all(), stamp)
+        logger.info("Indexed %d tag(s) of the daily verses", len(_index.tags))
+    _index_checked_at = now
+    return _index
@@ -0,0 +1,107 @@
+"""Store of the current daily verse.
+
+description:
+-----------
+The worker publishes the daily verse into a JSON file which is replaced
+atomically, so readers never see a half written file. The API keeps the
+verse in memory as encoded bytes and reloads it only when the file is
+replaced. When there is no verse yet, concurrent requests share a single
+regeneration instead of starting one each.
+"""
+
+import asyncio
+import json
+import logging
+import os
+import tempfile
+import time
+from typing import Awaitable, Callable
+
+logger = logging.getLogger(__name__)
+
+# Path to the published daily verse
+DAILY_VERSE_FILE = os.environ.get(
+    "DAILY_VERSE_FILE", "./resource/daily_verse.json"
+)
+
+# Seconds between the checks of the published file
+_CHECK_INTERVAL = 1.0
+
+
+def publish(content: str, path: str = DAILY_VERSE_FILE):
+    """Atomically replace the published daily verse with `content`"""
+    directory = os.path.dirname(os.path.abspath(path))
+    with tempfile.NamedTemporaryFile(
+        "w",
+        encoding="utf8",
+        dir=directory,
+        prefix=".daily_verse.",
+        delete=False,
+    ) as file:
+        file.write(content)
+        file.flush()
+        os.fsync(file.fileno())
+    try:
+        os.chmod(file.name, 0o644)
+        os.replace(file.name, path)
+    except OSError:
+        os.unlink(file.name)
+        raise
+
+
+class DailyVerseStore:
+    """In-memory copy of the published daily verse"""
+
+    def __init__(self, path: str = DAILY_VERSE_FILE) -> None:
+        self.path = path
+        self.body: bytes | None = None
+        self._mtime_ns: int | None = None
+        self._checked_at = float("-inf")
+        self._regeneration: asyncio.Task | None = None
+
+    def set(self, content: str):
+        """Replace the verse in memory with the JSON `content`"""
+        self.body = json.dumps(
+            json.loads(content), ensure_ascii=False, separators=(",", ":")
+        ).encode("utf-8")
+
+    def current(self) -> bytes | None:
+        """The encoded verse, reloaded if the published file was replaced"""
+        now = time.monotonic()
+        if now - self._checked_at < _CHECK_INTERVAL:
+            return self.body
+        self._checked_at = now
+
+        try:
+            mtime_ns = os.stat(self.path).st_mtime_ns
+            if mtime_ns != self._mtime_ns:
+                with open(self.path, "r", encoding="utf8") as file:
+                    self.set(file.read())
+                self._mtime_ns = mtime_ns
+                logger.info("Loaded the daily verse from %s", self.path)
+        except FileNotFoundError:
+            logger.debug("The daily verse is not published yet")
+        except (OSError, ValueError) as error:
+            logger.warning("Failed to load the daily verse: %s", error)
+        return self.body
+
+    def regenerate(
+        self, generate: Callable[[], Awaitable[str]]
+    ) -> asyncio.Task:
+        """
+        Regenerate the verse with `generate`, unless a regeneration is
+        already running in which case that one is returned.
+        """
+        if self._regeneration is None or self._regeneration.done():
+            self._regeneration = asyncio.create_task(self._run(generate))
+        return self._regeneration
+
+    async def _run(self, generate: Callable[[], Awaitable[str]]):
+        try:
+            self.set(await generate())
+        except Exception:  # pylint: disable=broad-exception-caught
+            logger.exception("Failed to regenerate the daily verse")
+
+
+# Process wide store of the daily verse
+store = DailyVerseStore()
@@ -0,0 +1,129 @@
+"""Write-behind buffer of the device registrations.
+
+description:
+-----------
+Registrations are accepted into memory and written to SQLite in the
+background, so requests do not queue behind the single writer of the
+database. Pending registrations are coalesced by token and flushed in one
+transaction every `DEVICE_FLUSH_INTERVAL_MS` milliseconds or as soon as
+`DEVICE_FLUSH_SIZE` tokens are pending. Once `DEVICE_QUEUE_LIMIT` tokens
+are pending, new registrations wait for a flush, and the buffer is drained
+when the application shuts down.
+"""
+
+import asyncio
+import logging
+import os
+from typing import Awaitable, Callable, Dict, Sequence
+
+from fastapi import Request
+
+from biblebee_api.schema.bible_schema import DeviceIn
+
+logger = logging.getLogger(__name__)
+
+# Milliseconds between the flushes of the pending registrations
+DEVICE_FLUSH_INTERVAL_MS = int(
+    os.environ.get("DEVICE_FLUSH_INTERVAL_MS", "200")
+)
+
+# Number of pending tokens triggering a flush before the interval elapses
+DEVICE_FLUSH_SIZE = int(os.environ.get("DEVICE_FLUSH_SIZE", "5000"))
+
+# Number of pending tokens beyond which registrations wait for a flush
+DEVICE_QUEUE_LIMIT = int(os.environ.get("DEVICE_QUEUE_LIMIT", "50000"))
+
+
+class DeviceWriter:
+    """Coalescing write-behind buffer of device registrations"""
+
+    def __init__(
+        self,
+        save_all: Callable[[Sequence[DeviceIn]], Awaitable[int]],
+        flush_interval: float = DEVICE_FLUSH_INTERVAL_MS / 1000,
+        flush_size: int = DEVICE_FLUSH_SIZE,
+        max_pending: int = DEVICE_QUEUE_LIMIT,
+    ) -> None:
+        self.save_all = save_all
+        self.flush_interval = flush_interval
+        self.flush_size = flush_size
+        self.max_pending = max_pending
+        self._pending: Dict[str, DeviceIn] = {}
+        self._flush_needed = asyncio.Event()
+        self._flushed = asyncio.Condition()
+        self._closed = False
+        self._task: asyncio.Task | None = None
+
+    @property
+    def pending(self) -> int:
+        """Number of registrations waiting to be written"""
+        return len(self._pending)
+
+    def start(self):
+        """Start flushing in the background"""
+        self._task = asyncio.create_task(self._run())
+
+    async def submit(self, devices: Sequence[DeviceIn], timeout: float = 5.0):
+        """
+        Accept `devices` for writing. Waits up to `timeout` seconds while
+        the buffer is full and raises `asyncio.TimeoutError` past that.
+        """
+        if self._closed:
+            raise RuntimeError("The device writer is closed")
+
+        async with self._flushed:
+            await asyncio.wait_for(
+                self._flushed.wait_for(
+                    lambda: self.pending < self.max_pending or self._closed
+                ),
+                timeout,
+            )
+        for device in devices:
+            self._pending[device.token] = device
+        if self.pending >= self.flush_size:
+            self._flush_needed.set()
+
+    async def flush(self) -> int:
+        """Write the pending registrations. Returns the number written"""
+        if not self._pending:
+            return 0
+        devices, self._pending = self._pending, {}
+        try:
+            saved = await self.save_all(list(devices.values()))
+        except Exception:
+            # Put the registrations back unless they were since superseded
+            self._pending = {**devices, **self._pending}
+            raise
+        async with self._flushed:
+            self._flushed.notify_all()
+        logger.debug("Flushed %d device registration(s)", saved)
+        return saved
+
+    async def _run(self):
+        while not self._closed:
+            try:
+                await asyncio.wait_for(
+                    self._flush_needed.wait(), self.flush_interval
+                )
+            except asyncio.TimeoutError:
+                pass
+            self._flush_needed.clear()
+            try:
+                await self.flush()
+            except Exception:  # pylint: disable=broad-exception-caught
+                logger.exception("Failed to flush the device registrations")
+
+    async def close(self):
+        """Stop flushing in the background and drain the buffer"""
+        self._closed = True
+        self._flush_needed.set()
+        if self._task is not None:
+            await self._task
+        await self.flush()
+        async with self._flushed:
+            self._flushed.notify_all()
+
+    @staticmethod
+    def request_scoped(request: Request) -> "DeviceWriter":
+        """The device writer of the application"""
+        return request.app.state.device_writer
@@ -0,0 +1,237 @@
+"""Fan-out of a notification to all the registered devices.
+
+description:
+-----------
+Tokens are consumed page by page and split into batches of at most
+`FANOUT_BATCH_SIZE` tokens, the cap of an FCM multicast. Batches are
+dispatched concurrently by a bounded pool of senders, transient failures
+are retried with exponential backoff, and the tokens reported as no longer
+registered are handed back in bulk so that they can be pruned.
+
+The transport is pluggable so that large fan-outs can be exercised against
+`FakeTransport` without reaching FCM.
+"""
+
+import asyncio
+import logging
+import os
+import random
+import time
+from dataclasses import dataclass, field
+from typing import (
+    AsyncIterable,
+    Awaitable,
+    Callable,
+    Iterable,
+    List,
+    Protocol,
+    Sequence,
+)
+
+logger = logging.getLogger(__name__)
+
+# Maximum number of tokens of a multicast message
+FANOUT_BATCH_SIZE = 500
+
+# Number of batches in flight
+FANOUT_CONCURRENCY = int(os.environ.get("FANOUT_CONCURRENCY", "8"))
+
+# Number of retries of the transient failures of a batch
+FANOUT_MAX_RETRIES = int(os.environ.get("FANOUT_MAX_RETRIES", "3"))
+
+
+@dataclass(frozen=True, slots=True)
+class Notification:
+    """Notification sent to the devices"""
+
+    message: str
+    title: str
+    body: str = ""
+
+
+@dataclass(slots=True)
+class BatchResult:
+    """Outcome of sending a batch of tokens"""
+
+    sent: int = 0
+    # Tokens which are no longer registered and should be pruned
+    unregistered: List[str] = field(default_factory=list)
+    # Tokens which failed with a transient error and may be retried
+    retry: List[str] = field(default_factory=list)
+    # Tokens which failed permanently
+    failed: int = 0
+
+
+class Transport(Protocol):  # pylint: disable=too-few-public-methods
+    """Delivers a notification to a batch of device tokens"""
+
+    async def send(
+        self, notification: Notification, tokens: Sequence[str]
+    ) -> BatchResult:
+        """Send `notification` to at most `FANOUT_BATCH_SIZE` tokens"""
+
+
+@dataclass(slots=True)
+class FanOutReport:
+    """Summary of a fan-out"""
+
+    batches: int = 0
+    sent: int = 0
+    failed: int = 0
+    retries: int = 0
+    pruned: int = 0
+    seconds: float = 0.0
+
+    def as_dict(self) -> dict:
+        """Report as a dictionary"""
+        return {
+            "batches": self.batches,
+            "sent": self.sent,
+            "failed": self.failed,
+            "retries": self.retries,
+            "pruned": self.pruned,
+            "seconds": self.seconds,
+        }
+
+
+class FakeTransport:  # pylint: disable=too-few-public-methods
+    """
+    Transport simulating FCM for benchmarks and tests.
+
+    Every batch takes `latency` seconds. Tokens matching `is_unregistered`
+    are reported as unregistered and a `transient_rate` share of the
+    batches fails as a whole with a transient error.
+    """
+
+    def __init__(
+        self,
+        latency: float = 0.0,
+        transient_rate: float = 0.0,
+        is_unregistered: Callable[[str], bool] = lambda _: False,
+        seed: int | None = None,
+    ) -> None:
+        self.latency = latency
+        self.transient_rate = transient_rate
+        self.is_unregistered = is_unregistered
+        self.calls = 0
+        self._random = random.Random(seed)
+
+    async def send(
+        self, notification: Notification, tokens: Sequence[str]
+    ) -> BatchResult:
+        self.calls += 1
+        await asyncio.sleep(self.latency)
+        if self._random.random() < self.transient_rate:
+            return BatchResult(retry=list(tokens))
+        unregistered = [t for t in tokens if self.is_unregistered(t)]
+        return BatchResult(
+            sent=len(tokens) - len(unregistered), unregistered=unregistered
+        )
+
+
+async def batched(
+    pages: AsyncIterable[Sequence[str]], size: int = FANOUT_BATCH_SIZE
+) -> AsyncIterable[List[str]]:
+    """Re-split pages of tokens into batches of at most `size` tokens"""
+    batch: List[str] = []
+    async for page in pages:
+        for token in page:
+            batch.append(token)
+            if len(batch) == size:
+                yield batch
+                batch = []
+    if batch:
+        yield batch
+
+
+async def _send_with_retry(
+    transport: Transport,
+    notification: Notification,
+    tokens: Sequence[str],
+    report: FanOutReport,
+    max_retries: int,
+    backoff: float,
+) -> List[str]:
+    """Send a batch, retrying the transient failures. Returns dead tokens"""
+    unregistered: List[str] = []
+    for attempt in range(max_retries + 1):
+        try:
+            result = await transport.send(notification, tokens)
+        except Exception as exc:  # pylint: disable=broad-exception-caught
+            logger.warning("Sending a batch failed: %s", exc)
+            result = BatchResult(retry=list(tokens))
+
+        report.sent += result.sent
+        report.failed += result.failed
+        unregistered.extend(result.unregistered)
+        tokens = result.retry
+        if not tokens:
+            break
+        if attempt < max_retries:
+            report.retries += 1
+            delay = backoff * 2**attempt
+            await asyncio.sleep(delay + random.uniform(0, delay))
+    else:
+        logger.error("Gave up on %d token(s) after retries", len(tokens))
+        report.failed += len(tokens)
+    return unregistered
+
+
+async def fan_out(
+    notification: Notification,
+    pages: AsyncIterable[Sequence[str]],
+    transport: Transport,
+    prune: Callable[[List[str]], Awaitable[int]] | None = None,
+    concurrency: int = FANOUT_CONCURRENCY,
+    batch_size: int = FANOUT_BATCH_SIZE,
+    max_retries: int = FANOUT_MAX_RETRIES,
+    backoff: float = 0.5,
+) -> FanOutReport:
+    """
+    Send `notification` to the tokens of `pages` through `transport`.
+
+    At most `concurrency` batches are in flight. The unregistered tokens
+    are passed to `prune` in bulk, which returns the number pruned.
+    """
+    report = FanOutReport()
+    started = time.perf_counter()
+    queue: asyncio.Queue[List[str] | None] = asyncio.Queue(concurrency * 2)
+    unregistered: List[str] = []
+
+    async def sender():
+        while (tokens := await queue.get()) is not None:
+            unregistered.extend(
+                await _send_with_retry(
+                    transport,
+                    notification,
+                    tokens,
+                    report,
+                    max_retries,
+                    backoff,
+                )
+            )
+
+    async def flush(tokens: Iterable[str]):
+        if prune is not None and tokens:
+            report.pruned += await prune(list(tokens))
+
+    senders = [asyncio.create_task(sender()) for _ in range(concurrency)]
+    try:
+        async for batch in batched(pages, batch_size):
+            report.batches += 1
+            await queue.put(batch)
+            if len(unregistered) >= batch_size:
+                dead = unregistered[:]
+                del unregistered[:]
+                await flush(dead)
+        for _ in senders:
+            await queue.put(None)
+        await asyncio.gather(*senders)
+    finally:
+        for task in senders:
+            task.cancel()
+
+    await flush(unregistered)
+    report.seconds = time.perf_counter() - started
+    logger.info("Fan-out finished: %s", report.as_dict())
+    return report
@@ -0,0 +1,413 @@
+"""Request metrics in the Prometheus text format.
+
+description:
+-----------
+`MetricsMiddleware` measures every request into histograms labelled by
+route: the latency, and the database queries, their time, the rows they
+fetched, the time spent waiting for a pooled connection and the time spent
+serializing the response. The figures of the request in flight are
+gathered through a context variable by the SQLAlchemy event hooks of
+`instrument_engine` and `instrument_sessions` and by the encoders
+decorated with `serialization`. Rows are counted from the results of the
+ORM sessions, and streamed results are counted by their consumers with
+`observe_rows`.
+
+Under gunicorn every worker keeps its own histograms. When `METRICS_DIR`
+is set, workers publish them into that directory every
+`METRICS_FLUSH_INTERVAL` seconds and `/metrics` sums the histograms of all
+the workers, so any worker answers a scrape for the whole server. Workers
+remove their file when they exit, and the files of the workers which died
+are removed when collected.
+"""
+
+import asyncio
+import functools
+import json
+import logging
+import os
+import tempfile
+import time
+from bisect import bisect_left
+from contextvars import ContextVar
+from typing import Callable, Dict, Iterable, List, NamedTuple, Tuple, Type
+
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+from sqlalchemy.orm import ORMExecuteState, Session
+
+logger = logging.getLogger(__name__)
+
+# Directory shared by the workers of a server to publish their metrics
+METRICS_DIR = os.environ.get("METRICS_DIR")
+
+# Seconds between the publications of the metrics of a worker
+METRICS_FLUSH_INTERVAL = float(os.environ.get("METRICS_FLUSH_INTERVAL", "5"))
+
+_SECONDS = (
+    0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0,
+    2.5, 5.0, 10.0,
+)  # fmt: skip
+_QUERIES = (0, 1, 2, 3, 5, 10, 25, 50, 100)
+_ROWS = (0, 1, 10, 100, 1000, 10000, 100000)
+
+
+class Family(NamedTuple):
+    """Histograms sharing a name, help text, labels and buckets"""
+
+    name: str
+    help: str
+    labels: Tuple[str, ...]
+    buckets: Tuple[float, ...]
+
+
+REQUEST_SECONDS = Family(
+    "biblebee_request_duration_seconds",
+    "Latency of the requests",
+    ("method", "route", "status"),
+    _SECONDS,
+)
+REQUEST_QUERIES = Family(
+    "biblebee_request_db_queries",
+    "Database queries executed per request",
+    ("route",),
+    _QUERIES,
+)
+REQUEST_QUERY_SECONDS = Family(
+    "biblebee_request_db_seconds",
+    "Time spent in database queries per request",
+    ("route",),
+    _SECONDS,
+)
+REQUEST_ROWS = Family(
+    "biblebee_request_db_rows",
+    "Rows fetched from the database per request",
+    ("route",),
+    _ROWS,
+)
+REQUEST_POOL_WAIT_SECONDS = Family(
+    "biblebee_request_pool_wait_seconds",
+    "Time spent waiting for pooled connections per request",
+    ("route",),
+    _SECONDS,
+)
+REQUEST_SERIALIZE_SECONDS = Family(
+    "biblebee_request_serialize_seconds",
+    "Time spent serializing the responses per request",
+    ("route",),
+    _SECONDS,
+)
+
+FAMILIES = (
+    REQUEST_SECONDS,
+    REQUEST_QUERIES,
+    REQUEST_QUERY_SECONDS,
+    REQUEST_ROWS,
+    REQUEST_POOL_WAIT_SECONDS,
+    REQUEST_SERIALIZE_SECONDS,
+)
+
+# Counts of the buckets of a histogram followed by the sum of the values
+Series = List[float]
+
+
+class Registry:
+    """Histograms of a process"""
+
+    def __init__(self) -> None:
+        self.series: Dict[str, Dict[Tuple[str, ...], Series]] = {
+            family.name: {} for family in FAMILIES
+        }
+
+    def observe(self, family: Family, labels: Tuple[str, ...], value: float):
+        """Record `value` into the histogram of `labels`"""
+        series = self.series[family.name].get(labels)
+        if series is None:
+            # One bucket per bound, one for +Inf and the sum
+            series = [0] * (len(family.buckets) + 2)
+            self.series[family.name][labels] = series
+        series[bisect_left(family.buckets, value)] += 1
+        series[-1] += value
+
+    def merge(self, other: "Registry"):
+        """Add the histograms of `other` to this registry"""
+        for name, histograms in other.series.items():
+            for labels, series in histograms.items():
+                mine = self.series[name].setdefault(labels, [0] * len(series))
+                for i, value in enumerate(series):
+                    mine[i] += value
+
+    def dumps(self) -> str:
+        """The histograms as JSON"""
+        return json.dumps(
+            {
+                name: [[*labels, series] for labels, series in items.items()]
+                for name, items in self.series.items()
+            }
+        )
+
+    @classmethod
+    def loads(cls, content: str) -> "Registry":
+        """Histograms from the JSON produced by `dumps`"""
+        registry = cls()
+        for name, items in json.loads(content).items():
+            if name in registry.series:
+                for *labels, series in items:
+                    registry.series[name][tuple(labels)] = series
+        return registry
+
+    def render(self) -> str:
+        """The histograms in the Prometheus text exposition format"""
+        lines = []
+        for family in FAMILIES:
+            lines.append(f"# HELP {family.name} {family.help}")
+            lines.append(f"# TYPE {family.name} histogram")
+            for labels, series in sorted(self.series[family.name].items()):
+                pairs = [
+                    f'{key}="{_escape(value)}"'
+                    for key, value in zip(family.labels, labels)
+                ]
+                count = 0
+                for bound, observed in zip(
+                    (*family.buckets, "+Inf"), series[:-1]
+                ):
+                    count += observed
+                    le = ",".join([*pairs, f'le="{bound}"'])
+                    lines.append(f"{family.name}_bucket{{{le}}} {count}")
+                tags = ",".join(pairs)
+                lines.append(f"{family.name}_sum{{{tags}}} {series[-1]}")
+                lines.append(f"{family.name}_count{{{tags}}} {count}")
+        return "\n".join(lines) + "\n"
+
+
+def _escape(value: str) -> str:
+    return value.replace("\\", r"\\").replace('"', r"\"").replace("\n", r"\n")
+
+
+# Process wide registry
+registry = Registry()
+
+
+class RequestMetrics:  # pylint: disable=too-few-public-methods
+    """Figures of the request in flight"""
+
+    __slots__ = (
+        "queries",
+        "query_seconds",
+        "rows",
+        "pool_wait_seconds",
+        "serialize_seconds",
+    )
+
+    def __init__(self) -> None:
+        self.queries = 0
+        self.query_seconds = 0.0
+        self.rows = 0
+        self.pool_wait_seconds = 0.0
+        self.serialize_seconds = 0.0
+
+
+_current: ContextVar[RequestMetrics | None] = ContextVar(
+    "request_metrics", default=None
+)
+
+
+def current() -> RequestMetrics | None:
+    """Figures of the request in flight, if any"""
+    return _current.get()
+
+
+def observe_pool_wait(seconds: float):
+    """Record time spent waiting for a pooled connection"""
+    metrics = _current.get()
+    if metrics is not None:
+        metrics.pool_wait_seconds += seconds
+
+
+def observe_rows(count: int):
+    """Record rows fetched from the database"""
+    metrics = _current.get()
+    if metrics is not None:
+        metrics.rows += count
+
+
+def serialization(encode: Callable) -> Callable:
+    """Decorate an encoder to record its time as serialization time"""
+
+    @functools.wraps(encode)
+    def wrapper(*args, **kwargs):
+        metrics = _current.get()
+        if metrics is None:
+            return encode(*args, **kwargs)
+        started = time.perf_counter()
+        try:
+            return encode(*args, **kwargs)
+        finally:
+            metrics.serialize_seconds += time.perf_counter() - started
+
+    return wrapper
+
+
+def _before_cursor_execute(conn, *_):
+    if _current.get() is not None:
+        conn.info["query_started"] = time.perf_counter()
+
+
+def _after_cursor_execute(conn, *_):
+    metrics = _current.get()
+    started = conn.info.pop("query_started", None)
+    if metrics is None or started is None:
+        return
+    metrics.queries += 1
+    metrics.query_seconds += time.perf_counter() - started
+
+
+def _count_rows(state: ORMExecuteState):
+    options = state.execution_options
+    if (
+        _current.get() is None
+        or not state.is_select
+        # Streamed results are counted by their consumers
+        or "yield_per" in options
+        or options.get("stream_results")
+    ):
+        return None
+    frozen = state.invoke_statement().freeze()
+    observe_rows(len(frozen.data))
+    return frozen()
+
+
+def instrument_engine(engine: Engine):
+    """Record the queries of `engine` into the request in flight"""
+    event.listen(engine, "before_cursor_execute", _before_cursor_execute)
+    event.listen(engine, "after_cursor_execute", _after_cursor_execute)
+
+
+def instrument_sessions(session_class: Type[Session] = Session):
+    """Record the rows fetched by the sessions into the request in flight"""
+    if not event.contains(session_class, "do_orm_execute", _count_rows):
+        event.listen(session_class, "do_orm_execute", _count_rows)
+
+
+class MetricsMiddleware:  # pylint: disable=too-few-public-methods
+    """ASGI middleware measuring the requests into the `registry`"""
+
+    def __init__(self, app, registry: Registry = registry) -> None:
+        self.app = app
+        self.registry = registry
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        status = 500
+
+        async def send_with_status(message):
+            nonlocal status
+            if message["type"] == "http.response.start":
+                status = message["status"]
+            await send(message)
+
+        metrics = RequestMetrics()
+        token = _current.set(metrics)
+        started = time.perf_counter()
+        try:
+            await self.app(scope, receive, send_with_status)
+        finally:
+            elapsed = time.perf_counter() - started
+            _current.reset(token)
+            # The route template keeps the number of series bounded
+            route = getattr(scope.get("route"), "path", "unmatched")
+            observe = self.registry.observe
+            observe(
+                REQUEST_SECONDS, (scope["method"], route, str(status)), elapsed
+            )
+            observe(REQUEST_QUERIES, (route,), metrics.queries)
+            observe(REQUEST_QUERY_SECONDS, (route,), metrics.query_seconds)
+            observe(REQUEST_ROWS, (route,), metrics.rows)
+            observe(
+                REQUEST_POOL_WAIT_SECONDS, (route,), metrics.pool_wait_seconds
+            )
+            observe(
+                REQUEST_SERIALIZE_SECONDS, (route,), metrics.serialize_seconds
+            )
+
+
+def _own_file(directory: str) -> str:
+    return os.path.join(directory, f"{os.getpid()}.json")
+
+
+def publish(directory: str, own: Registry = registry):
+    """Atomically replace the published metrics of this process"""
+    with tempfile.NamedTemporaryFile(
+        "w", encoding="utf8", dir=directory, suffix=".tmp", delete=False
+    ) as file:
+        file.write(own.dumps())
+    os.replace(file.name, _own_file(directory))
+
+
+def _remove(path: str):
+    try:
+        os.unlink(path)
+    except FileNotFoundError:
+        pass
+
+
+def unpublish(directory: str):
+    """Remove the published metrics of this process"""
+    _remove(_own_file(directory))
+
+
+def _alive(pid: int) -> bool:
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        pass
+    return True
+
+
+def collect(directory: str | None = METRICS_DIR, own: Registry = registry):
+    """
+    The metrics of this process summed with the metrics published by the
+    other processes in `directory`, if any. The metrics of the processes
+    which are gone are removed.
+    """
+    if directory is None:
+        return own
+    total = Registry()
+    total.merge(own)
+    for path in _published(directory):
+        if path == _own_file(directory):
+            continue
+        pid = os.path.basename(path).removesuffix(".json")
+        if pid.isdigit() and not _alive(int(pid)):
+            logger.info("Removing the metrics of the exited process %s", pid)
+            _remove(path)
+            continue
+        try:
+            with open(path, "r", encoding="utf8") as file:
+                total.merge(Registry.loads(file.read()))
+        except (OSError, ValueError) as error:
+            logger.warning("Failed to read the metrics of %s: %s", path, error)
+    return total
+
+
+def _published(directory: str) -> Iterable[str]:
+    with os.scandir(directory) as entries:
+        return [
+            entry.path for entry in entries if entry.name.endswith(".json")
+        ]
+
+
+async def publish_periodically(
+    directory: str, interval: float = METRICS_FLUSH_INTERVAL
+):
+    """Publish the metrics of this process every `interval` seconds"""
+    while True:
+        await asyncio.sleep(interval)
+        try:
+            publish(directory)
+        except OSError as error:
+            logger.warning("Failed to publish the metrics: %s", error)
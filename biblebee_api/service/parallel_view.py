@@ -0,0 +1,46 @@
+"""Side by side view of the verses of several revisions.
+
+description:
+-----------
+Verses fetched in one pass come in one run per revision, each sorted by
+(chapter, verse). The runs are merged in a single linear pass into rows
+holding the text of every revision for the same (chapter, verse).
+"""
+
+import heapq
+from itertools import groupby
+from operator import attrgetter
+from typing import Iterable, Iterator, List, NamedTuple, Sequence
+
+from biblebee_api.schema.encoders import VerseLike
+
+_REVISION = attrgetter("book_version_code")
+_POSITION = attrgetter("chapter", "verse")
+
+
+class ParallelVerse(NamedTuple):
+    """Texts of a verse in each revision, `None` where it is missing"""
+
+    chapter: int
+    verse: int
+    texts: List[str | None]
+
+
+def align_revisions(
+    rows: Iterable[VerseLike], revisions: Sequence[str]
+) -> Iterator[ParallelVerse]:
+    """
+    Align the `rows` of the `revisions` by (chapter, verse).
+
+    The rows must be grouped by revision and sorted by (chapter, verse)
+    within each revision, as the skim queries return them.
+    """
+    columns = {revision: i for i, revision in enumerate(revisions)}
+    runs = [list(run) for _, run in groupby(rows, key=_REVISION)]
+    merged = heapq.merge(*runs, key=_POSITION)
+
+    for (chapter, verse), group in groupby(merged, key=_POSITION):
+        texts: List[str | None] = [None] * len(columns)
+        for row in group:
+            texts[columns[row.book_version_code]] = row.text
+        yield ParallelVerse(chapter, verse, texts)
@@ -0,0 +1,231 @@
+"""Sampling profiler of live requests.
+
+description:
+-----------
+A profiled request is sampled by a background thread which snapshots the
+stacks of all the threads every `PROFILER_INTERVAL_MS` milliseconds, so
+that the time spent in the event loop, in the aiosqlite thread and in the
+threadpool shows up side by side. Stacks are written in the collapsed
+format of `flamegraph.pl` and speedscope, prefixed by the thread name.
+
+Administrators profile a request on demand by sending the
+`X-Profile-Token` header matching `PROFILER_TOKEN` together with the
+`X-Profile` header or the `profile` query flag. One in every
+`PROFILER_SAMPLE_EVERY` requests is profiled as well. Profiles are kept in
+`PROFILES_DIR`, the oldest beyond `PROFILES_KEEP` being removed, and the
+name of the profile of a request is returned in its `X-Profile` header.
+
+The middleware is only installed when profiling is configured, hence it
+costs nothing otherwise. Stacks of concurrent requests are sampled too,
+and a single request is profiled at a time.
+"""
+
+import asyncio
+import hmac
+import itertools
+import logging
+import os
+import re
+import sys
+import tempfile
+import threading
+import time
+from collections import Counter
+from types import FrameType
+from typing import List
+from urllib.parse import parse_qs
+
+logger = logging.getLogger(__name__)
+
+# Secret enabling the profiling of a request on demand
+PROFILER_TOKEN = os.environ.get("PROFILER_TOKEN", "")
+
+# Profile one in every N requests, 0 disables the sampling
+PROFILER_SAMPLE_EVERY = int(os.environ.get("PROFILER_SAMPLE_EVERY", "0"))
+
+# Milliseconds between the snapshots of the stacks
+PROFILER_INTERVAL_MS = float(os.environ.get("PROFILER_INTERVAL_MS", "1"))
+
+# Directory of the profiles
+PROFILES_DIR = os.environ.get(
+    "PROFILES_DIR", os.path.join(tempfile.gettempdir(), "biblebee-profiles")
+)
+
+# Number of profiles kept in the directory
+PROFILES_KEEP = int(os.environ.get("PROFILES_KEEP", "100"))
+
+# Names of the profiles
+PROFILE_NAME = re.compile(r"\d+-\d+\.collapsed")
+
+
+def enabled() -> bool:
+    """Whether profiling is configured"""
+    return bool(PROFILER_TOKEN) or PROFILER_SAMPLE_EVERY > 0
+
+
+def authorized(given: str) -> bool:
+    """Whether `given` is the profiler token, never so without a token"""
+    return bool(PROFILER_TOKEN) and hmac.compare_digest(
+        given.encode(), PROFILER_TOKEN.encode()
+    )
+
+
+def _frame_name(frame: FrameType) -> str:
+    code = frame.f_code
+    filename = os.path.basename(code.co_filename)
+    return f"{code.co_name} ({filename}:{code.co_firstlineno})"
+
+
+def collapse(frame: FrameType | None) -> List[str]:
+    """Frames of a stack, outermost first"""
+    names = []
+    while frame is not None:
+        names.append(_frame_name(frame))
+        frame = frame.f_back
+    names.reverse()
+    return names
+
+
+class StackSampler:
+    """Snapshots the stacks of all the threads until it is stopped"""
+
+    def __init__(self, interval: float = PROFILER_INTERVAL_MS / 1000) -> None:
+        self.interval = interval
+        self.stacks: Counter = Counter()
+        self._stopped = threading.Event()
+        self._thread = threading.Thread(
+            target=self._run, name="profiler", daemon=True
+        )
+
+    def start(self):
+        """Start sampling"""
+        self._thread.start()
+
+    def stop(self):
+        """Stop sampling"""
+        self._stopped.set()
+        self._thread.join()
+
+    def _run(self):
+        own = threading.get_ident()
+        while not self._stopped.wait(self.interval):
+            names = {t.ident: t.name for t in threading.enumerate()}
+            # pylint: disable-next=protected-access
+            for ident, frame in sys._current_frames().items():
+                if ident != own:
+                    stack = [names.get(ident, str(ident)), *collapse(frame)]
+                    self.stacks[";".join(stack)] += 1
+
+    def collapsed(self) -> str:
+        """Samples in the collapsed stack format"""
+        return "".join(
+            f"{stack} {count}\n" for stack, count in self.stacks.items()
+        )
+
+
+def _save(name: str, content: str, directory: str, keep: int):
+    """Write a profile and remove the oldest beyond `keep`"""
+    os.makedirs(directory, exist_ok=True)
+    with open(os.path.join(directory, name), "w", encoding="utf8") as file:
+        file.write(content)
+    for old in list_profiles(directory)[keep:]:
+        try:
+            os.unlink(os.path.join(directory, old))
+        except FileNotFoundError:
+            pass
+
+
+def list_profiles(directory: str = PROFILES_DIR) -> List[str]:
+    """Names of the kept profiles, newest first"""
+    try:
+        names = [n for n in os.listdir(directory) if PROFILE_NAME.fullmatch(n)]
+    except FileNotFoundError:
+        return []
+    return sorted(names, reverse=True)
+
+
+def read_profile(name: str, directory: str = PROFILES_DIR) -> str:
+    """Content of the profile `name`. Raises `LookupError` if unknown"""
+    if not PROFILE_NAME.fullmatch(name):
+        raise LookupError(f"There is no profile {name}")
+    try:
+        with open(os.path.join(directory, name), "r", encoding="utf8") as file:
+            return file.read()
+    except FileNotFoundError as error:
+        raise LookupError(f"There is no profile {name}") from error
+
+
+class ProfilerMiddleware:  # pylint: disable=too-few-public-methods
+    """ASGI middleware profiling the requests asked for and the sampled"""
+
+    def __init__(
+        self,
+        app,
+        token: str = PROFILER_TOKEN,
+        sample_every: int = PROFILER_SAMPLE_EVERY,
+        directory: str = PROFILES_DIR,
+        keep: int = PROFILES_KEEP,
+    ) -> None:
+        self.app = app
+        self.token = token.encode()
+        self.sample_every = sample_every
+        self.directory = directory
+        self.keep = keep
+        self._requests = itertools.count(1)
+        self._busy = False
+
+    def _asked_for(self, scope) -> bool:
+        if not self.token:
+            return False
+        headers = dict(scope["headers"])
+        # The query flag is bare, as in `?profile`, or has any value
+        if b"x-profile" not in headers and "profile" not in parse_qs(
+            scope["query_string"].decode("latin-1"), keep_blank_values=True
+        ):
+            return False
+        given = headers.get(b"x-profile-token", b"")
+        return hmac.compare_digest(given, self.token)
+
+    def _sampled(self) -> bool:
+        return (
+            self.sample_every > 0
+            and next(self._requests) % self.sample_every == 0
+        )
+
+    async def __call__(self, scope, receive, send):
+        if (
+            scope["type"] != "http"
+            or self._busy
+            or not (self._asked_for(scope) or self._sampled())
+        ):
+            await self.app(scope, receive, send)
+            return
+
+        name = f"{time.time_ns()}-{os.getpid()}.collapsed"
+
+        async def send_with_name(message):
+            if message["type"] == "http.response.start":
+                message["headers"] = [
+                    *message.get("headers", ()),
+                    (b"x-profile", name.encode()),
+                ]
+            await send(message)
+
+        self._busy = True
+        sampler = StackSampler()
+        sampler.start()
+        try:
+            await self.app(scope, receive, send_with_name)
+        finally:
+            sampler.stop()
+            self._busy = False
+            try:
+                await asyncio.to_thread(
+                    _save,
+                    name,
+                    sampler.collapsed(),
+                    self.directory,
+                    self.keep,
+                )
+            except OSError as error:
+                logger.warning("Failed to save the profile: %s", error)
@@ -0,0 +1,192 @@
+"""Cache of pre-serialized responses for the rarely changing resources.
+
+description:
+-----------
+Listings and statistics of the bibles only change when a revision is
+imported. Their responses are serialized and compressed once, tagged
+with a strong ETag and served from memory until the corpus version stamp
+changes.
+"""
+
+import gzip
+import hashlib
+import json
+import logging
+import os
+import time
+from collections import OrderedDict
+from dataclasses import dataclass, field
+from typing import Any, Awaitable, Callable, Dict, Hashable, Tuple
+
+from fastapi import Request, Response
+from fastapi.encoders import jsonable_encoder
+from sqlalchemy import text
+from sqlalchemy.ext.asyncio import async_sessionmaker, AsyncSession
+
+try:
+    import brotli
+except ImportError:  # pragma: no cover
+    brotli = None
+
+logger = logging.getLogger(__name__)
+
+# Seconds between the checks of the corpus version stamp
+CORPUS_STAMP_TTL = float(os.environ.get("CORPUS_STAMP_TTL", "60"))
+
+# Number of cached chapters
+CHAPTER_CACHE_SIZE = int(os.environ.get("CHAPTER_CACHE_SIZE", "2048"))
+
+# Bodies smaller than this are not worth compressing
+MIN_COMPRESS_SIZE = 512
+
+_STAMP_QUERY = text("SELECT version FROM corpus_version WHERE id = 1")
+
+
+@dataclass(frozen=True, slots=True)
+class CachedResponse:
+    """Serialized response body, its compressed encodings and its ETag"""
+
+    stamp: int
+    body: bytes
+    etag: str
+    encodings: Dict[str, bytes] = field(default_factory=dict)
+
+    def negotiate(self, accept_encoding: str) -> Tuple[str | None, bytes]:
+        """The encoding and the body to serve for `Accept-Encoding`"""
+        accepted = set()
+        for part in accept_encoding.split(","):
+            coding, *params = part.split(";")
+            if _quality(params) > 0:
+                accepted.add(coding.strip().lower())
+        for encoding, body in self.encodings.items():
+            if encoding in accepted:
+                return encoding, body
+        return None, self.body
+
+
+def _quality(params) -> float:
+    """The `q` value of the parameters of a coding, 0 if invalid"""
+    for param in params:
+        name, _, value = param.partition("=")
+        if name.strip().lower() == "q":
+            try:
+                return float(value)
+            except ValueError:
+                return 0.0
+    return 1.0
+
+
+def _compress(body: bytes) -> Dict[str, bytes]:
+    """Precompressed encodings of `body`, the preferred first"""
+    if len(body) < MIN_COMPRESS_SIZE:
+        return {}
+    encodings = {}
+    if brotli is not None:
+        encodings["br"] = brotli.compress(body, quality=11)
+    encodings["gzip"] = gzip.compress(body, compresslevel=9, mtime=0)
+    return encodings
+
+
+def _etag_matches(if_none_match: str | None, etag: str) -> bool:
+    """Whether the `If-None-Match` header value matches the `etag`"""
+    if not if_none_match:
+        return False
+    if if_none_match.strip() == "*":
+        return True
+    etag = etag.strip('"')
+    return any(
+        # Encoded variants carry the ETag with an encoding suffix
+        tag.strip().removeprefix("W/").strip('"').split("-")[0] == etag
+        for tag in if_none_match.split(",")
+    )
+
+
+class ResponseCache:
+    """Bounded LRU cache of serialized responses"""
+
+    def __init__(
+        self, maxsize: int = 256, stamp_ttl: float = CORPUS_STAMP_TTL
+    ) -> None:
+        self.maxsize = maxsize
+        self.stamp_ttl = stamp_ttl
+        self._entries: OrderedDict[Hashable, CachedResponse] = OrderedDict()
+        self._stamp = 0
+        self._stamp_checked_at = float("-inf")
+
+    def clear(self):
+        """Drop all the cached responses"""
+        self._entries.clear()
+        self._stamp_checked_at = float("-inf")
+
+    async def stamp(self, async_session: async_sessionmaker[AsyncSession]):
+        """The corpus version stamp, re-read at most every `stamp_ttl`"""
+        now = time.monotonic()
+        if now - self._stamp_checked_at >= self.stamp_ttl:
+            async with async_session() as session:
+                stamp = (await session.execute(_STAMP_QUERY)).scalar()
+            self._stamp_checked_at = now
+            if stamp != self._stamp:
+                logger.debug("Corpus version changed to %s", stamp)
+                self._stamp = stamp
+                self._entries.clear()
+        return self._stamp
+
+    async def respond(
+        self,
+        request: Request,
+        key: Hashable,
+        build: Callable[[], Awaitable[Any]],
+        async_session: async_sessionmaker[AsyncSession],
+        cache_control: str = "no-cache",
+    ) -> Response:
+        """
+        Respond with the cached body of `key`, building it with `build`
+        on a miss. `build` returns either the encoded JSON body or data to
+        encode. Requests with a matching `If-None-Match` get a 304.
+        """
+        stamp = await self.stamp(async_session)
+        entry = self._entries.get(key)
+
+        if entry is None or entry.stamp != stamp:
+            body = await build()
+            if not isinstance(body, bytes):
+                body = json.dumps(
+                    jsonable_encoder(body),
+                    ensure_ascii=False,
+                    separators=(",", ":"),
+                ).encode("utf-8")
+            etag = f'"{hashlib.sha256(body).hexdigest()[:32]}"'
+            entry = CachedResponse(
+                stamp=stamp, body=body, etag=etag, encodings=_compress(body)
+            )
+            self._entries[key] = entry
+            if len(self._entries) > self.maxsize:
+                self._entries.popitem(last=False)
+        else:
+            self._entries.move_to_end(key)
+
+        encoding, body = entry.negotiate(
+            request.headers.get("accept-encoding", "")
+        )
+        headers = {"ETag": entry.etag, "Cache-Control": cache_control}
+        if entry.encodings:
+            headers["Vary"] = "Accept-Encoding"
+        if encoding is not None:
+            headers["Content-Encoding"] = encoding
+            headers["ETag"] = f'{entry.etag[:-1]}-{encoding}"'
+
+        if _etag_matches(request.headers.get("if-none-match"), entry.etag):
+            return Response(status_code=304, headers=headers)
+        return Response(body, media_type="application/json", headers=headers)
+
+
+def revisions_key(revisions) -> tuple:
+    """Normalize a list of revisions into a cache key"""
+    return tuple(sorted(set(revisions)))
+
+
+# Process wide cache of responses
+cache = ResponseCache()
+
+# Process wide cache of the chapter responses
+chapter_cache = ResponseCache(maxsize=CHAPTER_CACHE_SIZE)
@@ -2,9 +2,10 @@
 
 import logging
 import re
-from typing import Dict, List
+from functools import lru_cache
+from types import MappingProxyType
+from typing import Dict, List, Mapping, Tuple
 
-logging.basicConfig(level=logging.DEBUG)
 logger = logging.getLogger(__name__)
 
 
@@ -33,72 +34,82 @@ def parse_bible_verse(verse_str: str) -> List[int]:
 
 # 150:10-12,14-16,18,20,2:10-12,13-14,3:15
 
+# Inclusive (start, end) verse intervals of every chapter in a query.
+# A chapter without intervals selects the entire chapter.
+VerseRanges = Mapping[int, Tuple[Tuple[int, int], ...]]
+
+_SIMPLE_PATTERN = re.compile(r"(\d+):(\d+)(?:-(\d+))?")
+_CHAPTER_PATTERN = re.compile(r"(\d+)(?::([\d,\-]*))?")
+_RANGE_PATTERN = re.compile(r"(\d+)(?:-(\d+))?")
+
+
+def _merge(ranges: List[Tuple[int, int]]) -> Tuple[Tuple[int, int], ...]:
+    """Sort and coalesce overlapping or adjacent intervals"""
+    merged: List[Tuple[int, int]] = []
+    for start, end in sorted(ranges):
+        if merged and start <= merged[-1][1] + 1:
+            if end > merged[-1][1]:
+                merged[-1] = (merged[-1][0], end)
+        else:
+            merged.append((start, end))
+    return tuple(merged)
+
+
+@lru_cache(maxsize=1024)
+def parse_verse_ranges(query: str) -> VerseRanges:
+    """
+    Parse the skim query grammar into verse intervals per chapter.
+    ```python
+    ranges = parse_verse_ranges("150:10-12,14 2:10")
+    #> {150: ((10, 12), (14, 14)), 2: ((10, 10),)}
+    ```
+    Results are cached and shared, hence read-only.
+    """
+    # Fast path for the popular single chapter notations e.g., "3:16"
+    match = _SIMPLE_PATTERN.fullmatch(query)
+    if match is not None:
+        chapter, start, end = match.groups()
+        start = int(start)
+        end = start if end is None else max(start, int(end))
+        return MappingProxyType({int(chapter): ((start, end),)})
+
+    chapters: Dict[int, List[Tuple[int, int]]] = {}
+    for match in _CHAPTER_PATTERN.finditer(query):
+        chapter, verses = match.groups()
+        ranges = chapters.setdefault(int(chapter), [])
+        for verse in _RANGE_PATTERN.finditer(verses or ""):
+            start, end = verse.groups()
+            start = int(start)
+            end = start if end is None else max(start, int(end))
+            ranges.append((start, end))
+
+    return MappingProxyType(
+        {chapter: _merge(ranges) for chapter, ranges in chapters.items()}
+    )
+
+
+def expand_verse_ranges(ranges: Tuple[Tuple[int, int], ...]) -> List[int]:
+    """Expand verse intervals into the verse numbers"""
+    return [verse for start, end in ranges for verse in range(start, end + 1)]
+
 
 class GrammaticLexicalParser:
     """Lexical parser for the bible verse querying grammar"""
 
     def __init__(self):
-        self.input_str = ""
-        self.position = 0
-        self.cursor = 0
-        self.result = {}
+        self.ranges: VerseRanges = MappingProxyType({})
 
     def parse(self, input_str: str):
         """Parse input str"""
-        result = {}
-        current_key = None
-        current_values = []
-        cursor = 0
-
-        while cursor < len(input_str):
-            char = input_str[cursor]
-
-            if char.isdigit():
-                num = ""
-                while cursor < len(input_str) and input_str[cursor].isdigit():
-                    num += input_str[cursor]
-                    cursor += 1
-
-                num = int(num)
-
-                if current_key is not None:
-                    current_values.append(num)
-                else:
-                    current_key = num
-
-            elif char == ":":
-                cursor += 1
-                current_values = []
-                result[current_key] = current_values
-
-            elif char == " ":
-                cursor += 1
-                num = ""
-                while cursor < len(input_str) and input_str[cursor].isdigit():
-                    num += input_str[cursor]
-                    cursor += 1
-
-                num = int(num)
-
-                current_key = num
-                current_values = []
-
-            elif char == "-":
-                cursor += 1
-                range_end = ""
-                while cursor < len(input_str) and input_str[cursor].isdigit():
-                    range_end += input_str[cursor]
-                    cursor += 1
-
-                range_end = int(range_end)
-                current_values.extend(
-                    range(current_values[-1] + 1, range_end + 1)
-                )
-
-            elif char == ",":
-                cursor += 1
-        self.result = result
+        self.ranges = parse_verse_ranges(input_str or "")
+
+    def get_ranges(self) -> VerseRanges:
+        """Get parser results as verse intervals per chapter"""
+        return self.ranges
 
     def get_result(self) -> Dict[int, List[int]]:
         """Get parser results"""
-        return self.result
+        return {
+            chapter: expand_verse_ranges(ranges)
+            for chapter, ranges in self.ranges.items()
+        }
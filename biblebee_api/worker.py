@@ -4,21 +4,35 @@ import asyncio
 import logging
 import os
 import json
-from random import choice
+import shutil
+import tempfile
+import time
+from collections import defaultdict
+from typing import Dict
 
-from sqlalchemy import select
+from sqlalchemy import and_, select
 from sqlalchemy.sql import func
 
-from celery import Celery
-from biblebee_api.database import async_session_manager
+from celery import Celery, signals
+from celery.worker.control import inspect_command
+from biblebee_api.database import (
+    async_session,
+    async_session_manager,
+    engine,
+    read_engine,
+    read_session,
+)
 from biblebee_api.model.bible_model import DailyVerse, Verse
 from biblebee_api.repo.devices_repo import DevicesRepo
 from biblebee_api.schema.bible_schema import DailyVerseOut
-from biblebee_api.service import cloud_messaging
+from biblebee_api.service import (
+    cloud_messaging,
+    daily_verse_index,
+    daily_verse_store,
+    fanout,
+)
 
 
-# Configure logging
-logging.basicConfig(level=logging.DEBUG)
 logger = logging.getLogger(__name__)
 
 celery = Celery(__name__)
@@ -29,98 +43,265 @@ celery.conf.result_backend = os.environ.get(
     "CELERY_RESULT_BACKEND", "redis://localhost:6379/0"
 )
 
+# Revision of the texts of the daily verses
+DAILY_VERSE_REVISION = os.environ.get("DAILY_VERSE_REVISION", "SUV")
 
-async def generate_daily_verse_async(tag: str | None) -> str:
-    """Generate daily random verse."""
 
-    # Get a random tag if tag is None
-    if tag is None:
-        tag = await get_random_tag()
+class TaskStats:  # pylint: disable=too-few-public-methods
+    """Latency statistics of a task"""
 
-    # Get a random daily verse matching the tag
-    daily_verse = await get_random_daily_verse(tag)
+    def __init__(self) -> None:
+        self.count = 0
+        self.failures = 0
+        self.total_seconds = 0.0
+        self.max_seconds = 0.0
+        self.last_seconds = 0.0
+        self.last_finished = 0.0
 
-    # Get and save the verse content
-    verse_content = await get_verse_content(daily_verse)
+    def record(self, seconds: float, failed: bool = False):
+        """Record a run of the task"""
+        self.count += 1
+        self.failures += failed
+        self.total_seconds += seconds
+        self.last_seconds = seconds
+        self.last_finished = time.time()
+        self.max_seconds = max(self.max_seconds, seconds)
 
-    logger.debug(repr(daily_verse))
+    def merge(self, other: "TaskStats"):
+        """Add the runs recorded by `other`"""
+        self.count += other.count
+        self.failures += other.failures
+        self.total_seconds += other.total_seconds
+        self.max_seconds = max(self.max_seconds, other.max_seconds)
+        if other.last_finished > self.last_finished:
+            self.last_seconds = other.last_seconds
+            self.last_finished = other.last_finished
 
-    daily_verse_out = DailyVerseOut.model_validate(daily_verse.__dict__)
-    result = json.dumps(
-        {"verse_content": verse_content, "ptr": daily_verse_out.model_dump()}
-    )
-    save_verse_to_file(result)
-    return json.dumps(result)
+    def as_dict(self) -> dict:
+        """Statistics as a dictionary"""
+        return {
+            "count": self.count,
+            "failures": self.failures,
+            "mean_seconds": self.total_seconds / max(self.count, 1),
+            "max_seconds": self.max_seconds,
+            "last_seconds": self.last_seconds,
+        }
 
 
-async def send_daily_verse_async(daily_verse: str):
-    """Send daily bible verse to the registered devices."""
-    async with async_session_manager() as manager:
-        # Get devices repository
-        devices_repo = DevicesRepo(async_session=manager)
-        # Get tokens
-        tokens = await devices_repo.all_tokens()
-        data = json.loads(daily_verse)
-        cloud_messaging.send(
-            data["verse_content"],
-            title="Daily bible message",
-            body="",
-            tokens=tokens,
-        )
+# Latency of the tasks run by this worker process
+task_stats: Dict[str, TaskStats] = defaultdict(TaskStats)
+_task_started: Dict[str, float] = {}
 
+# Directory where the pool processes of a worker publish the latency of
+# their tasks. Under the prefork pool tasks run in child processes while
+# the control commands run in the main process, which merges the files.
+_stats_dir: str | None = None
 
-@celery.task(name="send_clound_message")
-def send_daily_verse(daily_verse: str):
-    """Send daily bible verse to the registered devices"""
-    return asyncio.run(send_daily_verse_async(daily_verse))
 
-
-@celery.task(name="daily_verse")
-def generate_daily_verse(tag: str | None = None):
-    """Generate daily bible verse"""
-    return asyncio.run(generate_daily_verse_async(tag))
+def _stats_file(directory: str, pid: int) -> str:
+    return os.path.join(directory, f"{pid}.json")
 
 
-async def get_random_tag() -> str:
-    """Get a randomly selected tag"""
-    async with async_session_manager() as manager:
-        async with manager() as session:
-            tags_query = select(DailyVerse.tags.distinct())
-            tags = (await session.execute(tags_query)).scalars().all()
-            return choice(tags)
+def publish_task_stats(directory: str):
+    """Atomically replace the published task latency of this process"""
+    with tempfile.NamedTemporaryFile(
+        "w", encoding="utf8", dir=directory, suffix=".tmp", delete=False
+    ) as file:
+        json.dump({name: vars(s) for name, s in task_stats.items()}, file)
+    os.replace(file.name, _stats_file(directory, os.getpid()))
 
 
-async def get_random_daily_verse(tag: str) -> DailyVerse:
-    """Get a randomly tagged bible verse"""
-    async with async_session_manager() as manager:
-        async with manager() as session:
-            query = (
-                select(DailyVerse)
-                .filter(DailyVerse.tags.like(f"%{tag}%"))
-                .order_by(func.random())  # pylint: disable=not-callable
-                .limit(1)
+def collect_task_stats(directory: str | None) -> Dict[str, TaskStats]:
+    """
+    The task latency of this process merged with the latency published by
+    the other processes in `directory`, if any.
+    """
+    total: Dict[str, TaskStats] = defaultdict(TaskStats)
+    for name, stats in task_stats.items():
+        total[name].merge(stats)
+    if directory is None:
+        return total
+    with os.scandir(directory) as entries:
+        paths = [e.path for e in entries if e.name.endswith(".json")]
+    for path in paths:
+        if path == _stats_file(directory, os.getpid()):
+            continue
+        try:
+            with open(path, "r", encoding="utf8") as file:
+                published = json.load(file)
+        except (OSError, ValueError) as error:
+            logger.warning(
+                "Failed to read the task latency %s: %s", path, error
             )
-            result = await session.execute(query)
-            daily_verse = result.scalars().one()
-            return daily_verse
+            continue
+        for name, fields in published.items():
+            stats = TaskStats()
+            vars(stats).update(fields)
+            total[name].merge(stats)
+    return total
 
 
-async def get_verse_content(daily_verse: DailyVerse) -> str:
-    """Get content of the verse pointed by the `DailyVerse`"""
-    async with async_session_manager() as manager:
-        async with manager() as session:
-            verse_query = select(Verse.text).filter(
-                Verse.book_number == daily_verse.book_number,
-                Verse.chapter == daily_verse.chapter,
+@signals.worker_init.connect
+def _on_worker_init(**_):
+    # Runs in the main process before the pool processes are forked
+    global _stats_dir  # pylint: disable=global-statement
+    _stats_dir = tempfile.mkdtemp(prefix="biblebee-tasks.")
+
+
+@signals.worker_shutdown.connect
+def _on_worker_shutdown(**_):
+    global _stats_dir  # pylint: disable=global-statement
+    if _stats_dir is not None:
+        shutil.rmtree(_stats_dir, ignore_errors=True)
+        _stats_dir = None
+
+
+@signals.task_prerun.connect
+def _on_task_prerun(task_id: str, **_):
+    _task_started[task_id] = time.perf_counter()
+
+
+@signals.task_postrun.connect
+def _on_task_postrun(task_id: str, task, state: str | None = None, **_):
+    started = _task_started.pop(task_id, None)
+    if started is None:
+        return
+    elapsed = time.perf_counter() - started
+    task_stats[task.name].record(elapsed, failed=state != "SUCCESS")
+    logger.info("Task %s finished in %.3fs (%s)", task.name, elapsed, state)
+    if _stats_dir is not None:
+        try:
+            publish_task_stats(_stats_dir)
+        except OSError as error:
+            logger.warning("Failed to publish the task latency: %s", error)
+
+
+@inspect_command()
+def task_latency(_state) -> dict:
+    """
+    Latency statistics of the tasks of a worker, run by any of its pool
+    processes.
+
+    `celery -A biblebee_api.worker.celery inspect task_latency`
+    """
+    return {
+        name: stats.as_dict()
+        for name, stats in collect_task_stats(_stats_dir).items()
+    }
+
+
+# Persistent event loop of the worker process. Tasks run on the same loop
+# so the pooled database connections are reused across tasks.
+_loop: asyncio.AbstractEventLoop | None = None
+
+
+def run(coroutine):
+    """Run `coroutine` to completion on the worker event loop"""
+    global _loop  # pylint: disable=global-statement
+    if _loop is None or _loop.is_closed():
+        _loop = asyncio.new_event_loop()
+        asyncio.set_event_loop(_loop)
+    return _loop.run_until_complete(coroutine)
+
+
+@signals.worker_process_shutdown.connect
+def _on_worker_process_shutdown(**_):
+    if _loop is not None and not _loop.is_closed():
+        # Both pools hold connections opened by the tasks of this process
+        _loop.run_until_complete(engine.dispose())
+        _loop.run_until_complete(read_engine.dispose())
+        _loop.close()
+
+
+def _daily_verse_query(daily_verse_id: int, revision: str):
+    """Daily verse with the text of the verses it points to in `revision`"""
+    # The texts are concatenated in the order of the verses
+    verses = (
+        select(Verse.text)
+        .join(
+            DailyVerse,
+            and_(
+                Verse.book_number == DailyVerse.book_number,
+                Verse.chapter == DailyVerse.chapter,
                 Verse.verse.between(
-                    daily_verse.verse_start, daily_verse.verse_end
+                    DailyVerse.verse_start, DailyVerse.verse_end
                 ),
-            )
-            verse_texts = (await session.execute(verse_query)).scalars().all()
-            return " ".join(verse_texts)
+            ),
+        )
+        .filter(
+            DailyVerse.id == daily_verse_id,
+            Verse.book_version_code == revision,
+        )
+        .order_by(Verse.verse)
+        .subquery()
+    )
+    content = select(
+        func.group_concat(verses.c.text, " ")  # pylint: disable=not-callable
+    ).scalar_subquery()
+    return select(
+        DailyVerse.id,
+        DailyVerse.tags,
+        DailyVerse.book_number,
+        DailyVerse.chapter,
+        DailyVerse.verse_start,
+        DailyVerse.verse_end,
+        content.label("verse_content"),
+    ).filter(DailyVerse.id == daily_verse_id)
+
+
+# Statements of the hot paths, which are checked against the query planner
+# on startup
+HOT_QUERIES = [
+    ("daily_verse_content", _daily_verse_query(1, DAILY_VERSE_REVISION)),
+]
+
+
+async def generate_daily_verse_async(
+    tag: str | None, revision: str = DAILY_VERSE_REVISION
+) -> str:
+    """Generate daily random verse."""
+
+    async with async_session_manager() as manager:
+        async with manager() as session:
+            # Pick a random daily verse of the tag, or any tag if None
+            index = await daily_verse_index.get_index(session)
+            query = _daily_verse_query(index.choose(tag), revision)
+            row = (await session.execute(query)).mappings().one()
 
+    logger.debug(row)
 
-def save_verse_to_file(content: str):
-    """Save daily verse into the"""
-    with open("./resource/daily_verse.json", "w+", encoding="utf8") as file:
-        file.write(content)
+    daily_verse_out = DailyVerseOut.model_validate(row)
+    result = json.dumps(
+        {
+            "verse_content": row["verse_content"] or "",
+            "ptr": daily_verse_out.model_dump(),
+        }
+    )
+    daily_verse_store.publish(result)
+    return result
+
+
+async def send_daily_verse_async(daily_verse: str) -> dict:
+    """Send daily bible verse to the registered devices."""
+    data = json.loads(daily_verse)
+    report = await fanout.fan_out(
+        fanout.Notification(
+            message=data["verse_content"], title="Daily bible message"
+        ),
+        DevicesRepo(async_session=read_session).token_pages(),
+        cloud_messaging.FirebaseTransport(),
+        prune=DevicesRepo(async_session=async_session).delete_tokens,
+    )
+    return report.as_dict()
+
+
+@celery.task(name="send_clound_message")
+def send_daily_verse(daily_verse: str):
+    """Send daily bible verse to the registered devices"""
+    return run(send_daily_verse_async(daily_verse))
+
+
+@celery.task(name="daily_verse")
+def generate_daily_verse(tag: str | None = None):
+    """Generate daily bible verse"""
+    return run(generate_daily_verse_async(tag))
@@ -0,0 +1,46 @@
+"""the testing module for the bibles APIs."""
+
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+from sqlalchemy import create_engine
+from sqlalchemy.ext.asyncio import async_sessionmaker, create_async_engine
+
+from biblebee_api.api import bibles_api
+from biblebee_api.migrations import migrate
+from biblebee_api.model.bible_model import mapper_registry
+from biblebee_api.repo.bibles_repo import BiblesRepo
+from biblebee_api.service.response_cache import chapter_cache
+
+
+def test_chapter_urls_are_versioned(tmp_path):
+    """test chapters redirect to the URL of the corpus version"""
+    database = tmp_path / "bible.db"
+    with create_engine(f"sqlite:///{database}").begin() as conn:
+        mapper_registry.metadata.create_all(conn)
+        migrate(conn)
+        conn.exec_driver_sql(
+            "INSERT INTO verses VALUES ('SUV', 10, 1, 1, 'Hapo mwanzo')"
+        )
+    session = async_sessionmaker(
+        create_async_engine(f"sqlite+aiosqlite:///{database}")
+    )
+    app = FastAPI()
+    app.include_router(bibles_api.router, prefix="/books")
+    app.dependency_overrides[BiblesRepo.request_scoped] = lambda: (
+        BiblesRepo(session)
+    )
+    chapter_cache.clear()
+
+    with TestClient(app) as client:
+        moved = client.get("/books/SUV/10/1?v=0", follow_redirects=False)
+        assert moved.status_code == 307
+        assert moved.headers["cache-control"] == "no-cache"
+        location = moved.headers["location"]
+        unversioned = client.get("/books/SUV/10/1", follow_redirects=False)
+        assert unversioned.headers["location"] == location
+
+        response = client.get(location)
+        assert response.status_code == 200
+        assert response.headers["cache-control"] == bibles_api.IMMUTABLE
+        assert response.json()["data"][0]["text"] == "Hapo mwanzo"
+    chapter_cache.clear()
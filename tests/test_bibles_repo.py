@@ -0,0 +1,96 @@
+"""the testing module for the bibles repository."""
+
+import asyncio
+
+from sqlalchemy import insert
+from sqlalchemy.ext.asyncio import async_sessionmaker, create_async_engine
+
+from biblebee_api.model.bible_model import Verse, mapper_registry
+from biblebee_api.repo.bibles_repo import BiblesRepo, warm_statements
+from biblebee_api.repo.corpus_store import CorpusStore
+from biblebee_api.service.verse_parser import parse_verse_ranges
+
+verses = [
+    {
+        "book_version_code": revision,
+        "book_number": 10,
+        "chapter": chapter,
+        "verse": verse,
+        "text": f"{revision} {chapter}:{verse}",
+    }
+    for revision in ("KJV", "SUV")
+    for chapter in (1, 2)
+    for verse in (1, 2, 3)
+]
+
+
+async def _engine():
+    engine = create_async_engine("sqlite+aiosqlite://")
+    async with engine.begin() as conn:
+        await conn.run_sync(mapper_registry.metadata.create_all)
+        await conn.execute(insert(Verse), verses)
+    return engine
+
+
+async def _lookups():
+    engine = await _engine()
+    session = async_sessionmaker(engine)
+    await warm_statements(session)
+    compiled = len(engine.sync_engine._compiled_cache)
+
+    repo = BiblesRepo(session)
+    results = [
+        await repo.find_verse(10, 1, 2, ["SUV"]),
+        await repo.find_verse(10, 1, 2, []),
+        await repo.find_chapter_verses(10, 2, [3, 1], ["KJV", "SUV"]),
+        await repo.find_chapter_verses(10, 2, [], ["KJV"]),
+        await repo.skim_book_content(10, parse_verse_ranges("2:2-3"), []),
+        await repo.skim_book_content(10, parse_verse_ranges(""), ["SUV"]),
+    ]
+    recompiled = len(engine.sync_engine._compiled_cache) - compiled
+    await engine.dispose()
+    return [[row.text for row in rows] for rows in results], recompiled
+
+
+def test_lookups_reuse_the_warmed_statements():
+    """test the optional filters and that nothing is compiled again"""
+    results, recompiled = asyncio.run(_lookups())
+    assert results == [
+        ["SUV 1:2"],
+        ["KJV 1:2", "SUV 1:2"],
+        ["KJV 2:1", "KJV 2:3", "SUV 2:1", "SUV 2:3"],
+        ["KJV 2:1", "KJV 2:2", "KJV 2:3"],
+        ["KJV 2:2", "KJV 2:3", "SUV 2:2", "SUV 2:3"],
+        ["SUV 1:1", "SUV 1:2", "SUV 1:3", "SUV 2:1", "SUV 2:2", "SUV 2:3"],
+    ]
+    assert recompiled == 0
+
+
+async def _both_stores(lookup):
+    engine = await _engine()
+    session = async_sessionmaker(engine)
+    corpus = CorpusStore.from_rows([tuple(row.values()) for row in verses])
+    results = [
+        [
+            (row.book_version_code, row.chapter, row.verse, row.text)
+            for row in await lookup(BiblesRepo(session, store))
+        ]
+        for store in (None, corpus)
+    ]
+    await engine.dispose()
+    return results
+
+
+def test_the_corpus_store_matches_the_database():
+    """test the verses are the same and in the same order either way"""
+    lookups = [
+        lambda repo: repo.skim_book_content(
+            10, parse_verse_ranges("2:2-3"), ["SUV", "KJV"]
+        ),
+        lambda repo: repo.skim_book_content(10, parse_verse_ranges(""), []),
+        lambda repo: repo.find_chapter_verses(10, 1, [2], ["SUV", "KJV"]),
+        lambda repo: repo.find_verse(10, 2, 1, ["SUV", "KJV", "SUV"]),
+    ]
+    for lookup in lookups:
+        database, corpus = asyncio.run(_both_stores(lookup))
+        assert database and database == corpus
@@ -0,0 +1,118 @@
+"""the testing module for the memory-mapped corpus snapshot."""
+
+import asyncio
+
+import pytest
+from sqlalchemy import create_engine
+from sqlalchemy.ext.asyncio import async_sessionmaker, create_async_engine
+
+from biblebee_api.migrations import migrate
+from biblebee_api.model.bible_model import mapper_registry
+from biblebee_api.repo.corpus_snapshot import (
+    _HEADER,
+    CorpusSnapshot,
+    dump,
+    open_snapshot,
+    write_snapshot,
+)
+from tests.test_corpus_store import rows
+
+
+@pytest.fixture(name="snapshot")
+def fixture_snapshot(tmp_path):
+    """snapshot of the rows of the corpus store tests"""
+    path = str(tmp_path / "corpus.snapshot")
+    assert write_snapshot(rows, 7, path) == len(rows)
+    return CorpusSnapshot(path)
+
+
+def test_snapshot_matches_the_rows(snapshot):
+    """test every verse is read back from the snapshot"""
+    assert snapshot.stamp == 7
+    assert len(snapshot) == len(rows)
+    everything = snapshot.skim(10, {}, []) + snapshot.skim(20, {}, [])
+    assert sorted(
+        (r.book_version_code, r.book_number, r.chapter, r.verse, r.text)
+        for r in everything
+    ) == sorted(rows)
+    result = snapshot.skim(10, {1: ((1, 1), (3, 9)), 2: ()}, ["SUV"])
+    assert [(r.chapter, r.verse, r.text) for r in result] == [
+        (1, 1, "Hapo mwanzo"),
+        (1, 3, "Mungu akasema"),
+        (2, 1, "Basi mbingu"),
+    ]
+
+
+def test_snapshot_lookups(snapshot):
+    """test the lookups of chapters, verses and missing verses"""
+    result = snapshot.chapter_verses(10, 1, [2], [])
+    assert [(r.book_version_code, r.text) for r in result] == [
+        ("KJV", "And the earth"),
+        ("SUV", "Nayo nchi"),
+    ]
+    assert snapshot.verse(20, 1, 1, ["SUV"])[0].text == "Na haya ndiyo"
+    assert snapshot.verse(10, 5, 1, ["SUV"]) == []
+    assert snapshot.skim(30, {}, ["SUV"]) == []
+
+
+def test_not_a_snapshot(tmp_path):
+    """test other files are rejected"""
+    path = tmp_path / "corpus.snapshot"
+    path.write_bytes(b"SQLite format 3\0" + b"\0" * 64)
+    with pytest.raises(ValueError):
+        CorpusSnapshot(str(path))
+
+
+@pytest.mark.parametrize("size", [0, 10, 30, 60, -1])
+def test_truncated_snapshot(tmp_path, size):
+    """test truncated snapshots are rejected"""
+    path = tmp_path / "corpus.snapshot"
+    write_snapshot(rows, 7, str(path))
+    path.write_bytes(path.read_bytes()[:size])
+    with pytest.raises(ValueError):
+        CorpusSnapshot(str(path))
+
+
+def test_array_past_the_end(tmp_path):
+    """test arrays ending past the end of the snapshot are rejected"""
+    path = tmp_path / "corpus.snapshot"
+    write_snapshot(rows, 7, str(path))
+    content = bytearray(path.read_bytes())
+    # Number of verses of the first revision
+    content[_HEADER.size + 20 : _HEADER.size + 24] = b"\xff\xff\xff\x00"
+    path.write_bytes(bytes(content))
+    with pytest.raises(ValueError):
+        CorpusSnapshot(str(path))
+
+
+async def _open(path: str, database: str):
+    engine = create_async_engine(f"sqlite+aiosqlite:///{database}")
+    try:
+        return await open_snapshot(path, async_sessionmaker(engine))
+    finally:
+        await engine.dispose()
+
+
+def test_snapshot_goes_stale_with_the_verses_only(tmp_path):
+    """test a new daily verse keeps the snapshot, a new verse does not"""
+    database, path = str(tmp_path / "bible.db"), str(tmp_path / "snapshot")
+    engine = create_engine(f"sqlite:///{database}")
+    with engine.begin() as conn:
+        mapper_registry.metadata.create_all(conn)
+        migrate(conn)
+        conn.exec_driver_sql(
+            "INSERT INTO verses VALUES ('SUV', 10, 1, 1, 'Hapo mwanzo')"
+        )
+        dump(conn, path)
+        conn.exec_driver_sql(
+            "INSERT INTO daily_verses (book_number, chapter, verse_start, "
+            "verse_end, tags) VALUES (10, 1, 1, 1, 'faith')"
+        )
+    assert asyncio.run(_open(path, database)) is not None
+
+    with engine.begin() as conn:
+        conn.exec_driver_sql(
+            "INSERT INTO verses VALUES ('SUV', 10, 1, 2, 'Nayo nchi')"
+        )
+    engine.dispose()
+    assert asyncio.run(_open(path, database)) is None
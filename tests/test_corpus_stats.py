@@ -0,0 +1,28 @@
+"""the testing module for the precomputed corpus statistics."""
+
+from sqlalchemy import create_engine
+
+from biblebee_api.corpus_stats import refresh_all_corpus_stats
+from biblebee_api.migrations import migrate
+from biblebee_api.model.bible_model import mapper_registry
+
+
+def test_revision_without_a_version_row():
+    """test a revision with books and verses only gets its statistics"""
+    engine = create_engine("sqlite://")
+    with engine.begin() as conn:
+        mapper_registry.metadata.create_all(conn)
+        migrate(conn)
+        conn.exec_driver_sql(
+            "INSERT INTO books VALUES (10, 'SUV', 'sw', 'Mwa', 'Mwanzo', '')"
+        )
+        conn.exec_driver_sql(
+            "INSERT INTO verses VALUES ('SUV', 10, 1, 1, 'Hapo mwanzo'), "
+            "('SUV', 10, 2, 1, 'Basi mbingu')"
+        )
+        refresh_all_corpus_stats(conn)
+        stats = conn.exec_driver_sql(
+            "SELECT books, chapters, verses, words FROM corpus_stats "
+            "WHERE version_code = 'SUV' AND book_number = 0"
+        )
+        assert stats.all() == [(1, 2, 2, 4)]
@@ -0,0 +1,49 @@
+"""the testing module for the in-memory corpus store."""
+
+from biblebee_api.repo.corpus_store import CorpusStore
+
+rows = [
+    ("KJV", 10, 1, 1, "In the beginning"),
+    ("KJV", 10, 1, 2, "And the earth"),
+    ("SUV", 10, 1, 1, "Hapo mwanzo"),
+    ("SUV", 10, 1, 2, "Nayo nchi"),
+    ("SUV", 10, 1, 3, "Mungu akasema"),
+    ("SUV", 10, 2, 1, "Basi mbingu"),
+    ("SUV", 20, 1, 1, "Na haya ndiyo"),
+]
+
+store = CorpusStore.from_rows(rows)
+
+
+def test_skim_selected_verses():
+    """test skimming selected verses of chapters"""
+    result = store.skim(10, {1: ((1, 1), (3, 9)), 2: ()}, ["SUV"])
+    assert [(r.chapter, r.verse) for r in result] == [(1, 1), (1, 3), (2, 1)]
+    assert result[1].text == "Mungu akasema"
+
+
+def test_skim_whole_book():
+    """test skimming a book without chapter selection"""
+    result = store.skim(10, {}, ["SUV"])
+    assert [(r.chapter, r.verse) for r in result] == [
+        (1, 1),
+        (1, 2),
+        (1, 3),
+        (2, 1),
+    ]
+
+
+def test_chapter_verses_of_all_revisions():
+    """test retrieving chapter verses across revisions"""
+    result = store.chapter_verses(10, 1, [2], [])
+    assert [(r.book_version_code, r.text) for r in result] == [
+        ("KJV", "And the earth"),
+        ("SUV", "Nayo nchi"),
+    ]
+
+
+def test_missing_verse():
+    """test lookup of verses which do not exist"""
+    assert store.verse(10, 5, 1, ["SUV"]) == []
+    assert store.verse(10, 1, 1, ["NIV"]) == []
+    assert len(store) == len(rows)
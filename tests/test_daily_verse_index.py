@@ -0,0 +1,31 @@
+"""the testing module for the daily verse tag index."""
+
+import random
+
+import pytest
+
+from biblebee_api.service.daily_verse_index import DailyVerseIndex
+
+index = DailyVerseIndex.from_rows(
+    [(1, "salvation,faith"), (2, "Faith"), (3, "love"), (4, None)]
+)
+
+
+def test_tags_are_split_and_normalized():
+    """test every single tag is indexed instead of tag combinations"""
+    assert sorted(index.tags) == ["faith", "love", "salvation"]
+    assert list(index.ids_by_tag["faith"]) == [1, 2]
+    assert len(index) == 4
+
+
+def test_choose_verse_of_tag():
+    """test choosing a random verse carrying the given tag"""
+    rng = random.Random(7)
+    assert {index.choose(" FAITH", rng) for _ in range(50)} == {1, 2}
+    assert {index.choose(None, rng) for _ in range(50)} == {1, 2, 3}
+
+
+def test_choose_unknown_tag():
+    """test choosing a verse of an unknown tag"""
+    with pytest.raises(LookupError):
+        index.choose("hope")
@@ -0,0 +1,38 @@
+"""the testing module for the daily verse store."""
+
+import asyncio
+import os
+
+from biblebee_api.service.daily_verse_store import DailyVerseStore, publish
+
+
+def test_publish_and_reload(tmp_path):
+    """test the published verse is reloaded once the file is replaced"""
+    path = str(tmp_path / "daily_verse.json")
+    store = DailyVerseStore(path)
+    assert store.current() is None
+
+    publish('{"verse_content": "Yesu akalia."}', path)
+    store._checked_at = float("-inf")  # pylint: disable=protected-access
+    assert store.current() == '{"verse_content":"Yesu akalia."}'.encode()
+    assert os.listdir(tmp_path) == ["daily_verse.json"]
+
+
+def test_regenerations_are_coalesced(tmp_path):
+    """test concurrent misses share a single regeneration"""
+    store = DailyVerseStore(str(tmp_path / "daily_verse.json"))
+    calls = []
+
+    async def generate():
+        calls.append(1)
+        await asyncio.sleep(0.01)
+        return '{"verse_content": "Mungu ni pendo."}'
+
+    async def misses():
+        tasks = {store.regenerate(generate) for _ in range(10)}
+        await asyncio.gather(*tasks)
+        return tasks
+
+    assert len(asyncio.run(misses())) == 1
+    assert len(calls) == 1
+    assert store.body == '{"verse_content":"Mungu ni pendo."}'.encode()
@@ -0,0 +1,53 @@
+"""the testing module for the write-behind device buffer."""
+
+import asyncio
+
+import pytest
+
+from biblebee_api.schema.bible_schema import DeviceIn
+from biblebee_api.service.device_writer import DeviceWriter
+
+
+def _device(user_id: int, token: str) -> DeviceIn:
+    return DeviceIn(user_id=user_id, token=token, device_infos="")
+
+
+def test_registrations_are_coalesced_and_drained():
+    """test registrations are coalesced by token and drained on close"""
+    batches = []
+
+    async def save_all(devices):
+        batches.append([(dev.token, dev.user_id) for dev in devices])
+        return len(devices)
+
+    async def register():
+        writer = DeviceWriter(save_all, flush_interval=60, flush_size=3)
+        writer.start()
+        await writer.submit([_device(1, "a"), _device(2, "b")])
+        await writer.submit([_device(3, "a")])
+        await writer.submit([_device(4, "c")])
+        while writer.pending:
+            await asyncio.sleep(0.001)
+        await writer.submit([_device(5, "d")])
+        await writer.close()
+
+    asyncio.run(register())
+    assert batches == [[("a", 3), ("b", 2), ("c", 4)], [("d", 5)]]
+
+
+def test_full_buffer_applies_backpressure():
+    """test registrations wait while the buffer is full"""
+
+    async def save_all(devices):
+        return len(devices)
+
+    async def register():
+        writer = DeviceWriter(save_all, max_pending=1)
+        await writer.submit([_device(1, "a")])
+        with pytest.raises(asyncio.TimeoutError):
+            await writer.submit([_device(2, "b")], timeout=0.01)
+        await writer.flush()
+        await writer.submit([_device(2, "b")], timeout=0.01)
+        return writer.pending
+
+    assert asyncio.run(register()) == 1
@@ -0,0 +1,74 @@
+"""the testing module for the devices repository."""
+
+import asyncio
+from datetime import datetime
+
+from sqlalchemy.ext.asyncio import async_sessionmaker, create_async_engine
+
+from biblebee_api.model.bible_model import mapper_registry
+from biblebee_api.repo.devices_repo import DevicesRepo
+from biblebee_api.schema.bible_schema import DeviceIn
+
+
+async def _token_pages(**kwargs):
+    engine = create_async_engine("sqlite+aiosqlite://")
+    async with engine.begin() as conn:
+        await conn.run_sync(mapper_registry.metadata.create_all)
+        await conn.exec_driver_sql(
+            "INSERT INTO devices (user_id, token, device_infos, updated_at) "
+            "VALUES (1, 'a', '', '2023-11-01 08:00:00'), "
+            "(2, 'b', '', '2023-11-06 08:00:00'), "
+            "(3, 'c', '', '2023-11-06 08:00:00'), "
+            "(4, 'd', '', '2023-11-02 08:00:00'), "
+            "(5, 'e', '', '2023-11-07 08:00:00')"
+        )
+    repo = DevicesRepo(async_sessionmaker(engine))
+    pages = [page async for page in repo.token_pages(**kwargs)]
+    await engine.dispose()
+    return pages
+
+
+def test_token_pages():
+    """test tokens are paginated by id"""
+    pages = asyncio.run(_token_pages(page_size=2))
+    assert pages == [["a", "b"], ["c", "d"], ["e"]]
+
+
+def test_token_pages_updated_since():
+    """test paginating only the tokens of recently updated devices"""
+    since = datetime(2023, 11, 6, 8)
+    pages = asyncio.run(_token_pages(page_size=1, updated_since=since))
+    assert pages == [["b"], ["c"], ["e"]]
+
+
+async def _save_all(batches):
+    engine = create_async_engine("sqlite+aiosqlite://")
+    async with engine.begin() as conn:
+        await conn.run_sync(mapper_registry.metadata.create_all)
+    repo = DevicesRepo(async_sessionmaker(engine))
+    saved = [await repo.save_all(batch) for batch in batches]
+    async with engine.connect() as conn:
+        rows = await conn.exec_driver_sql(
+            "SELECT token, user_id FROM devices ORDER BY token"
+        )
+        devices = rows.all()
+    await engine.dispose()
+    return saved, devices
+
+
+def test_save_all_upserts_by_token():
+    """test saving devices in bulk updates the already registered tokens"""
+    saved, devices = asyncio.run(
+        _save_all(
+            [
+                [DeviceIn(user_id=1, token="a", device_infos="")],
+                [
+                    DeviceIn(user_id=2, token="a", device_infos=""),
+                    DeviceIn(user_id=3, token="b", device_infos=""),
+                    DeviceIn(user_id=4, token="b", device_infos=""),
+                ],
+            ]
+        )
+    )
+    assert saved == [1, 2]
+    assert devices == [("a", 2), ("b", 4)]
@@ -0,0 +1,66 @@
+"""the testing module for the notification fan-out."""
+
+import asyncio
+
+from biblebee_api.service.cloud_messaging import FirebaseTransport
+from biblebee_api.service.fanout import (
+    BatchResult,
+    FakeTransport,
+    Notification,
+    fan_out,
+)
+
+notification = Notification(message="Mungu ni pendo", title="Daily verse")
+
+
+async def _pages(count: int, page_size: int = 300):
+    for start in range(0, count, page_size):
+        yield [
+            f"token-{i}" for i in range(start, min(start + page_size, count))
+        ]
+
+
+def test_fan_out_in_batches_and_prune():
+    """test tokens are sent in capped batches and dead tokens pruned"""
+    transport = FakeTransport(is_unregistered=lambda t: t.endswith("7"))
+    pruned = []
+
+    async def prune(tokens):
+        pruned.extend(tokens)
+        return len(tokens)
+
+    report = asyncio.run(
+        fan_out(notification, _pages(1234), transport, prune, concurrency=3)
+    )
+    assert transport.calls == report.batches == 3
+    assert report.sent == 1234 - 123
+    assert report.pruned == len(set(pruned)) == 123
+
+
+def test_fan_out_retries_transient_failures():
+    """test transient failures are retried with backoff"""
+
+    class FlakyTransport:  # pylint: disable=too-few-public-methods
+        calls = 0
+
+        async def send(self, _, tokens):
+            self.calls += 1
+            if self.calls == 1:
+                raise ConnectionError("FCM is unavailable")
+            return BatchResult(sent=len(tokens))
+
+    report = asyncio.run(
+        fan_out(notification, _pages(10), FlakyTransport(), backoff=0)
+    )
+    assert (report.sent, report.retries, report.failed) == (10, 1, 0)
+
+
+def test_unconfigured_firebase_is_not_retried(monkeypatch):
+    """test the batches fail at once when firebase is not configured"""
+    monkeypatch.delenv("FIREBASE_CONFIG_FILE", raising=False)
+    monkeypatch.delenv("FIREBASE_CONFIG", raising=False)
+    transport = FirebaseTransport()
+    assert not transport.configured
+
+    report = asyncio.run(fan_out(notification, _pages(700), transport))
+    assert (report.sent, report.retries, report.failed) == (0, 0, 700)
@@ -0,0 +1,54 @@
+"""the testing module for the revisions importer."""
+
+import sqlite3
+
+import pytest
+from sqlalchemy import create_engine
+from sqlalchemy.exc import IntegrityError
+
+from biblebee_api.importer import import_revision
+from biblebee_api.migrations import migrate
+from biblebee_api.model.bible_model import mapper_registry
+
+
+def _module(verses) -> sqlite3.Connection:
+    module = sqlite3.connect(":memory:")
+    module.executescript(
+        "CREATE TABLE info (name TEXT, value TEXT);"
+        "CREATE TABLE books (book_number INTEGER, short_name TEXT, "
+        "long_name TEXT, book_color TEXT);"
+        "CREATE TABLE verses (book_number INTEGER, chapter INTEGER, "
+        "verse INTEGER, text TEXT);"
+        "INSERT INTO info VALUES ('language', 'sw');"
+        "INSERT INTO books VALUES (10, 'Mwa', 'Mwanzo', '#fff');"
+    )
+    module.executemany("INSERT INTO verses VALUES (10, 1, ?, ?)", verses)
+    return module
+
+
+def test_failed_import_keeps_the_triggers(tmp_path):
+    """test an import rolled back restores the suspended triggers"""
+    engine = create_engine(f"sqlite:///{tmp_path / 'bible.SQLite3'}")
+    with engine.begin() as conn:
+        mapper_registry.metadata.create_all(conn)
+        migrate(conn)
+
+    # The second verse 1 violates the primary key of the verses
+    source = _module([(1, "Hapo mwanzo"), (1, "Hapo mwanzo")])
+    with engine.connect() as conn:
+        with pytest.raises(IntegrityError):
+            import_revision(conn, source, "SUV")
+        conn.rollback()
+
+    with engine.connect() as conn:
+        triggers = conn.exec_driver_sql(
+            "SELECT name FROM sqlite_master WHERE type = 'trigger'"
+        ).scalars()
+        assert {
+            "verses_fts_ai",
+            "verses_fts_ad",
+            "verses_insert_stamp",
+            "verses_delete_stamp",
+        } <= set(triggers)
+        assert conn.exec_driver_sql("SELECT count(*) FROM books").scalar() == 0
+    engine.dispose()
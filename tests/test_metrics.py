@@ -0,0 +1,83 @@
+"""the testing module for the request metrics."""
+
+import subprocess
+import sys
+
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+from sqlalchemy import create_engine, literal, select, union_all
+from sqlalchemy.orm import Session
+
+from biblebee_api.service import metrics
+
+
+def test_histograms_are_rendered_cumulatively():
+    """test buckets count the values up to their bound"""
+    registry = metrics.Registry()
+    for value in (0, 2, 2, 200):
+        registry.observe(metrics.REQUEST_QUERIES, ("/books",), value)
+
+    rendered = registry.render()
+    name = "biblebee_request_db_queries"
+    assert f'{name}_bucket{{route="/books",le="0"}} 1' in rendered
+    assert f'{name}_bucket{{route="/books",le="2"}} 3' in rendered
+    assert f'{name}_bucket{{route="/books",le="100"}} 3' in rendered
+    assert f'{name}_bucket{{route="/books",le="+Inf"}} 4' in rendered
+    assert f'{name}_sum{{route="/books"}} 204' in rendered
+    assert f'{name}_count{{route="/books"}} 4' in rendered
+
+
+def test_published_metrics_are_summed(tmp_path):
+    """test the metrics of the other workers are added to our own"""
+    worker = metrics.Registry()
+    worker.observe(metrics.REQUEST_ROWS, ("/books",), 10)
+    (tmp_path / "1.json").write_text(worker.dumps())
+
+    exited = subprocess.Popen([sys.executable, "-c", ""])
+    exited.wait()
+    (tmp_path / f"{exited.pid}.json").write_text(worker.dumps())
+
+    own = metrics.Registry()
+    own.observe(metrics.REQUEST_ROWS, ("/books",), 5)
+    metrics.publish(str(tmp_path), own)
+
+    total = metrics.collect(str(tmp_path), own)
+    assert total.series[metrics.REQUEST_ROWS.name][("/books",)][-1] == 15
+    assert not (tmp_path / f"{exited.pid}.json").exists()
+
+    metrics.unpublish(str(tmp_path))
+    assert sorted(p.name for p in tmp_path.iterdir()) == ["1.json"]
+
+
+def test_requests_are_measured():
+    """test the middleware records the queries and the serialization"""
+    engine = create_engine("sqlite://")
+    metrics.instrument_engine(engine)
+    metrics.instrument_sessions()
+    registry = metrics.Registry()
+    app = FastAPI()
+    app.add_middleware(metrics.MetricsMiddleware, registry=registry)
+
+    @metrics.serialization
+    def encode(rows):
+        return str(rows)
+
+    @app.get("/verses/{verse}")
+    async def verse(verse: int):
+        with Session(engine) as session:
+            rows = session.execute(
+                union_all(select(literal(verse)), select(literal(verse + 1)))
+            )
+            return encode(rows.all())
+
+    with TestClient(app) as client:
+        assert client.get("/verses/1").status_code == 200
+        assert client.get("/missing").status_code == 404
+
+    series = registry.series
+    route = ("/verses/{verse}",)
+    assert series[metrics.REQUEST_QUERIES.name][route][-1] == 1
+    assert series[metrics.REQUEST_ROWS.name][route][-1] == 2
+    assert series[metrics.REQUEST_SERIALIZE_SECONDS.name][route][-1] > 0
+    assert ("GET", "unmatched", "404") in series[metrics.REQUEST_SECONDS.name]
+    assert metrics.current() is None
@@ -0,0 +1,119 @@
+"""the testing module for the schema migrations."""
+
+import threading
+
+from sqlalchemy import create_engine
+
+from biblebee_api.migrations import (
+    MIGRATIONS,
+    check_query_plans,
+    create_schema,
+    migrate,
+)
+from biblebee_api.model.bible_model import mapper_registry
+
+
+def test_migrate_is_applied_once():
+    """test migrations bump the schema version only once"""
+    engine = create_engine("sqlite://")
+    with engine.begin() as conn:
+        conn.exec_driver_sql(
+            "CREATE TABLE verses (book_version_code TEXT, book_number INT,"
+            " chapter INT, verse INT, text TEXT)"
+        )
+        mapper_registry.metadata.create_all(conn)
+        migrate(conn)
+        migrate(conn)
+        version = conn.exec_driver_sql("PRAGMA user_version").scalar()
+        assert version == len(MIGRATIONS)
+        assert not check_query_plans(conn)
+
+
+def test_books_are_rebuilt_with_the_composite_key():
+    """test a former books table accepts a book of a second revision"""
+    engine = create_engine("sqlite://")
+    with engine.begin() as conn:
+        conn.exec_driver_sql(
+            "CREATE TABLE books (book_number INTEGER NOT NULL PRIMARY KEY, "
+            "version_code VARCHAR NOT NULL, "
+            "version_language VARCHAR NOT NULL, short_name VARCHAR NOT NULL, "
+            "long_name VARCHAR NOT NULL, book_color VARCHAR NOT NULL)"
+        )
+        conn.exec_driver_sql(
+            "INSERT INTO books VALUES (10, 'SUV', 'sw', 'Mwa', 'Mwanzo', '')"
+        )
+        mapper_registry.metadata.create_all(conn)
+        migrate(conn)
+        conn.exec_driver_sql(
+            "INSERT INTO books VALUES (10, 'KJV', 'en', 'Gen', 'Genesis', '')"
+        )
+        books = conn.exec_driver_sql(
+            "SELECT version_code FROM books ORDER BY version_code"
+        ).scalars()
+        assert books.all() == ["KJV", "SUV"]
+        stamp = conn.exec_driver_sql("SELECT version FROM corpus_version")
+        assert stamp.scalar() > 1
+
+
+def test_daily_verses_have_their_own_stamp():
+    """test a new daily verse leaves the corpus version stamp alone"""
+    engine = create_engine("sqlite://")
+    with engine.begin() as conn:
+        mapper_registry.metadata.create_all(conn)
+        migrate(conn)
+        conn.exec_driver_sql(
+            "INSERT INTO daily_verses (book_number, chapter, verse_start, "
+            "verse_end, tags) VALUES (10, 1, 1, 3, 'faith')"
+        )
+        stamps = conn.exec_driver_sql(
+            "SELECT (SELECT version FROM corpus_version), "
+            "(SELECT version FROM daily_verses_version)"
+        )
+        assert stamps.one() == (1, 2)
+
+
+def test_workers_create_the_schema_once(tmp_path):
+    """test workers starting together on a fresh database both come up"""
+    barrier = threading.Barrier(2)
+    errors = []
+
+    def start(engine):
+        barrier.wait()
+        try:
+            with engine.begin() as conn:
+                create_schema(conn)
+        except Exception as error:  # pylint: disable=broad-except
+            errors.append(error)
+
+    for attempt in range(5):
+        url = f"sqlite:///{tmp_path / f'{attempt}.sqlite3'}"
+        workers = [
+            threading.Thread(target=start, args=(create_engine(url),))
+            for _ in range(2)
+        ]
+        for worker in workers:
+            worker.start()
+        for worker in workers:
+            worker.join()
+        assert not errors
+        with create_engine(url).connect() as conn:
+            version = conn.exec_driver_sql("PRAGMA user_version").scalar()
+            assert version == len(MIGRATIONS)
+
+
+def test_the_prebuilt_statements_are_checked():
+    """test the statements run by the app are checked against the planner"""
+    engine = create_engine("sqlite://")
+    with engine.begin() as conn:
+        conn.exec_driver_sql(
+            "CREATE TABLE verses (book_version_code TEXT, book_number INT,"
+            " chapter INT, verse INT, text TEXT)"
+        )
+        mapper_registry.metadata.create_all(conn)
+        migrate(conn)
+        conn.exec_driver_sql("DROP INDEX ix_verses_book_chapter_verse")
+        conn.exec_driver_sql(
+            "DROP INDEX ix_verses_revision_book_chapter_verse"
+        )
+        scans = check_query_plans(conn)
+        assert {"skim", "find_verse", "daily_verse_content"} <= set(scans)
@@ -0,0 +1,26 @@
+"""the testing module for the side by side view of revisions."""
+
+from biblebee_api.repo.corpus_store import CorpusStore
+from biblebee_api.service.parallel_view import align_revisions
+
+store = CorpusStore.from_rows(
+    [
+        ("KJV", 10, 1, 1, "In the beginning"),
+        ("KJV", 10, 1, 2, "And the earth"),
+        ("SUV", 10, 1, 1, "Hapo mwanzo"),
+        ("SUV", 10, 1, 3, "Mungu akasema"),
+        ("SUV", 10, 2, 1, "Basi mbingu"),
+    ]
+)
+
+
+def test_align_revisions():
+    """test verses of the revisions are aligned by chapter and verse"""
+    rows = store.skim(10, {}, ["SUV", "KJV"])
+    aligned = list(align_revisions(rows, ["SUV", "KJV"]))
+    assert aligned == [
+        (1, 1, ["Hapo mwanzo", "In the beginning"]),
+        (1, 2, [None, "And the earth"]),
+        (1, 3, ["Mungu akasema", None]),
+        (2, 1, ["Basi mbingu", None]),
+    ]
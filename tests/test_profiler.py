@@ -0,0 +1,99 @@
+"""the testing module for the request profiler."""
+
+import time
+
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+
+from biblebee_api.api import adm_api
+from biblebee_api.service import profiler
+
+
+def _spin(seconds: float):
+    until = time.perf_counter() + seconds
+    while time.perf_counter() < until:
+        pass
+
+
+def test_sampler_collapses_the_stacks():
+    """test the busy function shows up in the collapsed stacks"""
+    sampler = profiler.StackSampler(interval=0.001)
+    sampler.start()
+    _spin(0.05)
+    sampler.stop()
+
+    lines = sampler.collapsed().splitlines()
+    assert any("_spin (test_profiler.py:" in line for line in lines)
+    assert all(int(line.rsplit(" ", 1)[1]) > 0 for line in lines)
+
+
+def test_requests_are_profiled_on_demand_and_sampled(tmp_path):
+    """test the token is required and the oldest profiles are removed"""
+    app = FastAPI()
+    app.add_middleware(
+        profiler.ProfilerMiddleware,
+        token="secret",
+        sample_every=3,
+        directory=str(tmp_path),
+        keep=2,
+    )
+
+    @app.get("/verses")
+    def verses():
+        _spin(0.01)
+        return []
+
+    with TestClient(app) as client:
+        denied = client.get("/verses?profile=1")
+        assert "x-profile" not in denied.headers
+        asked = client.get(
+            "/verses", headers={"X-Profile": "1", "X-Profile-Token": "secret"}
+        )
+        name = asked.headers["x-profile"]
+        assert "verses (test_profiler.py:" in profiler.read_profile(
+            name, str(tmp_path)
+        )
+        sampled = [client.get("/verses").headers.get("x-profile")]
+        sampled += [client.get("/verses").headers.get("x-profile")]
+        sampled += [client.get("/verses").headers.get("x-profile")]
+
+    assert sampled.count(None) == 2
+    assert profiler.list_profiles(str(tmp_path)) == [
+        max(p for p in sampled if p),
+        name,
+    ]
+
+
+def test_bare_profile_flag(tmp_path):
+    """test the query flag asks for a profile without a value too"""
+    app = FastAPI()
+    app.add_middleware(
+        profiler.ProfilerMiddleware, token="secret", directory=str(tmp_path)
+    )
+
+    @app.get("/verses")
+    def verses():
+        return []
+
+    with TestClient(app) as client:
+        asked = client.get(
+            "/verses?profile", headers={"X-Profile-Token": "secret"}
+        )
+        assert asked.headers["x-profile"] in profiler.list_profiles(
+            str(tmp_path)
+        )
+
+
+def test_profiles_require_the_token(monkeypatch):
+    """test the profiles are only listed and read with the profiler token"""
+    monkeypatch.setattr(profiler, "PROFILER_TOKEN", "secret")
+    app = FastAPI()
+    app.include_router(adm_api.router)
+    token = {"X-Profile-Token": "secret"}
+
+    with TestClient(app) as client:
+        assert client.get("/profiles").status_code == 403
+        assert client.get("/profiles/1-1.collapsed").status_code == 403
+        assert client.get("/profiles", headers=token).status_code == 200
+        missing = client.get("/profiles/1-1.collapsed", headers=token)
+        assert missing.status_code == 404
@@ -0,0 +1,31 @@
+"""the testing module for the cache of serialized responses."""
+
+import gzip
+
+from biblebee_api.service import response_cache
+from biblebee_api.service.response_cache import CachedResponse
+
+
+def test_compressed_encoding_negotiation():
+    """test the precompressed body is served to the clients accepting it"""
+    body = b'{"data":"' + b"neno " * 200 + b'"}'
+    entry = CachedResponse(
+        stamp=1,
+        body=body,
+        etag='"abc"',
+        encodings=response_cache._compress(body),  # pylint: disable=W0212
+    )
+    encoding, encoded = entry.negotiate("gzip, deflate")
+    assert encoding == "gzip" and gzip.decompress(encoded) == body
+    assert entry.negotiate("gzip;q=0, identity") == (None, body)
+    assert entry.negotiate("gzip; q=0.0, br;q=0.00") == (None, body)
+    assert entry.negotiate("gzip;q=0.5")[0] == "gzip"
+    assert entry.negotiate("") == (None, body)
+
+
+def test_etag_matches_encoded_variants():
+    """test the ETags of the encoded variants match the entity"""
+    matches = response_cache._etag_matches  # pylint: disable=W0212
+    assert matches('"abc-gzip"', '"abc"')
+    assert matches('W/"xyz", "abc"', '"abc"')
+    assert not matches('"abcd"', '"abc"')
@@ -0,0 +1,27 @@
+"""the testing module for the verses search repository."""
+
+import pytest
+
+from biblebee_api.repo import search_repo
+
+
+@pytest.mark.parametrize(
+    "query,expected",
+    [
+        ("mungu aliziumba", '"mungu" "aliziumba"*'),
+        ('nuru" OR -giza', '"nuru" "OR" "giza"*'),
+        ("  ", ""),
+    ],
+)
+def test_to_match_expression(query, expected):
+    """test free text is converted into a safe match expression"""
+    assert search_repo.to_match_expression(query) == expected
+
+
+def test_cursor_round_trip():
+    """test decoding an encoded cursor"""
+    cursor = search_repo.encode_cursor(-1.8895705521472395e-06, 42)
+    assert search_repo.decode_cursor(cursor) == (-1.8895705521472395e-06, 42)
+    assert search_repo.decode_cursor(None) == (float("-inf"), 0)
+    with pytest.raises(ValueError):
+        search_repo.decode_cursor("not-a-cursor")
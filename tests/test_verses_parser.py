@@ -31,3 +31,23 @@ def test_parse_bible_verses(test_case):
     assert result[150] == test_case["expected"][150]
     assert result[2] == test_case["expected"][2]
     assert result[3] == test_case["expected"][3]
+
+
+range_test_cases = [
+    {"input": "3:16", "expected": {3: ((16, 16),)}},
+    {"input": "1:1-100000", "expected": {1: ((1, 100000),)}},
+    {
+        "input": "150:10-12,14,13,16-18 2:10 3",
+        "expected": {150: ((10, 14), (16, 18)), 2: ((10, 10),), 3: ()},
+    },
+    {"input": "1:5 1:1-6", "expected": {1: ((1, 6),)}},
+    {"input": "", "expected": {}},
+]
+
+
+@pytest.mark.parametrize("test_case", range_test_cases)
+def test_parse_verse_ranges(test_case):
+    """test parsing of bible verses into intervals"""
+    result = verse_parser.parse_verse_ranges(test_case["input"])
+    assert dict(result) == test_case["expected"]
+    assert verse_parser.parse_verse_ranges(test_case["input"]) is result
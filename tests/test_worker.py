@@ -0,0 +1,82 @@
+"""Tests of the worker"""
+
+import time
+
+import pytest
+from sqlalchemy import create_engine
+
+from celery.contrib.testing.worker import start_worker
+
+from biblebee_api import worker
+from biblebee_api.model.bible_model import mapper_registry
+from biblebee_api.worker import celery
+
+
+@celery.task(name="tests.nap")
+def nap():
+    """Task doing nothing"""
+    return "done"
+
+
+@pytest.fixture
+def memory_broker(tmp_path):
+    """in-memory broker, with results stored in files for the pool
+    processes to share them"""
+    conf = {"broker_url": "memory://", "result_backend": f"file://{tmp_path}"}
+    saved = {key: celery.conf[key] for key in conf}
+    celery.conf.update(conf)
+    yield
+    celery.conf.update(saved)
+    # The test worker does not send the shutdown signal
+    worker._on_worker_shutdown()  # pylint: disable=protected-access
+
+
+def _task_latency(name: str, count: int, deadline: float) -> dict:
+    """
+    Broadcast `task_latency` until a worker reports `count` runs of the
+    task `name`, which pool processes publish after storing the results,
+    or until the deadline.
+    """
+    while True:
+        replies = celery.control.broadcast(
+            "task_latency", reply=True, timeout=1.0
+        )
+        latency = {k: v for reply in replies for k, v in reply.items()}
+        runs = [s.get(name, {}).get("count") for s in latency.values()]
+        if runs == [count] or time.monotonic() > deadline:
+            return latency
+
+
+def test_task_latency_of_a_prefork_worker(memory_broker):
+    """test the latency of the tasks run by the pool processes is merged"""
+    # pylint: disable=redefined-outer-name,unused-argument
+    with start_worker(
+        celery, pool="prefork", concurrency=2, perform_ping_check=False
+    ):
+        results = [nap.delay() for _ in range(4)]
+        assert [r.get(timeout=10) for r in results] == ["done"] * 4
+        latency = _task_latency("tests.nap", 4, time.monotonic() + 10)
+
+    (stats,) = latency.values()
+    assert stats["tests.nap"]["count"] == 4
+    assert stats["tests.nap"]["failures"] == 0
+
+
+def test_daily_verse_texts_are_ordered_and_of_the_revision():
+    """test the texts of the verses are joined in order, of one revision"""
+    engine = create_engine("sqlite://")
+    with engine.begin() as conn:
+        mapper_registry.metadata.create_all(conn)
+        conn.exec_driver_sql(
+            "INSERT INTO daily_verses (id, book_number, chapter, "
+            "verse_start, verse_end, tags) VALUES (1, 43, 3, 16, 18, 'love')"
+        )
+        conn.exec_driver_sql(
+            "INSERT INTO verses VALUES ('SUV', 43, 3, 18, 'c'), "
+            "('KJV', 43, 3, 16, 'x'), ('SUV', 43, 3, 16, 'a'), "
+            "('SUV', 43, 3, 19, 'd'), ('SUV', 43, 3, 17, 'b')"
+        )
+        query = worker._daily_verse_query(1, "SUV")  # pylint: disable=W0212
+        row = conn.execute(query).mappings().one()
+    assert row["verse_content"] == "a b c"
+    assert row["verse_start"] == 16 and row["verse_end"] == 18